@@ -0,0 +1,280 @@
+"""
+Almacenamiento de la Cadena - Registro de bloques append-only por segmentos
+Cada bloque se agrega como una línea JSON; un índice lateral permite leer el bloque N directamente
+"""
+import json
+import os
+import struct
+
+"""
+Entrada del índice lateral por bloque: número de segmento, offset y longitud (bytes)
+"""
+FORMATO_INDICE = struct.Struct("<IQI")
+
+POLITICAS_FSYNC = ("siempre", "lote", "nunca")
+
+NOMBRE_INDICE = "indice.bin"
+
+def _nombre_segmento(numero):
+    return f"segmento_{numero:06d}.jsonl"
+
+def _fsync(archivo):
+    archivo.flush()
+    os.fsync(archivo.fileno())
+
+def escribir_json_bloques(bloques, ruta="blockchain.json"):
+    """
+    Escribe los bloques como lista JSON idéntica a json.dump(indent=2,
+    ensure_ascii=False), en streaming y reemplazando el archivo de forma atómica
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        vacio = True
+        for bloque in bloques:
+            f.write("[\n" if vacio else ",\n")
+            vacio = False
+            texto = json.dumps(bloque, indent=2, ensure_ascii=False)
+            f.write("  " + texto.replace("\n", "\n  "))
+        f.write("[]" if vacio else "\n]")
+        _fsync(f)
+    os.replace(temporal, ruta)
+
+class RegistroBloques:
+    """
+    Registro append-only de bloques en segmentos JSON Lines.
+
+    - Agregar un bloque escribe solo ese bloque (O(1)), nunca reescribe la cadena.
+    - Cuando un segmento supera `tamano_segmento` bytes se abre uno nuevo.
+    - `politica_fsync`: "siempre" (fsync por bloque), "lote" (cada `fsync_cada`
+      bloques) o "nunca" (lo decide el sistema operativo).
+    - Al abrir, se descartan líneas truncadas por una caída a mitad de escritura
+      y se reconstruyen las entradas del índice que no llegaron a escribirse.
+    - Con `solo_lectura=True` no se modifica ningún archivo (se puede abrir
+      mientras el verificador sigue escribiendo) y solo se ven los bloques
+      cuyo índice y datos ya están completos en disco.
+    """
+
+    def __init__(self, directorio="cadena", politica_fsync="lote", fsync_cada=64,
+                 tamano_segmento=16 * 1024 * 1024, reiniciar=False, solo_lectura=False):
+        if politica_fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync desconocida: {politica_fsync}")
+
+        self.directorio = directorio
+        self.politica_fsync = politica_fsync
+        self.fsync_cada = max(1, fsync_cada)
+        self.tamano_segmento = tamano_segmento
+        self._pendientes = 0
+        self.solo_lectura = solo_lectura
+
+        if solo_lectura:
+            self._indice = None
+            self._segmento = None
+            self._cantidad = self._entradas_completas()
+            return
+
+        os.makedirs(directorio, exist_ok=True)
+        if reiniciar:
+            self._borrar_archivos()
+
+        self._recuperar()
+
+        self._indice = open(self._ruta(NOMBRE_INDICE), "ab")
+        self._segmento = open(self._ruta(_nombre_segmento(self._numero_segmento)), "ab")
+
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def _borrar_archivos(self):
+        for nombre in os.listdir(self.directorio):
+            if nombre == NOMBRE_INDICE or (nombre.startswith("segmento_") and nombre.endswith(".jsonl")):
+                os.remove(self._ruta(nombre))
+
+    def _segmentos_existentes(self):
+        numeros = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith("segmento_") and nombre.endswith(".jsonl"):
+                numeros.append(int(nombre[len("segmento_"):-len(".jsonl")]))
+        return sorted(numeros)
+
+    def _entradas_completas(self):
+        """
+        Cantidad de entradas del índice cuyos datos ya están completos en disco
+        """
+        ruta_indice = self._ruta(NOMBRE_INDICE)
+        if not os.path.exists(ruta_indice):
+            return 0
+
+        tamanos = {n: os.path.getsize(self._ruta(_nombre_segmento(n))) for n in self._segmentos_existentes()}
+        entradas = os.path.getsize(ruta_indice) // FORMATO_INDICE.size
+        with open(ruta_indice, "rb") as indice:
+            while entradas > 0:
+                indice.seek((entradas - 1) * FORMATO_INDICE.size)
+                segmento, offset, longitud = FORMATO_INDICE.unpack(indice.read(FORMATO_INDICE.size))
+                if offset + longitud <= tamanos.get(segmento, -1):
+                    break
+                entradas -= 1
+        return entradas
+
+    def _recuperar(self):
+        """
+        Deja el índice y el último segmento consistentes tras una posible caída
+        """
+        ruta_indice = self._ruta(NOMBRE_INDICE)
+        segmentos = self._segmentos_existentes()
+        self._numero_segmento = segmentos[-1] if segmentos else 0
+
+        entradas = 0
+        if os.path.exists(ruta_indice):
+            entradas = os.path.getsize(ruta_indice) // FORMATO_INDICE.size
+
+        """
+        Descartar entradas del índice que apuntan a datos que no llegaron al disco
+        """
+        tamanos = {n: os.path.getsize(self._ruta(_nombre_segmento(n))) for n in segmentos}
+        fin_indexado = (segmentos[0] if segmentos else 0, 0)
+        with open(ruta_indice, "a+b") as indice:
+            while entradas > 0:
+                indice.seek((entradas - 1) * FORMATO_INDICE.size)
+                segmento, offset, longitud = FORMATO_INDICE.unpack(indice.read(FORMATO_INDICE.size))
+                if offset + longitud <= tamanos.get(segmento, -1):
+                    fin_indexado = (segmento, offset + longitud)
+                    break
+                entradas -= 1
+            indice.truncate(entradas * FORMATO_INDICE.size)
+            self._cantidad = entradas
+
+            """
+            Indexar líneas completas escritas después de la última entrada
+            y truncar una línea final incompleta
+            """
+            for numero in segmentos:
+                if numero < fin_indexado[0]:
+                    continue
+                ruta = self._ruta(_nombre_segmento(numero))
+                offset = fin_indexado[1] if numero == fin_indexado[0] else 0
+                with open(ruta, "r+b") as segmento:
+                    segmento.seek(offset)
+                    for linea in segmento:
+                        if not linea.endswith(b"\n"):
+                            break
+                        indice.write(FORMATO_INDICE.pack(numero, offset, len(linea)))
+                        offset += len(linea)
+                        self._cantidad += 1
+                    segmento.truncate(offset)
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, bloque):
+        """
+        Agrega un bloque al final del registro y devuelve su altura (0-based)
+        """
+        if self.solo_lectura:
+            raise ValueError("El registro de bloques está abierto en solo lectura")
+
+        linea = (json.dumps(bloque, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+        offset = self._segmento.tell()
+        if offset > 0 and offset + len(linea) > self.tamano_segmento:
+            self._rotar()
+            offset = 0
+
+        self._segmento.write(linea)
+        self._indice.write(FORMATO_INDICE.pack(self._numero_segmento, offset, len(linea)))
+        self._cantidad += 1
+
+        self._pendientes += 1
+        if self.politica_fsync == "siempre" or (
+                self.politica_fsync == "lote" and self._pendientes >= self.fsync_cada):
+            self.sincronizar()
+
+        return self._cantidad - 1
+
+    def _rotar(self):
+        """
+        Cierra el segmento actual (persistido) y abre el siguiente
+        """
+        self.sincronizar()
+        self._segmento.close()
+        self._numero_segmento += 1
+        self._segmento = open(self._ruta(_nombre_segmento(self._numero_segmento)), "ab")
+
+    def sincronizar(self):
+        """
+        Fuerza a disco los datos y luego el índice
+        """
+        if self.politica_fsync == "nunca":
+            self._segmento.flush()
+            self._indice.flush()
+        else:
+            _fsync(self._segmento)
+            _fsync(self._indice)
+        self._pendientes = 0
+
+    def cerrar(self):
+        if self._segmento is None or self._segmento.closed:
+            return
+        self.sincronizar()
+        self._segmento.close()
+        self._indice.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def _vaciar_buffers(self):
+        """
+        Hace visibles para la lectura los bytes aún en el buffer de escritura
+        """
+        if self._segmento is not None and not self._segmento.closed:
+            self._segmento.flush()
+            self._indice.flush()
+
+    def _entrada_indice(self, altura):
+        self._vaciar_buffers()
+        with open(self._ruta(NOMBRE_INDICE), "rb") as indice:
+            indice.seek(altura * FORMATO_INDICE.size)
+            return FORMATO_INDICE.unpack(indice.read(FORMATO_INDICE.size))
+
+    def leer_bloque(self, altura):
+        """
+        Lee el bloque `altura` con un acceso directo vía índice, sin recorrer la cadena
+        """
+        if not 0 <= altura < self._cantidad:
+            raise IndexError(f"Bloque {altura} fuera de rango (0..{self._cantidad - 1})")
+
+        segmento, offset, longitud = self._entrada_indice(altura)
+        with open(self._ruta(_nombre_segmento(segmento)), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(longitud))
+
+    def iterar_bloques(self, desde=0):
+        """
+        Recorre los bloques en orden a partir de la altura `desde`
+        """
+        if desde >= self._cantidad:
+            return
+
+        segmento_inicial, offset, _ = self._entrada_indice(desde)
+        restantes = self._cantidad - desde
+
+        for numero in self._segmentos_existentes():
+            if numero < segmento_inicial:
+                continue
+            with open(self._ruta(_nombre_segmento(numero)), "rb") as f:
+                if numero == segmento_inicial:
+                    f.seek(offset)
+                for linea in f:
+                    if restantes == 0:
+                        return
+                    yield json.loads(linea)
+                    restantes -= 1
+
+    def exportar_json(self, ruta="blockchain.json"):
+        """
+        Genera el blockchain.json compatible (lista JSON con indent=2), en
+        streaming y reemplazando el archivo de forma atómica
+        """
+        escribir_json_bloques(self.iterar_bloques(), ruta)
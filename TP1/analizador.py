@@ -2,10 +2,13 @@
 Procesos Analizadores - Procesan señales biométricas específicas
 Mantienen ventana móvil de 30 segundos y calculan estadísticas
 """
-import numpy as np
-from collections import deque
+import os
+import time
 from multiprocessing import Queue
 
+from estadisticas import EstadisticasExtendidas, EstadisticasPacientes, EstadisticasVentana
+from metricas import Instrumentacion, SalidaLimitada
+
 def extraer_valor_senal(datos, tipo_senal):
     """
     Extrae el valor específico según el tipo de señal
@@ -19,63 +22,340 @@ def extraer_valor_senal(datos, tipo_senal):
     else:
         raise ValueError(f"Tipo de señal desconocido: {tipo_senal}")
 
-def proceso_analizador(pipe_entrada, queue_salida, tipo_senal):
+class LoteResultados:
     """
-    Analizador que procesa una señal específica
+    Acumula resultados en formato columnar (una lista por campo) para
+    enviarlos al verificador en un solo mensaje: un pickle, un lock y una
+    escritura en la Queue por lote en lugar de por muestra
     """
-    print(f"Analizador {tipo_senal} iniciado")
-    
-    ventana = deque(maxlen=30)  
-    """ 
-    Automáticamente mantiene solo 30 elementos 
+
+    def __init__(self, tipo_senal, tamano=32, espera_max=0.05):
+        self.tipo_senal = tipo_senal
+        self.tamano = max(1, tamano)
+        self.espera_max = espera_max
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.seq = []
+        self.timestamp = []
+        self.media = []
+        self.desv = []
+        self.t_gen = []
+        self.t_ana = []
+        self.extra = []
+        self.inicio = None
+
+    def __len__(self):
+        return len(self.seq)
+
+    def agregar(self, seq, timestamp, media, desv, t_gen=None, t_ana=None, extra=None):
+        if not self.seq:
+            self.inicio = time.monotonic()
+        self.seq.append(seq)
+        self.timestamp.append(timestamp)
+        self.media.append(media)
+        self.desv.append(desv)
+        self.t_gen.append(t_gen)
+        self.t_ana.append(t_ana)
+        self.extra.append(extra)
+
+    def lleno(self):
+        return len(self.seq) >= self.tamano
+
+    def tiempo_restante(self):
+        """
+        Segundos hasta que vence la espera máxima del lote (None si está vacío)
+        """
+        if not self.seq:
+            return None
+        return max(0.0, self.inicio + self.espera_max - time.monotonic())
+
+    def vaciar(self):
+        """
+        Devuelve el mensaje con el lote (None si está vacío) y lo vacía
+        """
+        if not self.seq:
+            return None
+        mensaje = {
+            "tipo": self.tipo_senal,
+            "lote": True,
+            "seq": self.seq,
+            "timestamp": self.timestamp,
+            "media": self.media,
+            "desv": self.desv,
+            "t_gen": self.t_gen,
+            "t_ana": self.t_ana,
+            "extra": self.extra
+        }
+        self._reiniciar()
+        return mensaje
+
+def iterar_resultados(mensaje):
+    """
+    Desarma un mensaje del analizador (lote columnar o resultado individual)
+    en resultados individuales con el formato de consignas, más los
+    instantes de generación y análisis para las métricas y las estadísticas
+    extendidas (None si el analizador no las calcula)
+    """
+    if not mensaje.get("lote"):
+        yield mensaje
+        return
+
+    tipo = mensaje["tipo"]
+    extra = mensaje.get("extra") or [None] * len(mensaje["seq"])
+    for seq, timestamp, media, desv, t_gen, t_ana, estadisticas in zip(
+            mensaje["seq"], mensaje["timestamp"], mensaje["media"], mensaje["desv"],
+            mensaje["t_gen"], mensaje["t_ana"], extra):
+        yield {"tipo": tipo, "seq": seq, "timestamp": timestamp, "media": media, "desv": desv,
+               "t_gen": t_gen, "t_ana": t_ana, "extra": estadisticas}
+
+class EtapaAnalizador:
+    """
+    Lógica del analizador de una señal, independiente del transporte: recibe
+    muestras y devuelve los mensajes a enviar al verificador. La usan tanto
+    proceso_analizador (proceso o hilo, con canales bloqueantes) como la
+    tarea de asyncio de ejecucion.py.
+
+    Los resultados se envían en lotes de hasta `tamano_lote`, o antes si el
+    primero del lote lleva `espera_lote` segundos esperando.
+    Mide la latencia de transporte y de análisis de cada muestra y se la
+    envía al verificador junto con el aviso de fin.
+
+    Con `extendidas` además calcula en forma incremental mediana,
+    `percentiles`, mínimo, máximo y una EWMA de factor `alfa_ewma`
+    (EstadisticasExtendidas), que se agregan a los `datos` del bloque.
+
+    Con un `checkpoint` (supervision.CheckpointVentana) guarda el estado de
+    la ventana cada `checkpoint_cada` lotes, cuando quien usa la etapa
+    confirma con enviados() que los mandó: así el checkpoint nunca queda
+    adelantado respecto de lo que recibió el verificador. Si es un reinicio
+    (`reinicio`: instante en que se detectó la caída) retoma ese estado,
+    sin recalcular ni repetir muestras
+    """
+
+    def __init__(self, tipo_senal, tamano_ventana=30, tamano_lote=32, espera_lote=0.05,
+                 detallado=False, intervalo_log=1.0, checkpoint=None, checkpoint_cada=1,
+                 reinicio=None, extendidas=False, percentiles=(50, 90), alfa_ewma=0.1):
+        print(f"Analizador {tipo_senal} iniciado (ventana={tamano_ventana}, lote={tamano_lote}, "
+              f"{'estadísticas extendidas, ' if extendidas else ''}pid={os.getpid()})")
+        
+        self.tipo_senal = tipo_senal
+        self.extendidas = extendidas
+        if extendidas:
+            self.ventana = EstadisticasExtendidas(tamano_ventana, percentiles=percentiles, alfa=alfa_ewma)
+        else:
+            self.ventana = EstadisticasVentana(tamano_ventana)
+        """ 
+        Mantiene solo las últimas `tamano_ventana` muestras y actualiza
+        media/desviación en O(1) por muestra
+        """
+        self.contador_muestras = 0
+        self.checkpoint = checkpoint
+        self.checkpoint_cada = max(1, checkpoint_cada)
+        self.lotes_enviados = 0
+        
+        if checkpoint is not None and reinicio is not None:
+            procesadas = checkpoint.restaurar(self.ventana)
+            recuperacion = (time.monotonic() - reinicio) * 1000
+            if procesadas is None:
+                print(f"♻️  Analizador {tipo_senal} reiniciado sin checkpoint: ventana vacía "
+                      f"(recuperación: {recuperacion:.1f} ms)")
+            else:
+                self.contador_muestras = procesadas
+                print(f"♻️  Analizador {tipo_senal} reanudado en la muestra {procesadas} con "
+                      f"{len(self.ventana)} muestras en la ventana (recuperación: {recuperacion:.1f} ms)")
+        
+        self.lote = LoteResultados(tipo_senal, tamano_lote, espera_lote)
+        self.instrumentacion = Instrumentacion()
+        self.salida = SalidaLimitada(intervalo_log, detallado)
+
+    def tiempo_restante(self):
+        """
+        Si hay un lote pendiente, cuánto esperar la próxima muestra antes de
+        enviarlo igual (None: esperar sin límite)
+        """
+        return self.lote.tiempo_restante()
+
+    def _vaciar_lote(self):
+        """
+        Mensajes con el lote pendiente (ninguno si está vacío)
+        """
+        mensaje = self.lote.vaciar()
+        return [] if mensaje is None else [mensaje]
+
+    def vencer(self):
+        """
+        Venció la espera del lote sin recibir muestras: enviarlo
+        """
+        return self._vaciar_lote()
+
+    def procesar(self, datos):
+        """
+        Procesa una muestra y devuelve los mensajes a enviar (el lote, si se
+        completó)
+        """
+        recibida = time.monotonic()
+        t_gen = datos.get("t_gen")
+        self.contador_muestras += 1
+        valor = extraer_valor_senal(datos, self.tipo_senal)
+        
+        ventana = self.ventana
+        ventana.agregar(valor)
+        
+        """
+        Estadísticas de la ventana actual (ya actualizadas incrementalmente)
+        """
+        mensajes = []
+        if len(ventana) > 0:  
+            media = ventana.media
+            desviacion = ventana.desviacion
+            extra = ventana.resumen() if self.extendidas else None
+            
+            analizada = time.monotonic()
+            if t_gen:
+                self.instrumentacion.registrar("transporte", recibida - t_gen, recibida)
+            self.instrumentacion.registrar("analisis", analizada - recibida, analizada)
+            
+            """
+            Acumular el resultado y enviar el lote al verificador si se completó
+            """
+            self.lote.agregar(datos["seq"], datos["timestamp"], media, desviacion, t_gen, analizada, extra)
+            if self.lote.lleno():
+                mensajes = self._vaciar_lote()
+            
+            if self.salida.permite():
+                detalle = (f", mediana={extra['mediana']:.2f}, min={extra['min']:g}, max={extra['max']:g}, "
+                           f"ewma={extra['ewma']:.2f}" if extra else "")
+                self.salida.imprimir(f"{self.tipo_senal.capitalize()} - Muestra {self.contador_muestras}: "
+                                     f"valor={valor}, media={media:.2f}, desv={desviacion:.2f}{detalle}, "
+                                     f"ventana_size={len(ventana)}")
+        return mensajes
+
+    def enviados(self, mensajes):
+        """
+        Los `mensajes` de procesar() o vencer() ya se enviaron. Cada
+        `checkpoint_cada` lotes guarda la ventana: con el lote recién
+        vaciado, refleja exactamente las muestras que el verificador recibió
+        """
+        if not mensajes:
+            return
+        self.lotes_enviados += len(mensajes)
+        if self.checkpoint is not None and self.lotes_enviados % self.checkpoint_cada < len(mensajes):
+            self.checkpoint.guardar(self.ventana, self.contador_muestras)
+
+    def finalizar(self):
+        """
+        Fin del flujo: lo pendiente más el aviso al verificador de que este
+        analizador no enviará más resultados
+        """
+        print(f"Analizador {self.tipo_senal} terminando...")
+        mensajes = self._vaciar_lote()
+        mensajes.append({"tipo": self.tipo_senal, "fin": True, "metricas": self.instrumentacion})
+        return mensajes
+
+def proceso_analizador(pipe_entrada, queue_salida, tipo_senal, tamano_ventana=30,
+                       tamano_lote=32, espera_lote=0.05, detallado=False, intervalo_log=1.0,
+                       checkpoint=None, checkpoint_cada=1, reinicio=None, extendidas=False,
+                       percentiles=(50, 90), alfa_ewma=0.1):
     """
-    contador_muestras = 0
+    Analizador que procesa una señal específica (ver EtapaAnalizador).
+    `pipe_entrada` es cualquier canal con `recv` y `poll` (Pipe, lector de
+    memoria compartida o canal entre hilos) y `queue_salida` cualquier cola
+    con `put`. Con un checkpoint, un reinicio sigue leyendo del mismo canal.
+    Un error termina el proceso con código distinto de 0 para que el
+    supervisor lo reinicie
+    """
+    etapa = EtapaAnalizador(tipo_senal, tamano_ventana, tamano_lote, espera_lote,
+                            detallado, intervalo_log, checkpoint, checkpoint_cada, reinicio,
+                            extendidas, percentiles, alfa_ewma)
     
     while True:
         try:
-            datos = pipe_entrada.recv()
+            restante = etapa.tiempo_restante()
+            if restante is not None and not pipe_entrada.poll(restante):
+                mensajes = etapa.vencer()
+            else:
+                datos = pipe_entrada.recv()
+                if datos is None:
+                    for mensaje in etapa.finalizar():
+                        queue_salida.put(mensaje)
+                    break
+                mensajes = etapa.procesar(datos)
             
+            for mensaje in mensajes:
+                queue_salida.put(mensaje)
+            etapa.enviados(mensajes)
+            
+        except Exception as e:
+            print(f"Error en analizador {tipo_senal}: {e}")
+            raise
+    
+    print(f"Analizador {tipo_senal} finalizado")
+
+SENALES = ("frecuencia", "presion", "oxigeno")
+
+def proceso_analizador_pacientes(pipe_entrada, queue_salida, inicio, fin, tamano_ventana=30,
+                                 detallado=False, intervalo_log=1.0):
+    """
+    Analizador de un fragmento de pacientes [inicio, fin): mantiene una
+    ventana 2-D (pacientes × ventana) por señal y en cada tick actualiza las
+    estadísticas de todos sus pacientes con operaciones vectorizadas.
+    Envía un mensaje por tick con un arreglo de medias y desvíos por señal
+    """
+    nombre = f"pacientes {inicio}-{fin - 1}"
+    print(f"Analizador {nombre} iniciado (ventana={tamano_ventana})")
+
+    ventanas = {senal: EstadisticasPacientes(fin - inicio, tamano_ventana) for senal in SENALES}
+    instrumentacion = Instrumentacion()
+    salida = SalidaLimitada(intervalo_log, detallado)
+    ticks = 0
+
+    while True:
+        try:
+            datos = pipe_entrada.recv()
+
             if datos is None:
-                print(f"Analizador {tipo_senal} terminando...")
+                print(f"Analizador {nombre} terminando...")
+                queue_salida.put({"tipo": "pacientes", "fragmento": (inicio, fin), "fin": True,
+                                  "metricas": instrumentacion})
                 break
-            
-            contador_muestras += 1
-            valor = extraer_valor_senal(datos, tipo_senal)
-            
-            ventana.append(valor)
-            
+
+            recibida = time.monotonic()
+
             """
-            Calcular estadísticas sobre la ventana actual
+            Mismo valor por señal que extraer_valor_senal (presión: sistólica)
             """
-            if len(ventana) > 0:  
-                valores_array = np.array(list(ventana))
-                media = float(np.mean(valores_array))
-                desviacion = float(np.std(valores_array))
-                
-                """
-                Crear resultado según formato de consignas
-                """
-                resultado = {
-                    "tipo": tipo_senal,
-                    "timestamp": datos["timestamp"],
-                    "media": media,
-                    "desv": desviacion
-                }
-                
-                """
-                Envia al verificador
-                """
-                queue_salida.put(resultado)
-                
-                print(f"{tipo_senal.capitalize()} - Muestra {contador_muestras}: "
-                      f"valor={valor}, media={media:.2f}, desv={desviacion:.2f}, "
-                      f"ventana_size={len(ventana)}")
-            
+            ventanas["frecuencia"].agregar(datos["frecuencia"])
+            ventanas["presion"].agregar(datos["presion"][:, 0])
+            ventanas["oxigeno"].agregar(datos["oxigeno"])
+            ticks += 1
+
+            analizada = time.monotonic()
+            if datos.get("t_gen"):
+                instrumentacion.registrar("transporte", recibida - datos["t_gen"], recibida)
+            instrumentacion.registrar("analisis", analizada - recibida, analizada)
+
+            queue_salida.put({
+                "tipo": "pacientes",
+                "seq": datos["seq"],
+                "timestamp": datos["timestamp"],
+                "pacientes": (inicio, fin),
+                "media": {senal: ventana.media.copy() for senal, ventana in ventanas.items()},
+                "desv": {senal: ventana.desviacion for senal, ventana in ventanas.items()},
+                "t_gen": datos.get("t_gen"),
+                "t_ana": analizada
+            })
+
+            if salida.permite():
+                salida.imprimir(f"Analizador {nombre} - Tick {ticks}: "
+                                f"FC media={ventanas['frecuencia'].media.mean():.2f}, "
+                                f"ventana_size={len(ventanas['frecuencia'])}")
+
         except Exception as e:
-            print(f"Error en analizador {tipo_senal}: {e}")
+            print(f"Error en analizador {nombre}: {e}")
             break
-    
-    print(f"Analizador {tipo_senal} finalizado")
+
+    print(f"Analizador {nombre} finalizado")
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+Benchmark de Modos de Ejecución - Compara procesos, hilos y asyncio
+Ejecuta el sistema completo en cada modo y resume throughput y latencias por etapa
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ejecucion import MODOS
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+def ejecutar_modo(modo, muestras, tasa, velocidad, extra=()):
+    """
+    Ejecuta main.py en el modo indicado dentro de un directorio temporal
+    (así no pisa la cadena ni blockchain.json del directorio actual).
+    Devuelve (segundos de reloj, métricas por etapa) o lanza RuntimeError
+    """
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as directorio:
+        ruta_metricas = os.path.join(directorio, "metricas.json")
+        comando = [sys.executable, MAIN, "--modo", modo, "--muestras", str(muestras),
+                   "--tasa", str(tasa), "--velocidad", str(velocidad),
+                   "--intervalo-metricas", "0", "--metricas", ruta_metricas, *extra]
+
+        inicio = time.monotonic()
+        proceso = subprocess.run(comando, cwd=directorio, stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE, text=True)
+        transcurrido = time.monotonic() - inicio
+
+        if proceso.returncode != 0 or not os.path.exists(ruta_metricas):
+            raise RuntimeError(f"modo {modo} falló (código {proceso.returncode}): "
+                               f"{proceso.stderr.strip()[-500:]}")
+        with open(ruta_metricas, "r", encoding="utf-8") as f:
+            return transcurrido, json.load(f)
+
+def medir(modo, repeticiones, muestras, tasa, velocidad, extra=()):
+    """
+    Repite la ejecución y se queda con la de tiempo mediano
+    """
+    corridas = sorted((ejecutar_modo(modo, muestras, tasa, velocidad, extra) for _ in range(repeticiones)),
+                      key=lambda corrida: corrida[0])
+    transcurrido, metricas = corridas[len(corridas) // 2]
+    total = metricas["total"]
+    return {
+        "modo": modo,
+        "segundos": transcurrido,
+        "segundos_todas": [corrida[0] for corrida in corridas],
+        "bloques": total["cantidad"],
+        "bloques_por_segundo": total["throughput"],
+        "etapas": metricas
+    }
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Benchmark de los modos de ejecución (procesos, hilos, asyncio)")
+    parser.add_argument("-n", "--muestras", type=int, default=5000,
+                        help="Muestras por ejecución (default: 5000)")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS),
+                        help="Modos a comparar (default: todos)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Ejecuciones por modo; se informa la de tiempo mediano (default: 3)")
+    parser.add_argument("-r", "--tasa", type=float, default=1000.0,
+                        help="Muestras por segundo simulado (default: 1000)")
+    parser.add_argument("--velocidad", type=float, default=0,
+                        help="Factor de velocidad: 0 mide el throughput máximo; con 1 el sistema "
+                             "recibe `--tasa` muestras/s reales y las latencias no incluyen "
+                             "la espera en colas saturadas (default: 0)")
+    parser.add_argument("--json", action="store_true",
+                        help="Mostrar los resultados en JSON")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="Opciones adicionales para main.py, después de --")
+    return parser.parse_args()
+
+def main():
+    args = parsear_argumentos()
+    extra = [opcion for opcion in args.extra if opcion != "--"]
+
+    resultados = []
+    for modo in args.modos:
+        if not args.json:
+            print(f"⏱️  {modo}: {args.repeticiones} ejecuciones de {args.muestras} muestras...")
+        try:
+            resultados.append(medir(modo, max(1, args.repeticiones), args.muestras,
+                                    args.tasa, args.velocidad, extra))
+        except RuntimeError as e:
+            print(f"❌ Error: {e}")
+            return
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        return
+
+    print()
+    print(f"{'modo':<10} {'tiempo':>8} {'bloques/s':>10} {'total p50':>10} {'total p99':>10} "
+          f"{'transp. p50':>12} {'cola p50':>9} {'dispersión':>11}")
+    for resultado in resultados:
+        etapas = resultado["etapas"]
+        dispersion = statistics.pstdev(resultado["segundos_todas"]) if len(resultado["segundos_todas"]) > 1 else 0.0
+        print(f"{resultado['modo']:<10} {resultado['segundos']:>7.2f}s {resultado['bloques_por_segundo']:>10.1f} "
+              f"{etapas['total']['p50'] * 1000:>8.2f}ms {etapas['total']['p99'] * 1000:>8.2f}ms "
+              f"{etapas['transporte']['p50'] * 1000:>10.3f}ms {etapas['cola']['p50'] * 1000:>7.2f}ms "
+              f"{dispersion:>10.2f}s")
+
+    base = resultados[0]
+    for resultado in resultados[1:]:
+        if resultado["segundos"] > 0:
+            print(f"   {resultado['modo']} vs {base['modo']}: x{base['segundos'] / resultado['segundos']:.2f} en tiempo total")
+
+if __name__ == "__main__":
+    main()
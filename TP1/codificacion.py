@@ -0,0 +1,168 @@
+"""
+Codificación Canónica de Bloques - Qué bytes se hashean en cada versión de bloque
+v1 (legado): prev_hash + str(datos) + timestamp; v2: codificación binaria canónica, sin depender del orden de las claves
+"""
+import hashlib
+import math
+import struct
+
+"""
+Los bloques v1 no tienen la clave "version" (cadenas generadas antes de
+la v2); los nuevos llevan "version": 2 y se hashean con la codificación
+canónica
+"""
+VERSION_LEGADO = 1
+VERSION_ACTUAL = 2
+VERSIONES = (VERSION_LEGADO, VERSION_ACTUAL)
+
+"""
+Contenido hasheado en v2, en este orden y sin separadores:
+- MAGICO_V2 (8 bytes): identifica la versión, así un bloque no puede
+  cambiar de versión sin cambiar su hash
+- esquema de `datos`: estructura y tipos, con las claves ordenadas
+- prev_hash crudo (32 bytes)
+- valores de `datos` en el orden del esquema
+- timestamp en UTF-8 (el resto del contenido)
+
+Esquema: un dict es "{" + (longitud u16 + clave UTF-8 + esquema del valor)
+por cada clave ordenada + "}"; float "d", int "q", bool "?", str "s",
+None "n". Valores: float64 e int64 little-endian (NaN con una sola
+representación), bool 1 byte, str longitud u32 + UTF-8
+"""
+MAGICO_V2 = b"BIOHASH\x02"
+FORMATO_LONGITUD_CLAVE = struct.Struct("<H")
+FORMATO_LONGITUD_TEXTO = struct.Struct("<I")
+FORMATO_FLOAT = struct.Struct("<d")
+FORMATO_INT = struct.Struct("<q")
+
+"""
+Plantillas de las formas de `datos` habituales (dict de dicts de
+floats, como las estadísticas de cada señal): prefijo (mágico + esquema),
+claves de los valores en orden y un Struct que empaqueta prev_hash y
+todos los valores de una vez
+"""
+_PLANTILLAS = {}
+
+def _esquema(valor, esquema, valores):
+    if type(valor) is dict:
+        esquema.append(b"{")
+        for clave in sorted(valor):
+            if type(clave) is not str:
+                raise ValueError(f"Clave no codificable: {clave!r}")
+            crudo = clave.encode("utf-8")
+            esquema.append(FORMATO_LONGITUD_CLAVE.pack(len(crudo)) + crudo)
+            _esquema(valor[clave], esquema, valores)
+        esquema.append(b"}")
+    elif type(valor) is float:
+        esquema.append(b"d")
+        valores.append(FORMATO_FLOAT.pack(math.nan if valor != valor else valor))
+    elif type(valor) is bool:
+        esquema.append(b"?")
+        valores.append(bytes([valor]))
+    elif type(valor) is int:
+        esquema.append(b"q")
+        try:
+            valores.append(FORMATO_INT.pack(valor))
+        except struct.error:
+            raise ValueError(f"Entero no codificable: {valor!r}")
+    elif type(valor) is str:
+        esquema.append(b"s")
+        crudo = valor.encode("utf-8")
+        valores.append(FORMATO_LONGITUD_TEXTO.pack(len(crudo)) + crudo)
+    elif valor is None:
+        esquema.append(b"n")
+    else:
+        raise ValueError(f"Valor no codificable: {valor!r}")
+
+def codificar_datos(datos):
+    """
+    (esquema, valores) de `datos` en la codificación canónica v2
+    """
+    esquema = []
+    valores = []
+    _esquema(datos, esquema, valores)
+    return b"".join(esquema), b"".join(valores)
+
+def plantilla(datos):
+    """
+    Plantilla para los `datos` con forma de dict de dicts de floats, o
+    None si tienen otra forma. Devuelve (prefijo, claves, estructura):
+    el contenido v2 es prefijo + estructura.pack(prev_hash crudo, *valores
+    en el orden de `claves`) + timestamp
+    """
+    try:
+        forma = (tuple(datos), *map(tuple, datos.values()))
+    except TypeError:
+        return None
+
+    encontrada = _PLANTILLAS.get(forma)
+    if encontrada is None:
+        if not all(type(campos) is dict and all(type(v) is float for v in campos.values())
+                   for campos in datos.values()):
+            return None
+        esquema, _ = codificar_datos(datos)
+        claves = tuple((senal, campo) for senal in sorted(datos) for campo in sorted(datos[senal]))
+        encontrada = (MAGICO_V2 + esquema, claves, struct.Struct(f"<32s{len(claves)}d"))
+        _PLANTILLAS[forma] = encontrada
+    return encontrada
+
+def codificar_bloque(prev_hash, datos, timestamp):
+    """
+    Contenido completo que se hashea en v2 (para inspección y pruebas;
+    `hash_v2` lo pasa a hashlib por partes, sin armarlo)
+    """
+    esquema, valores = codificar_datos(datos)
+    return MAGICO_V2 + esquema + bytes.fromhex(prev_hash) + valores + timestamp.encode("utf-8")
+
+def hash_v1(prev_hash, datos, timestamp):
+    """
+    Hash de las consignas: depende del orden de inserción de las claves
+    de `datos` y del repr de cada float
+    """
+    contenido = prev_hash + str(datos) + timestamp
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+def hash_v2(prev_hash, datos, timestamp):
+    """
+    SHA-256 de la codificación canónica. Con la forma habitual de `datos`
+    se usa la plantilla: un solo struct.pack para prev_hash y los valores
+    """
+    encontrada = plantilla(datos)
+    if encontrada is not None:
+        prefijo, claves, estructura = encontrada
+        try:
+            valores = [datos[senal][campo] for senal, campo in claves]
+        except (KeyError, TypeError):
+            valores = None
+        if valores is not None and all(type(v) is float and v == v for v in valores):
+            h = hashlib.sha256(prefijo)
+            h.update(estructura.pack(bytes.fromhex(prev_hash), *valores))
+            h.update(timestamp.encode("utf-8"))
+            return h.hexdigest()
+
+    esquema, valores = codificar_datos(datos)
+    h = hashlib.sha256(MAGICO_V2)
+    h.update(esquema)
+    h.update(bytes.fromhex(prev_hash))
+    h.update(valores)
+    h.update(timestamp.encode("utf-8"))
+    return h.hexdigest()
+
+def calcular_hash(prev_hash, datos, timestamp, version=VERSION_LEGADO):
+    """
+    Hash de un bloque según su versión (por defecto, la de consignas)
+    """
+    if version == VERSION_ACTUAL:
+        return hash_v2(prev_hash, datos, timestamp)
+    if version == VERSION_LEGADO:
+        return hash_v1(prev_hash, datos, timestamp)
+    raise ValueError(f"Versión de bloque no soportada: {version!r}")
+
+def version_bloque(bloque):
+    return bloque.get("version", VERSION_LEGADO)
+
+def hash_bloque(bloque):
+    """
+    Recalcula el hash de un bloque (dict) con la versión que declara
+    """
+    return calcular_hash(bloque["prev_hash"], bloque["datos"], bloque["timestamp"], version_bloque(bloque))
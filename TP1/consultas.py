@@ -0,0 +1,387 @@
+"""
+Índice de Consultas - Búsquedas por rango de tiempo, alertas y hash sobre la cadena
+Se construye junto al registro de bloques y solo lee del disco los bloques que coinciden
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time as hora
+
+import numpy as np
+
+from almacenamiento import RegistroBloques
+from merkle import es_checkpoint
+
+ARCHIVO_TIEMPOS = "consulta_tiempos.bin"   # float64 por bloque (segundos desde epoch, ordenados)
+ARCHIVO_ALERTAS = "consulta_alertas.bin"   # bitmap: 1 bit por bloque
+ARCHIVO_HASHES = "consulta_hashes.bin"     # hash SHA-256 crudo (32 bytes) por bloque
+ARCHIVO_HASHES_ORDENADOS = "consulta_hashes_orden.bin"  # (hash, altura) ordenados por hash
+
+FORMATO_TIEMPO = struct.Struct("<d")
+TAMANO_HASH = 32
+FORMATO_ALTURA = struct.Struct("<Q")
+TAMANO_ORDENADO = TAMANO_HASH + FORMATO_ALTURA.size
+REGISTRO_ORDENADO = np.dtype([("hash", "S32"), ("altura", "<u8")])
+
+# Hashes sin ordenar que se acumulan antes de fusionarlos con la columna
+# ordenada (como mínimo; después, 1/8 de lo ya ordenado)
+FUSION_MINIMA = 4096
+
+EPOCH = datetime(1970, 1, 1)
+
+def segundos_epoch(timestamp):
+    """
+    Convierte un timestamp ISO (sin zona horaria) a segundos desde epoch
+    """
+    return (datetime.fromisoformat(timestamp) - EPOCH).total_seconds()
+
+class IndiceConsultas:
+    """
+    Índice columnar de la cadena, con un archivo por columna:
+    - tiempos ordenados (búsqueda binaria por rango de tiempo)
+    - bitmap de alertas (filtro de alertas dentro de un rango)
+    - hashes crudos, en orden de altura
+    - pares (hash, altura) ordenados por hash (búsqueda binaria por hash)
+
+    La columna ordenada cubre las primeras alturas; los hashes agregados
+    después se buscan en la cola de la columna de hashes y se fusionan con
+    la ordenada cuando la cola crece (FUSION_MINIMA o 1/8 de lo ordenado).
+
+    Al abrir en modo escritura se pone al día con el registro de bloques
+    (por ejemplo, si el proceso se cayó antes de escribir el índice).
+    """
+
+    def __init__(self, directorio="cadena", registro=None, solo_lectura=False, flush_cada=64):
+        self.directorio = directorio
+        self.solo_lectura = solo_lectura
+        self.flush_cada = max(1, flush_cada)
+        self._pendientes = 0
+        self._mapas = {}
+
+        if solo_lectura:
+            self._cantidad = self._cantidad_en_disco()
+            if registro is not None:
+                self._cantidad = min(self._cantidad, len(registro))
+            self._ordenados = min(self._cantidad, self._tamano(ARCHIVO_HASHES_ORDENADOS) // TAMANO_ORDENADO)
+            return
+
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in (ARCHIVO_TIEMPOS, ARCHIVO_ALERTAS, ARCHIVO_HASHES, ARCHIVO_HASHES_ORDENADOS):
+            open(self._ruta(nombre), "ab").close()
+
+        self._cantidad = self._cantidad_en_disco()
+        if registro is not None and len(registro) < self._cantidad:
+            self._cantidad = len(registro)
+        self._truncar(self._cantidad)
+        self._ordenados = self._recortar_ordenados(self._cantidad)
+
+        self._tiempos = open(self._ruta(ARCHIVO_TIEMPOS), "ab")
+        self._hashes = open(self._ruta(ARCHIVO_HASHES), "ab")
+        self._alertas = open(self._ruta(ARCHIVO_ALERTAS), "r+b")
+        self._byte_alertas = 0
+        if self._cantidad % 8:
+            self._alertas.seek(self._cantidad // 8)
+            self._byte_alertas = self._alertas.read(1)[0] & ((1 << (self._cantidad % 8)) - 1)
+
+        if registro is not None:
+            for bloque in registro.iterar_bloques(self._cantidad):
+                self.agregar(bloque)
+        if self._cola_grande():
+            self._fusionar()
+
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def _tamano(self, nombre):
+        ruta = self._ruta(nombre)
+        return os.path.getsize(ruta) if os.path.exists(ruta) else 0
+
+    def _cantidad_en_disco(self):
+        return min(
+            self._tamano(ARCHIVO_TIEMPOS) // FORMATO_TIEMPO.size,
+            self._tamano(ARCHIVO_HASHES) // TAMANO_HASH,
+            self._tamano(ARCHIVO_ALERTAS) * 8
+        )
+
+    def _truncar(self, cantidad):
+        """
+        Deja las tres columnas con exactamente `cantidad` bloques
+        """
+        with open(self._ruta(ARCHIVO_TIEMPOS), "r+b") as f:
+            f.truncate(cantidad * FORMATO_TIEMPO.size)
+        with open(self._ruta(ARCHIVO_HASHES), "r+b") as f:
+            f.truncate(cantidad * TAMANO_HASH)
+        with open(self._ruta(ARCHIVO_ALERTAS), "r+b") as f:
+            f.truncate((cantidad + 7) // 8)
+
+    def _recortar_ordenados(self, cantidad):
+        """
+        Deja en la columna ordenada solo las alturas menores que `cantidad`
+        y devuelve cuántas cubre
+        """
+        ordenados = self._tamano(ARCHIVO_HASHES_ORDENADOS) // TAMANO_ORDENADO
+        if ordenados <= cantidad:
+            return ordenados
+        registros = np.fromfile(self._ruta(ARCHIVO_HASHES_ORDENADOS), dtype=REGISTRO_ORDENADO, count=ordenados)
+        self._reemplazar_ordenados(registros[registros["altura"] < cantidad])
+        return cantidad
+
+    def _reemplazar_ordenados(self, registros):
+        ruta = self._ruta(ARCHIVO_HASHES_ORDENADOS)
+        registros.tofile(ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, bloque):
+        """
+        Agrega al índice el bloque siguiente de la cadena
+        """
+        altura = self._cantidad
+
+        self._tiempos.write(FORMATO_TIEMPO.pack(segundos_epoch(bloque["timestamp"])))
+        self._hashes.write(bytes.fromhex(bloque["hash"]))
+
+        if altura % 8 == 0:
+            self._byte_alertas = 0
+        if bloque.get("alerta", False):
+            self._byte_alertas |= 1 << (altura % 8)
+        self._alertas.seek(altura // 8)
+        self._alertas.write(bytes([self._byte_alertas]))
+
+        self._cantidad += 1
+
+        self._pendientes += 1
+        if self._cola_grande():
+            self._fusionar()
+        elif self._pendientes >= self.flush_cada:
+            self.flush()
+
+    def _cola_grande(self):
+        return self._cantidad - self._ordenados >= max(FUSION_MINIMA, self._ordenados // 8)
+
+    def _fusionar(self):
+        """
+        Ordena la cola de hashes y la intercala con la columna ordenada
+        (O(n) por fusión; como la cola crece con lo ordenado, es O(1)
+        amortizado por bloque)
+        """
+        self.flush()
+        cola = np.empty(self._cantidad - self._ordenados, dtype=REGISTRO_ORDENADO)
+        cola["hash"] = np.fromfile(self._ruta(ARCHIVO_HASHES), dtype="S32", count=len(cola),
+                                   offset=self._ordenados * TAMANO_HASH)
+        cola["altura"] = np.arange(self._ordenados, self._cantidad)
+        cola.sort(order="hash", kind="stable")
+
+        ordenados = np.fromfile(self._ruta(ARCHIVO_HASHES_ORDENADOS), dtype=REGISTRO_ORDENADO,
+                                count=self._ordenados)
+        posiciones = np.searchsorted(ordenados["hash"], cola["hash"], side="right")
+        self._soltar(ARCHIVO_HASHES_ORDENADOS)
+        self._reemplazar_ordenados(np.insert(ordenados, posiciones, cola))
+        self._ordenados = self._cantidad
+
+    def flush(self):
+        self._tiempos.flush()
+        self._hashes.flush()
+        self._alertas.flush()
+        self._pendientes = 0
+
+    def cerrar(self):
+        for nombre in list(self._mapas):
+            self._soltar(nombre)
+        if not self.solo_lectura and not self._tiempos.closed:
+            self.flush()
+            self._tiempos.close()
+            self._hashes.close()
+            self._alertas.close()
+
+    def _mapear(self, nombre, tamano):
+        """
+        Mapea en memoria los primeros `tamano` bytes de una columna. El mapa
+        se reutiliza mientras la columna no crezca y se cierra en cerrar()
+        """
+        if tamano == 0:
+            return b""
+        mapa = self._mapas.get(nombre)
+        if mapa is not None and len(mapa) == tamano:
+            return mapa
+        self._soltar(nombre)
+        if not self.solo_lectura:
+            self.flush()
+        with open(self._ruta(nombre), "rb") as f:
+            mapa = mmap.mmap(f.fileno(), tamano, access=mmap.ACCESS_READ)
+        self._mapas[nombre] = mapa
+        return mapa
+
+    def _soltar(self, nombre):
+        mapa = self._mapas.pop(nombre, None)
+        if mapa is not None:
+            mapa.close()
+
+    def rango_alturas(self, desde=None, hasta=None):
+        """
+        Alturas [inicio, fin) de los bloques con desde <= timestamp <= hasta,
+        por búsqueda binaria sobre la columna de tiempos
+        """
+        datos = self._mapear(ARCHIVO_TIEMPOS, self._cantidad * FORMATO_TIEMPO.size)
+        with memoryview(datos) as vista, vista.cast("d") as tiempos:
+            inicio = 0 if desde is None else bisect_left(tiempos, segundos_epoch(desde))
+            fin = self._cantidad if hasta is None else bisect_right(tiempos, segundos_epoch(hasta))
+        return inicio, max(inicio, fin)
+
+    def alturas_con_alerta(self, inicio=0, fin=None):
+        """
+        Alturas con alerta dentro de [inicio, fin), leyendo solo ese tramo del bitmap
+        """
+        fin = self._cantidad if fin is None else min(fin, self._cantidad)
+        if inicio >= fin:
+            return []
+
+        bitmap = self._mapear(ARCHIVO_ALERTAS, (self._cantidad + 7) // 8)
+        primer_byte = inicio // 8
+        tramo = np.frombuffer(bitmap[primer_byte:(fin + 7) // 8], dtype=np.uint8)
+        bits = np.unpackbits(tramo, bitorder="little")[inicio - primer_byte * 8:fin - primer_byte * 8]
+        return (np.flatnonzero(bits) + inicio).tolist()
+
+    def altura_por_hash(self, hash_hex):
+        """
+        Altura del bloque con ese hash, o None: búsqueda binaria sobre la
+        columna ordenada y, si no está, en la cola de hashes sin ordenar
+        """
+        try:
+            clave = bytes.fromhex(hash_hex)
+        except ValueError:
+            return None
+        if len(clave) != TAMANO_HASH:
+            return None
+
+        ordenados = self._mapear(ARCHIVO_HASHES_ORDENADOS, self._ordenados * TAMANO_ORDENADO)
+        claves = _ClavesOrdenadas(ordenados, self._ordenados)
+        posicion = bisect_left(claves, clave)
+        while posicion < self._ordenados and claves[posicion] == clave:
+            inicio = posicion * TAMANO_ORDENADO + TAMANO_HASH
+            altura = FORMATO_ALTURA.unpack(ordenados[inicio:inicio + FORMATO_ALTURA.size])[0]
+            if altura < self._cantidad:
+                return altura
+            posicion += 1
+
+        if self._ordenados == self._cantidad:
+            return None
+        hashes = self._mapear(ARCHIVO_HASHES, self._cantidad * TAMANO_HASH)
+        cola = np.frombuffer(hashes[self._ordenados * TAMANO_HASH:], dtype="<u8").reshape(-1, 4)
+        coincidencias = np.flatnonzero((cola == np.frombuffer(clave, dtype="<u8")).all(axis=1))
+        return int(coincidencias[0]) + self._ordenados if len(coincidencias) else None
+
+class _ClavesOrdenadas:
+    """
+    Vista de los hashes de la columna ordenada como secuencia (para bisect)
+    """
+
+    def __init__(self, datos, cantidad):
+        self.datos = datos
+        self.cantidad = cantidad
+
+    def __len__(self):
+        return self.cantidad
+
+    def __getitem__(self, i):
+        inicio = i * TAMANO_ORDENADO
+        return self.datos[inicio:inicio + TAMANO_HASH]
+
+class ConsultasCadena:
+    """
+    API de consultas: resuelve las alturas con el índice y lee del registro
+    únicamente los bloques que coinciden
+    """
+
+    def __init__(self, directorio="cadena"):
+        self.registro = RegistroBloques(directorio, solo_lectura=True)
+        self.indice = IndiceConsultas(directorio, registro=self.registro, solo_lectura=True)
+
+    def primer_timestamp(self):
+        if len(self.indice) == 0:
+            return None
+        return self.registro.leer_bloque(0)["timestamp"]
+
+    def por_rango(self, desde=None, hasta=None, solo_alertas=False):
+        """
+        Bloques con mediciones del rango (sin los checkpoints Merkle, que
+        comparten el timestamp del último bloque de su tramo)
+        """
+        inicio, fin = self.indice.rango_alturas(desde, hasta)
+        alturas = self.indice.alturas_con_alerta(inicio, fin) if solo_alertas else range(inicio, fin)
+        bloques = ((altura, self.registro.leer_bloque(altura)) for altura in alturas)
+        return [(altura, bloque) for altura, bloque in bloques if not es_checkpoint(bloque)]
+
+    def por_hash(self, hash_hex):
+        altura = self.indice.altura_por_hash(hash_hex)
+        if altura is None:
+            return None
+        return altura, self.registro.leer_bloque(altura)
+
+    def cerrar(self):
+        self.indice.cerrar()
+        self.registro.cerrar()
+
+def normalizar_momento(texto, fecha_base):
+    """
+    Acepta un timestamp ISO completo o solo la hora (HH:MM[:SS]), que se
+    completa con la fecha del primer bloque de la cadena
+    """
+    if texto is None:
+        return None
+    if "T" in texto or "-" in texto:
+        return datetime.fromisoformat(texto).isoformat()
+    return datetime.combine(datetime.fromisoformat(fecha_base).date(), hora.fromisoformat(texto)).isoformat()
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Consultas sobre la cadena de bloques")
+    parser.add_argument("-c", "--cadena", default="cadena", help="Directorio del registro de bloques (default: cadena)")
+    parser.add_argument("--desde", help="Inicio del rango (ISO o HH:MM[:SS])")
+    parser.add_argument("--hasta", help="Fin del rango, inclusive (ISO o HH:MM[:SS])")
+    parser.add_argument("--alertas", action="store_true", help="Solo bloques con alerta")
+    parser.add_argument("--hash", help="Buscar un bloque por su hash")
+    parser.add_argument("--json", action="store_true", help="Mostrar los bloques completos en JSON")
+    return parser.parse_args()
+
+def main():
+    args = parsear_argumentos()
+
+    if not os.path.isdir(args.cadena):
+        print(f"❌ Error: No se encontró el registro de bloques en {args.cadena}/")
+        return
+
+    consultas = ConsultasCadena(args.cadena)
+
+    if args.hash:
+        resultado = consultas.por_hash(args.hash)
+        resultados = [resultado] if resultado else []
+    else:
+        base = consultas.primer_timestamp()
+        if base is None:
+            print("La cadena está vacía")
+            consultas.cerrar()
+            return
+        resultados = consultas.por_rango(
+            normalizar_momento(args.desde, base),
+            normalizar_momento(args.hasta, base),
+            args.alertas
+        )
+
+    print(f"🔎 {len(resultados)} bloque(s) encontrados")
+    for altura, bloque in resultados:
+        if args.json:
+            print(json.dumps(bloque, indent=2, ensure_ascii=False))
+        else:
+            print(f"Bloque {altura + 1} - {bloque['timestamp']}: "
+                  f"{'🚨 ALERTA' if bloque.get('alerta') else '✅ OK'} "
+                  f"Hash={bloque['hash'][:16]}...")
+
+    consultas.cerrar()
+
+if __name__ == "__main__":
+    main()
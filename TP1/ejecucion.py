@@ -0,0 +1,204 @@
+"""
+Modos de Ejecución - Las mismas etapas como hilos o como tareas de asyncio
+El generador, los analizadores y el verificador usan la misma lógica (Etapa*) en los tres modos
+"""
+import asyncio
+import queue
+import threading
+import time
+
+from analizador import SENALES, EtapaAnalizador, proceso_analizador
+from generador import crear_etapa_generador, proceso_generador
+from verificador import EtapaVerificador, proceso_verificador
+
+"""
+- procesos: un proceso por etapa, con Pipes (o memoria compartida) y una
+  multiprocessing.Queue; es el único modo con supervisor y reinicios
+- hilos: un hilo por etapa en un solo proceso, con queue.Queue
+- asyncio: una tarea por etapa en un solo hilo, con asyncio.Queue
+"""
+MODOS = ("procesos", "hilos", "asyncio")
+
+"""
+Resultado de una lectura con tiempo límite que venció sin datos (None ya
+significa fin del flujo)
+"""
+VACIO = object()
+
+class CanalHilos:
+    """
+    Canal generador -> analizador entre hilos, con la misma interfaz que un
+    extremo de Pipe (`send`, `recv`, `poll`) sobre una queue.Queue acotada:
+    si el analizador se atrasa, el generador espera en lugar de acumular
+    muestras sin límite. Un solo lector por canal
+    """
+
+    def __init__(self, capacidad=1024):
+        self.cola = queue.Queue(capacidad)
+        self._pendiente = VACIO
+
+    def send(self, datos):
+        self.cola.put(datos)
+
+    def poll(self, timeout=0.0):
+        """
+        True si hay una muestra para `recv` antes de `timeout` segundos
+        """
+        if self._pendiente is VACIO:
+            try:
+                self._pendiente = self.cola.get(timeout=timeout)
+            except queue.Empty:
+                return False
+        return True
+
+    def recv(self):
+        if self._pendiente is not VACIO:
+            datos, self._pendiente = self._pendiente, VACIO
+            return datos
+        return self.cola.get()
+
+    def close(self):
+        pass
+
+class LectorAsincrono:
+    """
+    Lee de una asyncio.Queue con tiempo límite sin perder elementos: si el
+    tiempo vence, la lectura queda pendiente y la retoma la llamada siguiente
+    (cancelarla podría descartar un elemento ya entregado)
+    """
+
+    def __init__(self, cola):
+        self.cola = cola
+        self._lectura = None
+
+    async def recibir(self, timeout=None):
+        """
+        Próximo elemento de la cola, o VACIO si no llegó ninguno en `timeout`
+        segundos (None = esperar sin límite)
+        """
+        if self._lectura is None:
+            if not self.cola.empty():
+                return self.cola.get_nowait()
+            self._lectura = asyncio.ensure_future(self.cola.get())
+
+        hechas, _ = await asyncio.wait((self._lectura,), timeout=timeout)
+        if not hechas:
+            return VACIO
+        lectura, self._lectura = self._lectura, None
+        return lectura.result()
+
+async def tarea_generador(canales, **opciones):
+    """
+    Generador (o reproductor de una grabación) como tarea de asyncio
+    (opciones de proceso_generador); envía las muestras por asyncio.Queue
+    acotadas, una por analizador
+    """
+    etapa = crear_etapa_generador(**opciones)
+
+    for i, momento, instante in etapa.programa():
+        if instante is not None:
+            espera = instante - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+
+        datos = etapa.muestra(i, momento)
+        for canal in canales:
+            await canal.put(datos)
+        etapa.enviada(i)
+
+    for canal in canales:
+        await canal.put(None)
+
+    etapa.finalizar()
+
+async def tarea_analizador(entrada, salida, tipo_senal, **opciones):
+    """
+    Analizador como tarea de asyncio (opciones de proceso_analizador, salvo
+    checkpoint y reinicio, que solo tienen sentido en el modo de procesos)
+    """
+    etapa = EtapaAnalizador(tipo_senal, **opciones)
+    lector = LectorAsincrono(entrada)
+
+    while True:
+        datos = await lector.recibir(etapa.tiempo_restante())
+        if datos is VACIO:
+            mensajes = etapa.vencer()
+        elif datos is None:
+            for mensaje in etapa.finalizar():
+                await salida.put(mensaje)
+            break
+        else:
+            mensajes = etapa.procesar(datos)
+
+        for mensaje in mensajes:
+            await salida.put(mensaje)
+        etapa.enviados(mensajes)
+
+    print(f"Analizador {tipo_senal} finalizado")
+
+async def tarea_verificador(cola, **opciones):
+    """
+    Verificador como tarea de asyncio (opciones de proceso_verificador).
+    El hash y la escritura de cada bloque son sincrónicos: mientras tanto
+    las demás tareas esperan, igual que en cualquier etapa de este modo
+    """
+    etapa = EtapaVerificador(**opciones)
+    lector = LectorAsincrono(cola)
+
+    while etapa.activa:
+        try:
+            resultado = await lector.recibir(etapa.espera())
+            if resultado is VACIO:
+                if not etapa.sin_resultados():
+                    break
+                continue
+
+            etapa.recibir(resultado)
+
+        except Exception as e:
+            print(f"Error en verificador: {e}")
+            break
+
+    etapa.finalizar()
+
+def ejecutar_hilos(opciones_generador, opciones_analizador, opciones_verificador, capacidad=1024):
+    """
+    Ejecuta el pipeline de un paciente con un hilo por etapa. Las etapas son
+    las funciones proceso_* del modo de procesos, con canales entre hilos
+    """
+    canales = {senal: CanalHilos(capacidad) for senal in SENALES}
+    resultados = queue.Queue()
+
+    hilos = [
+        threading.Thread(target=proceso_generador, args=tuple(canales.values()),
+                         kwargs=opciones_generador, name="Generador", daemon=True),
+        threading.Thread(target=proceso_verificador, args=(resultados,),
+                         kwargs=opciones_verificador, name="Verificador", daemon=True)
+    ]
+    hilos += [
+        threading.Thread(target=proceso_analizador, args=(canales[senal], resultados, senal),
+                         kwargs=opciones_analizador, name=f"Analizador-{senal.capitalize()}", daemon=True)
+        for senal in SENALES
+    ]
+
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+async def _pipeline_asyncio(opciones_generador, opciones_analizador, opciones_verificador, capacidad):
+    canales = {senal: asyncio.Queue(capacidad) for senal in SENALES}
+    resultados = asyncio.Queue()
+
+    await asyncio.gather(
+        tarea_generador(list(canales.values()), **opciones_generador),
+        tarea_verificador(resultados, **opciones_verificador),
+        *(tarea_analizador(canales[senal], resultados, senal, **opciones_analizador) for senal in SENALES)
+    )
+
+def ejecutar_asyncio(opciones_generador, opciones_analizador, opciones_verificador, capacidad=1024):
+    """
+    Ejecuta el pipeline de un paciente con una tarea de asyncio por etapa,
+    en un solo hilo: sin procesos, pickles ni cambios de contexto
+    """
+    asyncio.run(_pipeline_asyncio(opciones_generador, opciones_analizador, opciones_verificador, capacidad))
@@ -0,0 +1,457 @@
+"""
+Estadísticas de Ventana Móvil - Media y desviación incrementales
+Mantiene un buffer circular preasignado y actualiza las estadísticas en O(1)
+"""
+import math
+import random
+from collections import deque
+
+import numpy as np
+
+
+class EstadisticasVentana:
+    """
+    Ventana móvil de tamaño fijo con media y varianza incrementales.
+
+    Usa el algoritmo de Welford (con su variante de reemplazo cuando la
+    ventana está llena) para que agregar una muestra y descartar la más
+    antigua cueste O(1) sin recorrer la ventana. Cada `intervalo_resync`
+    actualizaciones se recalculan las sumas desde el buffer para eliminar
+    el error de redondeo acumulado.
+    """
+
+    def __init__(self, tamano=30, intervalo_resync=None):
+        if tamano <= 0:
+            raise ValueError(f"Tamaño de ventana inválido: {tamano}")
+
+        self.tamano = tamano
+        self.intervalo_resync = intervalo_resync or max(1000, tamano * 32)
+
+        self._buffer = np.zeros(tamano, dtype=np.float64)
+        self._inicio = 0
+        self._cantidad = 0
+        self._media = 0.0
+        self._m2 = 0.0
+        self._desde_resync = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, valor):
+        """
+        Agrega una muestra; si la ventana está llena descarta la más antigua
+        """
+        valor = float(valor)
+
+        if self._cantidad < self.tamano:
+            posicion = (self._inicio + self._cantidad) % self.tamano
+            self._buffer[posicion] = valor
+            self._cantidad += 1
+
+            delta = valor - self._media
+            self._media += delta / self._cantidad
+            self._m2 += delta * (valor - self._media)
+        else:
+            viejo = float(self._buffer[self._inicio])
+            self._buffer[self._inicio] = valor
+            self._inicio = (self._inicio + 1) % self.tamano
+
+            """
+            Reemplazo de Welford: quitar `viejo` y agregar `valor` en un paso
+            """
+            media_anterior = self._media
+            self._media += (valor - viejo) / self._cantidad
+            self._m2 += (valor - viejo) * (valor - self._media + viejo - media_anterior)
+
+        if self._m2 < 0.0:
+            self._m2 = 0.0
+
+        self._desde_resync += 1
+        if self._desde_resync >= self.intervalo_resync:
+            self.resincronizar()
+
+    def resincronizar(self):
+        """
+        Recalcula media y suma de cuadrados desde el buffer (dos pasadas)
+        para descartar cualquier deriva numérica acumulada
+        """
+        self._desde_resync = 0
+
+        if self._cantidad == 0:
+            self._media = 0.0
+            self._m2 = 0.0
+            return
+
+        valores = self.valores()
+        self._media = math.fsum(valores) / self._cantidad
+        self._m2 = math.fsum((valores - self._media) ** 2)
+
+    def valores(self):
+        """
+        Devuelve las muestras de la ventana en orden de llegada (copia)
+        """
+        indices = (self._inicio + np.arange(self._cantidad)) % self.tamano
+        return self._buffer[indices]
+
+    def estado(self):
+        """
+        Estado interno completo (para un checkpoint): buffer crudo, posición,
+        cantidad, media, M2 y actualizaciones desde la última resincronización
+        """
+        return self._buffer, self._inicio, self._cantidad, self._media, self._m2, self._desde_resync
+
+    def restaurar(self, buffer, inicio, cantidad, media, m2, desde_resync):
+        """
+        Retoma exactamente el estado guardado con `estado()`, sin recalcular
+        """
+        if len(buffer) != self.tamano or not 0 <= cantidad <= self.tamano:
+            raise ValueError(f"Estado incompatible con una ventana de {self.tamano} muestras")
+        self._buffer[:] = buffer
+        self._inicio = int(inicio)
+        self._cantidad = int(cantidad)
+        self._media = float(media)
+        self._m2 = float(m2)
+        self._desde_resync = int(desde_resync)
+
+    @property
+    def media(self):
+        return self._media
+
+    @property
+    def varianza(self):
+        """
+        Varianza poblacional (equivalente a np.var con ddof=0)
+        """
+        if self._cantidad == 0:
+            return 0.0
+        return self._m2 / self._cantidad
+
+    @property
+    def desviacion(self):
+        """
+        Desviación estándar poblacional (equivalente a np.std)
+        """
+        return math.sqrt(self.varianza)
+
+class _NodoLista:
+    __slots__ = ("valor", "siguientes", "anchos")
+
+    def __init__(self, valor, niveles):
+        self.valor = valor
+        self.siguientes = [None] * niveles
+        self.anchos = [1] * niveles
+
+"""
+Centinela del final de la lista: mayor que cualquier valor
+"""
+_FIN_LISTA = _NodoLista(math.inf, 0)
+
+class ListaOrdenada:
+    """
+    Skiplist indexable: mantiene valores ordenados (con repetidos) con
+    inserción, eliminación y acceso por posición en O(log n) esperado.
+    Cada enlace guarda cuántas posiciones saltea, así `lista[k]` baja por
+    los niveles sumando anchos en lugar de recorrer la lista
+    """
+
+    def __init__(self, capacidad=100):
+        self.niveles = max(1, int(math.log2(max(capacidad, 2))) + 1)
+        self._cabeza = _NodoLista(None, self.niveles)
+        self._cabeza.siguientes = [_FIN_LISTA] * self.niveles
+        self._cantidad = 0
+        self._azar = random.Random()
+
+    def __len__(self):
+        return self._cantidad
+
+    def __getitem__(self, posicion):
+        if not 0 <= posicion < self._cantidad:
+            raise IndexError(posicion)
+        nodo = self._cabeza
+        restante = posicion + 1
+        for nivel in reversed(range(self.niveles)):
+            while nodo.anchos[nivel] <= restante:
+                restante -= nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+        return nodo.valor
+
+    def __iter__(self):
+        nodo = self._cabeza.siguientes[0]
+        while nodo is not _FIN_LISTA:
+            yield nodo.valor
+            nodo = nodo.siguientes[0]
+
+    def insertar(self, valor):
+        anteriores = [None] * self.niveles
+        pasos = [0] * self.niveles
+        nodo = self._cabeza
+        for nivel in reversed(range(self.niveles)):
+            while nodo.siguientes[nivel].valor <= valor:
+                pasos[nivel] += nodo.anchos[nivel]
+                nodo = nodo.siguientes[nivel]
+            anteriores[nivel] = nodo
+
+        """
+        Altura aleatoria del nodo: cada nivel con probabilidad 1/2
+        """
+        altura = min(self.niveles, 1 - int(math.log2(1.0 - self._azar.random())))
+        nuevo = _NodoLista(valor, altura)
+        avance = 0
+        for nivel in range(altura):
+            anterior = anteriores[nivel]
+            nuevo.siguientes[nivel] = anterior.siguientes[nivel]
+            anterior.siguientes[nivel] = nuevo
+            nuevo.anchos[nivel] = anterior.anchos[nivel] - avance
+            anterior.anchos[nivel] = avance + 1
+            avance += pasos[nivel]
+        for nivel in range(altura, self.niveles):
+            anteriores[nivel].anchos[nivel] += 1
+        self._cantidad += 1
+
+    def eliminar(self, valor):
+        """
+        Elimina una aparición de `valor` (KeyError si no está)
+        """
+        anteriores = [None] * self.niveles
+        nodo = self._cabeza
+        for nivel in reversed(range(self.niveles)):
+            while nodo.siguientes[nivel].valor < valor:
+                nodo = nodo.siguientes[nivel]
+            anteriores[nivel] = nodo
+
+        objetivo = anteriores[0].siguientes[0]
+        if objetivo.valor != valor:
+            raise KeyError(valor)
+        for nivel in range(len(objetivo.siguientes)):
+            anterior = anteriores[nivel]
+            anterior.anchos[nivel] += objetivo.anchos[nivel] - 1
+            anterior.siguientes[nivel] = objetivo.siguientes[nivel]
+        for nivel in range(len(objetivo.siguientes), self.niveles):
+            anteriores[nivel].anchos[nivel] -= 1
+        self._cantidad -= 1
+
+    def percentil(self, q):
+        """
+        Percentil `q` (0-100) con interpolación lineal, igual que np.percentile
+        """
+        if self._cantidad == 0:
+            return 0.0
+        posicion = q / 100 * (self._cantidad - 1)
+        abajo = int(posicion)
+        fraccion = posicion - abajo
+        valor = self[abajo]
+        if fraccion:
+            valor += (self[abajo + 1] - valor) * fraccion
+        return valor
+
+class EstadisticasExtendidas(EstadisticasVentana):
+    """
+    Ventana móvil que además de media y desviación mantiene, todo en forma
+    incremental por muestra:
+    - mediana y percentiles: skiplist indexable con los valores de la
+      ventana ordenados (insertar el nuevo y quitar el descartado, O(log w))
+    - mínimo y máximo: colas monótonas de (posición, valor); cada muestra
+      entra y sale una sola vez, O(1) amortizado
+    - EWMA con factor `alfa`: sigue a la última tendencia sin esperar a que
+      una muestra extrema se diluya en la ventana
+    """
+
+    def __init__(self, tamano=30, intervalo_resync=None, percentiles=(50, 90), alfa=0.1):
+        super().__init__(tamano, intervalo_resync)
+        if not all(0 <= q <= 100 for q in percentiles):
+            raise ValueError(f"Percentiles fuera de [0, 100]: {list(percentiles)}")
+        if not 0 < alfa <= 1:
+            raise ValueError(f"Factor de la EWMA fuera de (0, 1]: {alfa}")
+
+        self.percentiles = tuple(q for q in percentiles if q != 50)
+        self.alfa = alfa
+        self._ewma = None
+        self._reconstruir()
+
+    def _reconstruir(self):
+        """
+        Arma las estructuras de orden desde el buffer (al crear o restaurar)
+        """
+        self._ordenados = ListaOrdenada(self.tamano)
+        self._minimos = deque()
+        self._maximos = deque()
+        self._posicion = 0
+        for valor in self.valores().tolist():
+            self._ordenados.insertar(valor)
+            self._extremos(valor)
+
+    def _extremos(self, valor):
+        """
+        Colas monótonas: `_maximos` decreciente y `_minimos` creciente; al
+        frente, el extremo de la ventana actual
+        """
+        posicion = self._posicion
+        self._posicion += 1
+        while self._maximos and self._maximos[-1][1] <= valor:
+            self._maximos.pop()
+        self._maximos.append((posicion, valor))
+        while self._minimos and self._minimos[-1][1] >= valor:
+            self._minimos.pop()
+        self._minimos.append((posicion, valor))
+
+        vencida = posicion - self.tamano
+        if self._maximos[0][0] <= vencida:
+            self._maximos.popleft()
+        if self._minimos[0][0] <= vencida:
+            self._minimos.popleft()
+
+    def agregar(self, valor):
+        valor = float(valor)
+        viejo = float(self._buffer[self._inicio]) if self._cantidad == self.tamano else None
+        super().agregar(valor)
+
+        if viejo is not None:
+            self._ordenados.eliminar(viejo)
+        self._ordenados.insertar(valor)
+        self._extremos(valor)
+        self._ewma = valor if self._ewma is None else self._ewma + self.alfa * (valor - self._ewma)
+
+    def estado(self):
+        """
+        Estado de EstadisticasVentana más la EWMA (el orden y los extremos
+        se reconstruyen desde el buffer)
+        """
+        return super().estado() + (self.ewma,)
+
+    def restaurar(self, buffer, inicio, cantidad, media, m2, desde_resync, ewma=None):
+        super().restaurar(buffer, inicio, cantidad, media, m2, desde_resync)
+        self._reconstruir()
+        self._ewma = ewma if ewma is not None and not math.isnan(ewma) else (self._media if cantidad else None)
+
+    @property
+    def mediana(self):
+        return self._ordenados.percentil(50)
+
+    def percentil(self, q):
+        return self._ordenados.percentil(q)
+
+    @property
+    def minimo(self):
+        return self._minimos[0][1] if self._minimos else 0.0
+
+    @property
+    def maximo(self):
+        return self._maximos[0][1] if self._maximos else 0.0
+
+    @property
+    def ewma(self):
+        return 0.0 if self._ewma is None else self._ewma
+
+    def resumen(self):
+        """
+        Estadísticas extendidas para los `datos` del bloque
+        """
+        estadisticas = {"mediana": self.mediana}
+        for q in self.percentiles:
+            estadisticas[f"p{q:g}"] = self.percentil(q)
+        estadisticas["min"] = self.minimo
+        estadisticas["max"] = self.maximo
+        estadisticas["ewma"] = self.ewma
+        return estadisticas
+
+class EstadisticasPacientes:
+    """
+    Ventanas móviles de muchos pacientes a la vez: un buffer circular 2-D
+    (pacientes × tamaño) de una señal.
+
+    Todos los pacientes reciben una muestra por tick, así que comparten la
+    posición del buffer y la cantidad de muestras; media y M2 de Welford son
+    vectores y cada tick se actualiza con unas pocas operaciones de NumPy
+    sobre todos los pacientes, sin bucles en Python.
+    """
+
+    def __init__(self, pacientes, tamano=30, intervalo_resync=None):
+        if pacientes <= 0:
+            raise ValueError(f"Cantidad de pacientes inválida: {pacientes}")
+        if tamano <= 0:
+            raise ValueError(f"Tamaño de ventana inválido: {tamano}")
+
+        self.pacientes = pacientes
+        self.tamano = tamano
+        self.intervalo_resync = intervalo_resync or max(1000, tamano * 32)
+
+        self._buffer = np.zeros((pacientes, tamano), dtype=np.float64)
+        self._inicio = 0
+        self._cantidad = 0
+        self._media = np.zeros(pacientes, dtype=np.float64)
+        self._m2 = np.zeros(pacientes, dtype=np.float64)
+        self._desde_resync = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, valores):
+        """
+        Agrega una muestra por paciente (vector de largo `pacientes`)
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        if valores.shape != (self.pacientes,):
+            raise ValueError(f"Se esperaban {self.pacientes} valores, llegaron {valores.shape}")
+
+        if self._cantidad < self.tamano:
+            posicion = (self._inicio + self._cantidad) % self.tamano
+            self._buffer[:, posicion] = valores
+            self._cantidad += 1
+
+            delta = valores - self._media
+            self._media += delta / self._cantidad
+            self._m2 += delta * (valores - self._media)
+        else:
+            viejos = self._buffer[:, self._inicio].copy()
+            self._buffer[:, self._inicio] = valores
+            self._inicio = (self._inicio + 1) % self.tamano
+
+            """
+            Reemplazo de Welford vectorizado (ver EstadisticasVentana.agregar)
+            """
+            diferencia = valores - viejos
+            media_anterior = self._media.copy()
+            self._media += diferencia / self._cantidad
+            self._m2 += diferencia * (valores - self._media + viejos - media_anterior)
+
+        np.maximum(self._m2, 0.0, out=self._m2)
+
+        self._desde_resync += 1
+        if self._desde_resync >= self.intervalo_resync:
+            self.resincronizar()
+
+    def resincronizar(self):
+        """
+        Recalcula medias y sumas de cuadrados desde el buffer (dos pasadas)
+        """
+        self._desde_resync = 0
+
+        if self._cantidad == 0:
+            self._media[:] = 0.0
+            self._m2[:] = 0.0
+            return
+
+        valores = self.valores()
+        self._media = valores.mean(axis=1)
+        self._m2 = ((valores - self._media[:, None]) ** 2).sum(axis=1)
+
+    def valores(self):
+        """
+        Matriz (pacientes × cantidad) con las muestras en orden de llegada (copia)
+        """
+        indices = (self._inicio + np.arange(self._cantidad)) % self.tamano
+        return self._buffer[:, indices]
+
+    @property
+    def media(self):
+        return self._media
+
+    @property
+    def varianza(self):
+        if self._cantidad == 0:
+            return np.zeros(self.pacientes)
+        return self._m2 / self._cantidad
+
+    @property
+    def desviacion(self):
+        return np.sqrt(self.varianza)
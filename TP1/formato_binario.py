@@ -0,0 +1,411 @@
+"""
+Formato Binario de Bloques - Registros de ancho fijo para cadenas grandes
+Convierte desde y hacia blockchain.json y lee los bloques por mmap como arreglos de NumPy
+"""
+import argparse
+import hashlib
+import itertools
+import os
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from almacenamiento import escribir_json_bloques
+from codificacion import VERSION_ACTUAL, calcular_hash, plantilla
+from merkle import TIPO_CHECKPOINT, raiz_merkle
+
+SENALES = ("frecuencia", "presion", "oxigeno")
+
+"""
+Cabecera del archivo: identificador, versión y tamaño de cada registro.
+La versión 2 agrega el tipo de registro (checkpoints Merkle); los
+archivos v1 tienen ese byte en cero y se leen igual
+"""
+MAGICO = b"BIOCAD\0\1"
+VERSION = 2
+VERSIONES_LEGIBLES = (1, 2)
+CABECERA = struct.Struct("<8sII")
+
+"""
+Registro de 128 bytes por bloque:
+- timestamp: microsegundos desde epoch (int64)
+- media y desv de frecuencia, presión y oxígeno (3 + 3 float64)
+- prev_hash y hash crudos (32 + 32 bytes)
+- alerta, orden de las señales en `datos`, formato del timestamp y versión
+  del bloque (1 byte c/u; versión 0 = bloque v1 sin la clave "version",
+  así los archivos anteriores, con esos bytes en cero, se leen igual)
+- tipo de registro (1 byte): REGISTRO_MEDICION o REGISTRO_CHECKPOINT
+
+En un checkpoint Merkle los 48 bytes de media y desv guardan en cambio
+desde y hasta (int64) y la raíz cruda (32 bytes)
+"""
+FORMATO_BLOQUE = struct.Struct("<q3d3d32s32sBBBBB3x")
+FORMATO_CHECKPOINT = struct.Struct("<qqq32s32s32sBBBBB3x")
+DATOS_CHECKPOINT = struct.Struct("<qq32s")
+
+REGISTRO_MEDICION = 0
+REGISTRO_CHECKPOINT = 1
+
+TIPO_BLOQUE = np.dtype([
+    ("timestamp_us", "<i8"),
+    ("media", "<f8", (3,)),
+    ("desv", "<f8", (3,)),
+    ("prev_hash", "u1", (32,)),
+    ("hash", "u1", (32,)),
+    ("alerta", "u1"),
+    ("orden", "u1"),
+    ("formato_ts", "u1"),
+    ("version", "u1"),
+    ("tipo", "u1"),
+    ("reservado", "V3")
+])
+
+"""
+El hash se calcula sobre str(datos), que depende del orden de las claves:
+se guarda cuál de las 6 permutaciones de SENALES tenía el bloque original
+"""
+PERMUTACIONES = list(itertools.permutations(range(len(SENALES))))
+
+"""
+Formatos de timestamp que se pueden reconstruir exactamente
+"""
+TIMESPEC = ("seconds", "microseconds")
+
+CLAVES_BLOQUE = ["timestamp", "datos", "alerta", "prev_hash", "hash"]
+CLAVES_CHECKPOINT = ["version", "timestamp", "tipo", "datos", "alerta", "prev_hash", "hash"]
+CLAVES_DATOS_CHECKPOINT = ["desde", "hasta", "raiz"]
+
+"""
+Contenido v2 de los bloques con las tres señales (media y desv): prefijo
+constante y los 6 valores en el orden canónico, tomados de las columnas
+"""
+PREFIJO_V2, CLAVES_V2, _ = plantilla({senal: {"media": 0.0, "desv": 0.0} for senal in SENALES})
+TIPO_FIJO_V2 = np.dtype([("prev_hash", "u1", (32,)), ("valores", "<f8", (len(CLAVES_V2),))])
+EPOCH = datetime(1970, 1, 1)
+MICROSEGUNDO = timedelta(microseconds=1)
+
+def _hash_crudo(texto):
+    crudo = bytes.fromhex(texto)
+    if len(crudo) != 32 or crudo.hex() != texto:
+        raise ValueError(f"Hash no representable: {texto!r}")
+    return crudo
+
+def _formato_timestamp(timestamp):
+    momento = datetime.fromisoformat(timestamp)
+    formato_ts = next((i for i, spec in enumerate(TIMESPEC)
+                       if momento.tzinfo is None and momento.isoformat(timespec=spec) == timestamp), None)
+    if formato_ts is None:
+        raise ValueError(f"Timestamp no representable: {timestamp!r}")
+    return (momento - EPOCH) // MICROSEGUNDO, formato_ts
+
+def empaquetar_checkpoint(bloque):
+    """
+    Registro binario de un checkpoint Merkle (como los que encadena el
+    verificador con --merkle)
+    """
+    if list(bloque) != CLAVES_CHECKPOINT or bloque["version"] != VERSION_ACTUAL \
+            or type(bloque["version"]) is not int or bloque["alerta"] is not False:
+        raise ValueError(f"Checkpoint Merkle no representable: {list(bloque)}")
+    datos = bloque["datos"]
+    if list(datos) != CLAVES_DATOS_CHECKPOINT or type(datos["desde"]) is not int \
+            or type(datos["hasta"]) is not int or type(datos["raiz"]) is not str:
+        raise ValueError(f"Datos de checkpoint no representables: {datos!r}")
+
+    microsegundos, formato_ts = _formato_timestamp(bloque["timestamp"])
+    return FORMATO_CHECKPOINT.pack(
+        microsegundos,
+        datos["desde"],
+        datos["hasta"],
+        _hash_crudo(datos["raiz"]),
+        _hash_crudo(bloque["prev_hash"]),
+        _hash_crudo(bloque["hash"]),
+        False,
+        0,
+        formato_ts,
+        VERSION_ACTUAL,
+        REGISTRO_CHECKPOINT
+    )
+
+def empaquetar_bloque(bloque):
+    """
+    Convierte un bloque (dict) a su registro binario. Lanza ValueError si
+    el bloque no se puede reconstruir byte a byte desde el registro
+    """
+    if bloque.get("tipo") == TIPO_CHECKPOINT:
+        return empaquetar_checkpoint(bloque)
+    if bloque.get("tipo") is not None:
+        raise ValueError(f"Bloque de tipo {bloque['tipo']!r} no representable")
+    claves = list(bloque)
+    version = 0
+    if claves[:1] == ["version"]:
+        version = bloque["version"]
+        if type(version) is not int or version != VERSION_ACTUAL:
+            raise ValueError(f"Versión de bloque no representable: {version!r}")
+        claves = claves[1:]
+    if claves != CLAVES_BLOQUE:
+        raise ValueError(f"Claves de bloque no soportadas: {list(bloque)}")
+
+    microsegundos, formato_ts = _formato_timestamp(bloque["timestamp"])
+
+    datos = bloque["datos"]
+    try:
+        orden = PERMUTACIONES.index(tuple(SENALES.index(senal) for senal in datos))
+    except ValueError:
+        raise ValueError(f"Señales no soportadas: {list(datos)}")
+
+    medias = []
+    desvios = []
+    for senal in SENALES:
+        valores = datos[senal]
+        if list(valores)[:2] == ["media", "desv"] and len(valores) > 2:
+            raise ValueError(f"Estadísticas extendidas no representables en {senal} ({', '.join(list(valores)[2:])}): "
+                             f"la cadena se generó con --extendidas y el formato binario guarda solo media y desv")
+        if list(valores) != ["media", "desv"] or not all(type(v) is float for v in valores.values()):
+            raise ValueError(f"Estadísticas no representables en {senal}: {valores!r}")
+        medias.append(valores["media"])
+        desvios.append(valores["desv"])
+
+    if not isinstance(bloque["alerta"], bool):
+        raise ValueError(f"Alerta no representable: {bloque['alerta']!r}")
+
+    return FORMATO_BLOQUE.pack(
+        microsegundos,
+        *medias,
+        *desvios,
+        _hash_crudo(bloque["prev_hash"]),
+        _hash_crudo(bloque["hash"]),
+        bloque["alerta"],
+        orden,
+        formato_ts,
+        version,
+        REGISTRO_MEDICION
+    )
+
+def _texto_timestamp(microsegundos, formato_ts):
+    return (EPOCH + microsegundos * MICROSEGUNDO).isoformat(timespec=TIMESPEC[formato_ts])
+
+def datos_checkpoint(registro):
+    """
+    `datos` de un registro de checkpoint Merkle: {"desde", "hasta", "raiz"}
+    """
+    desde, hasta, raiz = DATOS_CHECKPOINT.unpack(registro["media"].tobytes() + registro["desv"].tobytes())
+    return {"desde": desde, "hasta": hasta, "raiz": raiz.hex()}
+
+def desempaquetar_bloque(registro):
+    """
+    Reconstruye el bloque original (mismo dict, mismo orden de claves) a
+    partir de un registro del arreglo estructurado
+    """
+    if registro["tipo"] == REGISTRO_CHECKPOINT:
+        return {
+            "version": int(registro["version"]),
+            "timestamp": _texto_timestamp(int(registro["timestamp_us"]), int(registro["formato_ts"])),
+            "tipo": TIPO_CHECKPOINT,
+            "datos": datos_checkpoint(registro),
+            "alerta": False,
+            "prev_hash": registro["prev_hash"].tobytes().hex(),
+            "hash": registro["hash"].tobytes().hex()
+        }
+    medias = registro["media"].tolist()
+    desvios = registro["desv"].tolist()
+    bloque = {"version": int(registro["version"])} if registro["version"] else {}
+    bloque.update({
+        "timestamp": _texto_timestamp(int(registro["timestamp_us"]), int(registro["formato_ts"])),
+        "datos": {
+            SENALES[k]: {"media": medias[k], "desv": desvios[k]}
+            for k in PERMUTACIONES[registro["orden"]]
+        },
+        "alerta": bool(registro["alerta"]),
+        "prev_hash": registro["prev_hash"].tobytes().hex(),
+        "hash": registro["hash"].tobytes().hex()
+    })
+    return bloque
+
+def escribir_binario(bloques, ruta="blockchain.bin"):
+    """
+    Escribe los bloques en formato binario (reemplazo atómico del archivo).
+    Devuelve la cantidad de bloques escritos
+    """
+    temporal = ruta + ".tmp"
+    cantidad = 0
+    try:
+        with open(temporal, "wb") as f:
+            f.write(CABECERA.pack(MAGICO, VERSION, FORMATO_BLOQUE.size))
+            for bloque in bloques:
+                f.write(empaquetar_bloque(bloque))
+                cantidad += 1
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temporal)
+        raise
+    os.replace(temporal, ruta)
+    return cantidad
+
+def es_binario(ruta):
+    """
+    True si el archivo empieza con la cabecera del formato binario
+    """
+    try:
+        with open(ruta, "rb") as f:
+            return f.read(len(MAGICO)) == MAGICO
+    except OSError:
+        return False
+
+def leer_binario(ruta):
+    """
+    Mapea el archivo en memoria y devuelve un arreglo estructurado de NumPy
+    (solo lectura, TIPO_BLOQUE): los bloques no se cargan ni se convierten
+    a objetos de Python hasta que se accede a ellos
+    """
+    with open(ruta, "rb") as f:
+        magico, version, tamano = CABECERA.unpack(f.read(CABECERA.size))
+    if magico != MAGICO or version not in VERSIONES_LEGIBLES or tamano != TIPO_BLOQUE.itemsize:
+        raise ValueError(f"{ruta} no es una cadena en formato binario v{VERSION}")
+
+    cantidad = (os.path.getsize(ruta) - CABECERA.size) // TIPO_BLOQUE.itemsize
+    if cantidad == 0:
+        return np.empty(0, dtype=TIPO_BLOQUE)
+    return np.memmap(ruta, dtype=TIPO_BLOQUE, mode="r", offset=CABECERA.size, shape=(cantidad,))
+
+def iterar_bloques_binario(ruta, desde=0):
+    """
+    Recorre los bloques del archivo binario como dicts (formato JSON)
+    """
+    arreglo = leer_binario(ruta)
+    for i in range(desde, len(arreglo)):
+        yield desempaquetar_bloque(arreglo[i])
+
+def timestamps(arreglo, inicio=0, fin=None):
+    """
+    Timestamps ISO de un tramo, convertidos en forma vectorizada
+    """
+    tramo = arreglo[inicio:fin]
+    fechas = tramo["timestamp_us"].astype("datetime64[us]")
+    textos = np.datetime_as_string(fechas, unit="us")
+    segundos = tramo["formato_ts"] == 0
+    if segundos.any():
+        textos[segundos] = np.datetime_as_string(fechas[segundos], unit="s")
+    return textos.tolist()
+
+def hashes_invalidos(ruta, inicio, fin):
+    """
+    Versión para un pool de procesos: cada worker mapea el archivo por su cuenta
+    """
+    return hashes_invalidos_arreglo(leer_binario(ruta), inicio, fin)
+
+def hashes_invalidos_arreglo(arreglo, inicio, fin):
+    """
+    Recalcula los hashes de los bloques [inicio, fin) directamente sobre
+    las columnas (sin armar dicts). Devuelve (altura, hash calculado) de
+    los corruptos
+    """
+    tramo = arreglo[inicio:fin]
+    medias = tramo["media"].tolist()
+    desvios = tramo["desv"].tolist()
+    ordenes = tramo["orden"].tolist()
+    versiones = tramo["version"].tolist()
+    checkpoints = set(np.flatnonzero(tramo["tipo"] == REGISTRO_CHECKPOINT).tolist())
+    prev_hashes = tramo["prev_hash"].tobytes()
+    hashes = tramo["hash"].tobytes()
+
+    """
+    Bloques v2: prev_hash y los valores en orden canónico se arman para
+    todo el tramo de una vez, como registros de ancho fijo
+    """
+    fijos = b""
+    if VERSION_ACTUAL in versiones:
+        columnas = np.empty(len(tramo), dtype=TIPO_FIJO_V2)
+        columnas["prev_hash"] = tramo["prev_hash"]
+        for k, (senal, campo) in enumerate(CLAVES_V2):
+            valores = tramo["media" if campo == "media" else "desv"][:, SENALES.index(senal)]
+            columnas["valores"][:, k] = np.where(np.isnan(valores), np.nan, valores)
+        fijos = columnas.tobytes()
+    ancho = TIPO_FIJO_V2.itemsize
+
+    invalidos = []
+    for j, timestamp in enumerate(timestamps(arreglo, inicio, fin)):
+        if j in checkpoints:
+            calculado = bytes.fromhex(calcular_hash(prev_hashes[32 * j:32 * (j + 1)].hex(),
+                                                    datos_checkpoint(tramo[j]), timestamp, versiones[j]))
+        elif versiones[j] == VERSION_ACTUAL:
+            h = hashlib.sha256(PREFIJO_V2)
+            h.update(fijos[ancho * j:ancho * (j + 1)])
+            h.update(timestamp.encode("utf-8"))
+            calculado = h.digest()
+        else:
+            """
+            Mismo texto que str(datos) del bloque original
+            """
+            datos = "{" + ", ".join(
+                f"'{SENALES[k]}': {{'media': {medias[j][k]!r}, 'desv': {desvios[j][k]!r}}}"
+                for k in PERMUTACIONES[ordenes[j]]
+            ) + "}"
+            contenido = prev_hashes[32 * j:32 * (j + 1)].hex() + datos + timestamp
+            calculado = hashlib.sha256(contenido.encode()).digest()
+        if calculado != hashes[32 * j:32 * (j + 1)]:
+            invalidos.append((inicio + j, calculado.hex()))
+    return invalidos
+
+def checkpoints_invalidos(arreglo, desde=0):
+    """
+    Checkpoints Merkle (desde la altura `desde`) cuya raíz no coincide con
+    la de los bloques de su tramo, como (altura, datos esperados). El tramo
+    empieza después del checkpoint anterior y termina en el propio
+    """
+    invalidos = []
+    alturas = np.flatnonzero(arreglo["tipo"] == REGISTRO_CHECKPOINT).tolist()
+    inicio = 0
+    for altura in alturas:
+        if altura >= desde:
+            crudos = arreglo["hash"][inicio:altura].tobytes()
+            hashes = [crudos[k:k + 32].hex() for k in range(0, len(crudos), 32)]
+            esperado = {"desde": inicio, "hasta": altura, "raiz": raiz_merkle(hashes, inicio)}
+            if datos_checkpoint(arreglo[altura]) != esperado:
+                invalidos.append((altura, esperado))
+        inicio = altura + 1
+    return invalidos
+
+def encadenamientos_rotos(arreglo):
+    """
+    Alturas cuyo prev_hash no coincide con el hash del bloque anterior
+    (comparación vectorizada de las dos columnas)
+    """
+    if len(arreglo) < 2:
+        return []
+    distintos = np.any(arreglo["prev_hash"][1:] != arreglo["hash"][:-1], axis=1)
+    return (np.flatnonzero(distintos) + 1).tolist()
+
+def convertir(entrada, salida):
+    """
+    Convierte entre blockchain.json y el formato binario; el sentido se
+    deduce del contenido de `entrada`. Devuelve la cantidad de bloques.
+    Una cadena con estadísticas extendidas (--extendidas) se rechaza en el
+    primer bloque, sin leer el resto
+    """
+    if es_binario(entrada):
+        cantidad = len(leer_binario(entrada))
+        escribir_json_bloques(iterar_bloques_binario(entrada), salida)
+        return cantidad
+
+    from verificar_cadena import iterar_bloques_json
+    return escribir_binario((bloque for bloque, _, _ in iterar_bloques_json(entrada)), salida)
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversión entre blockchain.json y el formato binario")
+    parser.add_argument("entrada", help="Cadena de origen (JSON o binaria)")
+    parser.add_argument("salida", help="Archivo de destino (en el otro formato)")
+    args = parser.parse_args()
+
+    try:
+        cantidad = convertir(args.entrada, args.salida)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return
+
+    print(f"✅ {cantidad} bloques convertidos: {args.entrada} -> {args.salida} "
+          f"({os.path.getsize(args.entrada)} -> {os.path.getsize(args.salida)} bytes)")
+
+if __name__ == "__main__":
+    main()
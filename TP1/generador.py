@@ -1,71 +1,271 @@
 """
 Proceso Principal - Generador de datos biométricos
-Genera 60 muestras (1 por segundo) y las envía a los analizadores
+Genera muestras a una tasa configurable (por defecto 60 muestras, 1 por segundo)
+y las envía a los analizadores
 """
 import json
+import os
 import time
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from multiprocessing import Process, Pipe
 
-def generar_datos_biometricos():
+import numpy as np
+
+from metricas import SalidaLimitada
+
+def generar_datos_biometricos(seq=0, momento=None):
     """
-    Genera un diccionario con datos biométricos simulados
+    Genera un diccionario con datos biométricos simulados.
+    `seq` identifica la muestra de forma monótona y `momento` es el
+    instante (simulado) de la muestra, con resolución de microsegundos
     """
-    timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-    
+    momento = momento or datetime.now()
+    timestamp = momento.isoformat(timespec="microseconds")
+
     # Rangos exactos según consignas
     frecuencia = random.randint(60, 180)
     presion_sistolica = random.randint(110, 180)
     presion_diastolica = random.randint(70, 110)
     oxigeno = random.randint(90, 100)
-    
+
     return {
+        "seq": seq,
         "timestamp": timestamp,
         "frecuencia": frecuencia,
         "presion": [presion_sistolica, presion_diastolica],
         "oxigeno": oxigeno
     }
 
-def proceso_generador(pipe_frecuencia, pipe_presion, pipe_oxigeno):
+def generar_datos_pacientes(seq, cantidad, momento=None, rng=None):
+    """
+    Genera una muestra por paciente en forma vectorizada, con los mismos
+    rangos que generar_datos_biometricos (un arreglo por señal)
+    """
+    rng = rng or np.random.default_rng()
+    momento = momento or datetime.now()
+
+    return {
+        "seq": seq,
+        "timestamp": momento.isoformat(timespec="microseconds"),
+        "frecuencia": rng.integers(60, 181, cantidad),
+        "presion": np.column_stack((rng.integers(110, 181, cantidad), rng.integers(70, 111, cantidad))),
+        "oxigeno": rng.integers(90, 101, cantidad)
+    }
+
+def _programa(muestras, tasa, velocidad, desde=0, inicio_simulado=None):
+    """
+    Recorre las muestras a generar devolviendo (i, instante simulado,
+    instante real programado para enviarla), con el instante real contra un
+    reloj monótono para no acumular deriva (None si la velocidad no tiene
+    límite). Quien lo recorre espera hasta ese instante como corresponda a
+    su modo de ejecución.
+    `desde` e `inicio_simulado` permiten retomar una generación interrumpida
+    """
+    intervalo_simulado = timedelta(seconds=1 / tasa)
+    intervalo_real = 1 / (tasa * velocidad) if velocidad > 0 else 0
+
+    inicio_simulado = inicio_simulado or datetime.now()
+    inicio_real = time.monotonic()
+
+    for i in range(desde, muestras):
+        instante = inicio_real + (i - desde) * intervalo_real if intervalo_real > 0 else None
+        yield i, inicio_simulado + i * intervalo_simulado, instante
+
+def _ritmo(programa):
+    """
+    Recorre un _programa esperando (bloqueante) hasta el instante de cada
+    muestra. Devuelve (i, instante simulado)
+    """
+    for i, momento, instante in programa:
+        if instante is not None:
+            espera = instante - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+        yield i, momento
+
+class EtapaGenerador:
     """
-    Proceso principal que genera y envía datos cada segundo
+    Lógica del generador, independiente del transporte: arma cada muestra y
+    lleva la cuenta de las enviadas; el envío y la espera entre muestras
+    los hace quien la ejecuta (proceso_generador o la tarea de asyncio de
+    ejecucion.py). Las opciones son las de proceso_generador
     """
-    print("Iniciando generación de datos biométricos...")
-    print("Generando 60 muestras (1 por segundo)")
-    
-    for i in range(60):
-        """ 
-        Generar datos 
+
+    def __init__(self, muestras=60, duracion=None, tasa=1.0, velocidad=1.0,
+                 detallado=False, intervalo_log=1.0, progreso=None, reinicio=None):
+        if duracion is not None:
+            muestras = max(1, int(duracion * tasa))
+
+        self.muestras = muestras
+        self.tasa = tasa
+        self.velocidad = velocidad
+        self.progreso = progreso
+        self.desde = 0
+        self.inicio_simulado = None
+        if progreso is not None:
+            if progreso[1]:
+                self.desde = int(progreso[0])
+                self.inicio_simulado = datetime.fromtimestamp(progreso[1])
+            else:
+                self.inicio_simulado = datetime.now()
+                progreso[1] = self.inicio_simulado.timestamp()
+        if reinicio is not None:
+            print(f"♻️  Generador reanudado en la muestra {self.desde + 1}/{muestras} "
+                  f"(recuperación: {(time.monotonic() - reinicio) * 1000:.1f} ms)")
+
+        print(f"Iniciando generación de datos biométricos... (pid={os.getpid()})")
+        print(f"Generando {muestras} muestras ({tasa:g} por segundo simulado, "
+              f"velocidad {'sin límite' if velocidad <= 0 else f'x{velocidad:g}'})")
+
+        self.salida = SalidaLimitada(intervalo_log, detallado)
+        self.enviadas = 0
+        self.inicio_real = time.monotonic()
+
+    def programa(self):
+        """
+        (i, instante simulado, instante real programado) de cada muestra
         """
-        datos = generar_datos_biometricos()
-        
-        print(f"Muestra {i+1}/60 - {datos['timestamp']}: "
-              f"FC={datos['frecuencia']}, "
-              f"PA={datos['presion'][0]}/{datos['presion'][1]}, "
-              f"O2={datos['oxigeno']}%")
-        
-        """ 
-        Enviar los mismos datos a los 3 analizadores 
+        return _programa(self.muestras, self.tasa, self.velocidad, self.desde, self.inicio_simulado)
+
+    def muestra(self, i, momento):
+        """
+        Genera la muestra `i`, lista para enviar
+        """
+        datos = generar_datos_biometricos(i, momento)
+
+        if self.salida.permite():
+            self.salida.imprimir(f"Muestra {i+1}/{self.muestras} - {datos['timestamp']}: "
+                                 f"FC={datos['frecuencia']}, "
+                                 f"PA={datos['presion'][0]}/{datos['presion'][1]}, "
+                                 f"O2={datos['oxigeno']}%")
+
+        """
+        Instante de generación (reloj monótono) para medir la latencia de cada etapa
+        """
+        datos["t_gen"] = time.monotonic()
+        return datos
+
+    def enviada(self, i):
+        self.enviadas += 1
+        if self.progreso is not None:
+            self.progreso[0] = i + 1
+
+    def finalizar(self):
+        transcurrido = time.monotonic() - self.inicio_real
+        print(f"Generación completada: {self.enviadas} muestras en {transcurrido:.2f}s "
+              f"({self.enviadas / transcurrido if transcurrido > 0 else 0:.1f} muestras/s)")
+
+def crear_etapa_generador(grabacion=None, **opciones):
+    """
+    Fuente de muestras: el generador aleatorio o, con `grabacion`, el
+    reproductor de esa grabación (reproductor.EtapaReproductor)
+    """
+    if grabacion is not None:
+        from reproductor import EtapaReproductor
+        return EtapaReproductor(grabacion, **opciones)
+    return EtapaGenerador(**opciones)
+
+def proceso_generador(*canales, muestras=60, duracion=None, tasa=1.0, velocidad=1.0,
+                      detallado=False, intervalo_log=1.0, progreso=None, reinicio=None,
+                      grabacion=None):
+    """
+    Proceso principal que genera y envía datos.
+    Cada canal expone `send` (un Pipe por analizador, un único escritor de
+    memoria compartida que todos los analizadores leen, o un canal entre
+    hilos).
+
+    - `tasa`: muestras por segundo del monitor simulado; define el reloj
+      simulado (la muestra `seq` tiene timestamp inicio + seq / tasa)
+    - `velocidad`: factor de aceleración respecto del tiempo real
+      (0 = sin límite, tan rápido como lo permitan los analizadores)
+    - `duracion`: segundos simulados a generar; si se indica, reemplaza a `muestras`
+    - `detallado`: mostrar cada muestra (si no, como máximo una cada `intervalo_log` s)
+    - `progreso`: multiprocessing.Array("d", 2) compartido con el supervisor,
+      con la próxima muestra a enviar y el inicio del reloj simulado (epoch);
+      si el generador se reinicia (`reinicio`) sigue desde ahí
+    - `grabacion`: reproducir ese archivo (CSV, JSON Lines o .npy) en lugar
+      de generar muestras aleatorias; `muestras` None = toda la grabación
+    """
+    etapa = crear_etapa_generador(grabacion, muestras=muestras, duracion=duracion, tasa=tasa,
+                                  velocidad=velocidad, detallado=detallado, intervalo_log=intervalo_log,
+                                  progreso=progreso, reinicio=reinicio)
+
+    for i, momento in _ritmo(etapa.programa()):
+        """
+        Generar datos
+        """
+        datos = etapa.muestra(i, momento)
+
+        """
+        Enviar los mismos datos a todos los canales
         """
         try:
-            pipe_frecuencia.send(datos)
-            pipe_presion.send(datos)
-            pipe_oxigeno.send(datos)
+            for canal in canales:
+                canal.send(datos)
         except Exception as e:
             print(f"Error enviando datos: {e}")
             break
-        
-        """ 
-        Espera 1 segundo antes de la siguiente muestra
-        """
-        time.sleep(1)
-    
-    pipe_frecuencia.send(None)
-    pipe_presion.send(None)
-    pipe_oxigeno.send(None)
-    
-    print("Generación completada.")
+        etapa.enviada(i)
+
+    for canal in canales:
+        canal.send(None)
+
+    etapa.finalizar()
+
+def proceso_generador_pacientes(canales, fragmentos, muestras=60, duracion=None, tasa=1.0,
+                                velocidad=1.0, detallado=False, intervalo_log=1.0):
+    """
+    Generador de varios pacientes: en cada tick genera una muestra por
+    paciente y envía a cada canal solo su fragmento de pacientes.
+    `fragmentos[k]` es el rango (inicio, fin) de pacientes del canal `k`;
+    el resto de las opciones son las de proceso_generador
+    """
+    if duracion is not None:
+        muestras = max(1, int(duracion * tasa))
+    pacientes = max(fin for _, fin in fragmentos)
+
+    print(f"Iniciando generación de datos biométricos de {pacientes} pacientes...")
+    print(f"Generando {muestras} muestras por paciente ({tasa:g} por segundo simulado, "
+          f"velocidad {'sin límite' if velocidad <= 0 else f'x{velocidad:g}'})")
+
+    salida = SalidaLimitada(intervalo_log, detallado)
+    rng = np.random.default_rng()
+    enviadas = 0
+    inicio_real = time.monotonic()
+
+    for i, momento in _ritmo(_programa(muestras, tasa, velocidad)):
+        datos = generar_datos_pacientes(i, pacientes, momento, rng)
+
+        if salida.permite():
+            salida.imprimir(f"Muestra {i+1}/{muestras} - {datos['timestamp']}: {pacientes} pacientes, "
+                            f"FC media={datos['frecuencia'].mean():.1f}, "
+                            f"O2 media={datos['oxigeno'].mean():.1f}%")
+
+        datos["t_gen"] = time.monotonic()
+
+        try:
+            for canal, (inicio, fin) in zip(canales, fragmentos):
+                canal.send({
+                    "seq": i,
+                    "timestamp": datos["timestamp"],
+                    "pacientes": (inicio, fin),
+                    "frecuencia": datos["frecuencia"][inicio:fin],
+                    "presion": datos["presion"][inicio:fin],
+                    "oxigeno": datos["oxigeno"][inicio:fin],
+                    "t_gen": datos["t_gen"]
+                })
+        except Exception as e:
+            print(f"Error enviando datos: {e}")
+            break
+        enviadas += 1
+
+    for canal in canales:
+        canal.send(None)
+
+    transcurrido = time.monotonic() - inicio_real
+    print(f"Generación completada: {enviadas} ticks de {pacientes} pacientes en {transcurrido:.2f}s "
+          f"({enviadas * pacientes / transcurrido if transcurrido > 0 else 0:.1f} muestras/s)")
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
@@ -2,99 +2,533 @@
 Programa Principal - Coordinador del Sistema Biométrico
 Crea y coordina todos los procesos según la arquitectura requerida
 """
-from multiprocessing import Process, Pipe, Queue
+from multiprocessing import Array, Process, Pipe, Queue
+import argparse
+import math
+import os
 import time
 import sys
 
 # Importar nuestros módulos
-from generador import proceso_generador
-from analizador import proceso_analizador
-from verificador import proceso_verificador
+from generador import proceso_generador, proceso_generador_pacientes
+from analizador import proceso_analizador, proceso_analizador_pacientes
+from verificador import proceso_verificador, proceso_verificador_pacientes
+from transporte import AnilloCompartido
+from ejecucion import MODOS, ejecutar_asyncio, ejecutar_hilos
+from reproductor import resumen_grabacion
+from supervision import CanalesResultados, CheckpointVentana, Supervisor
+
+def parsear_argumentos():
+    """
+    Opciones de ejecución del sistema
+    """
+    parser = argparse.ArgumentParser(description="Sistema Concurrente de Análisis Biométrico")
+    parser.add_argument(
+        "--ventana",
+        type=int,
+        default=30,
+        help="Tamaño de la ventana móvil de los analizadores (default: 30 muestras)"
+    )
+    parser.add_argument(
+        "-n", "--muestras",
+        type=int,
+        default=None,
+        help="Cantidad de muestras a generar (default: 60, o toda la grabación con --reproducir)"
+    )
+    parser.add_argument(
+        "-d", "--duracion",
+        type=float,
+        default=None,
+        help="Segundos simulados a generar; reemplaza a --muestras"
+    )
+    parser.add_argument(
+        "-r", "--tasa",
+        type=float,
+        default=1.0,
+        help="Muestras por segundo del monitor simulado (default: 1)"
+    )
+    parser.add_argument(
+        "--velocidad",
+        type=float,
+        default=1.0,
+        help="Aceleración respecto del tiempo real; 0 = sin límite (default: 1)"
+    )
+    parser.add_argument(
+        "--reproducir",
+        default=None,
+        metavar="ARCHIVO",
+        help="Reproducir una grabación (CSV, JSON Lines o .npy; ver reproductor.py) en lugar "
+             "de generar muestras aleatorias; --velocidad se aplica a los intervalos grabados"
+    )
+    parser.add_argument(
+        "--retraso-max",
+        type=float,
+        default=None,
+        help="Segundos que el verificador espera los resultados faltantes de una "
+             "muestra antes de descartarla (default: 2; sin límite con --reproducir)"
+    )
+    parser.add_argument(
+        "--max-pendientes",
+        type=int,
+        default=10000,
+        help="Máximo de muestras incompletas en el buffer de reordenamiento (default: 10000)"
+    )
+    parser.add_argument(
+        "--lote",
+        type=int,
+        default=32,
+        help="Resultados por mensaje de cada analizador al verificador (default: 32; 1 = sin lotes)"
+    )
+    parser.add_argument(
+        "--espera-lote",
+        type=float,
+        default=0.05,
+        help="Segundos máximos que un resultado espera en un lote incompleto (default: 0.05)"
+    )
+    parser.add_argument(
+        "-x", "--extendidas",
+        action="store_true",
+        help="Calcular además mediana, percentiles, mínimo, máximo y EWMA de cada "
+             "ventana (incrementales) e incluirlos en los datos de cada bloque "
+             "(la cadena no se puede convertir al formato binario)"
+    )
+    parser.add_argument(
+        "--percentiles",
+        type=float,
+        nargs="+",
+        default=[50, 90],
+        help="Con --extendidas, percentiles de la ventana a incluir (default: 50 90)"
+    )
+    parser.add_argument(
+        "--alfa-ewma",
+        type=float,
+        default=0.1,
+        help="Con --extendidas, factor de suavizado de la EWMA, en (0, 1] (default: 0.1)"
+    )
+    parser.add_argument(
+        "-m", "--modo",
+        choices=MODOS,
+        default="procesos",
+        help="Cómo se ejecutan las etapas: un proceso por etapa, un hilo por etapa "
+             "o tareas de asyncio en un solo hilo (default: procesos)"
+    )
+    parser.add_argument(
+        "-t", "--transporte",
+        choices=["pipe", "memoria"],
+        default="pipe",
+        help="Transporte Generador -> Analizadores: un Pipe por analizador o un "
+             "buffer circular en memoria compartida (default: pipe)"
+    )
+    parser.add_argument(
+        "--capacidad",
+        type=int,
+        default=1024,
+        help="Cantidad de muestras del buffer circular en memoria compartida, o de "
+             "cada canal en los modos hilos y asyncio (default: 1024)"
+    )
+    parser.add_argument(
+        "--detallado",
+        action="store_true",
+        help="Mostrar un mensaje por cada muestra, resultado y bloque (por defecto se limitan)"
+    )
+    parser.add_argument(
+        "--intervalo-log",
+        type=float,
+        default=1.0,
+        help="Sin --detallado, segundos mínimos entre mensajes por muestra de cada proceso (default: 1)"
+    )
+    parser.add_argument(
+        "--intervalo-metricas",
+        type=float,
+        default=5.0,
+        help="Segundos entre resúmenes de métricas en vivo del verificador; 0 = solo al final (default: 5)"
+    )
+    parser.add_argument(
+        "--metricas",
+        default=None,
+        help="Archivo JSON donde guardar las métricas por etapa al finalizar"
+    )
+    parser.add_argument(
+        "--reglas",
+        default=None,
+        help="Archivo JSON con las reglas de alerta (default: las de consignas; ver reglas.py)"
+    )
+    parser.add_argument(
+        "--cadena",
+        default="cadena",
+        help="Directorio del registro append-only de bloques (default: cadena)"
+    )
+    parser.add_argument(
+        "--fsync",
+        choices=["siempre", "lote", "nunca"],
+        default="lote",
+        help="Política de fsync del registro de bloques (default: lote)"
+    )
+    parser.add_argument(
+        "--segmento-mb",
+        type=int,
+        default=16,
+        help="Tamaño máximo de cada segmento del registro en MiB (default: 16)"
+    )
+    parser.add_argument(
+        "--merkle",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Encadenar cada N bloques un checkpoint con la raíz Merkle del tramo, para "
+             "pruebas de inclusión con merkle.py; 0 = sin checkpoints (default: 0)"
+    )
+    parser.add_argument(
+        "--reinicios-max",
+        type=int,
+        default=3,
+        help="Reinicios permitidos por proceso caído antes de abandonarlo (default: 3)"
+    )
+    parser.add_argument(
+        "--checkpoint-cada",
+        type=int,
+        default=1,
+        help="Lotes enviados entre checkpoints del estado de cada analizador (default: 1)"
+    )
+    parser.add_argument(
+        "-p", "--pacientes",
+        type=int,
+        default=None,
+        help="Monitorear N pacientes a la vez con analizadores vectorizados "
+             "(una cadena por paciente); sin esta opción, un solo paciente"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=None,
+        help="Con --pacientes, procesos analizadores entre los que se reparten "
+             "los pacientes (default: cantidad de CPUs)"
+    )
+    return parser.parse_args()
+
+def fragmentar(pacientes, workers):
+    """
+    Reparte los pacientes en `workers` rangos contiguos (inicio, fin) de
+    tamaño parecido
+    """
+    workers = max(1, min(workers, pacientes))
+    base, resto = divmod(pacientes, workers)
+    fragmentos = []
+    inicio = 0
+    for k in range(workers):
+        fin = inicio + base + (1 if k < resto else 0)
+        fragmentos.append((inicio, fin))
+        inicio = fin
+    return fragmentos
+
+def ejecutar_pacientes(args, duracion_real, espera_maxima):
+    """
+    Modo de varios pacientes: un generador, un analizador vectorizado por
+    fragmento de pacientes (con las tres señales) y un verificador con una
+    cadena por paciente. El transporte es un Pipe por analizador
+    """
+    fragmentos = fragmentar(args.pacientes, args.workers or os.cpu_count() or 1)
+    print(f"Pacientes: {args.pacientes} en {len(fragmentos)} analizadores")
+
+    pipes = [Pipe() for _ in fragmentos]
+    queue_resultados = Queue()
+    opciones_salida = {"detallado": args.detallado, "intervalo_log": args.intervalo_log}
+
+    procesos = [
+        Process(
+            target=proceso_generador_pacientes,
+            args=([envio for envio, _ in pipes], fragmentos),
+            kwargs={
+                "muestras": args.muestras,
+                "duracion": args.duracion,
+                "tasa": args.tasa,
+                "velocidad": args.velocidad,
+                **opciones_salida
+            },
+            name="Generador"
+        ),
+        Process(
+            target=proceso_verificador_pacientes,
+            args=(queue_resultados, args.pacientes, len(fragmentos), args.cadena, args.fsync,
+                  args.segmento_mb * 1024 * 1024, espera_maxima),
+            kwargs={
+                **opciones_salida,
+                "intervalo_metricas": args.intervalo_metricas,
+                "ruta_metricas": args.metricas,
+                "ruta_reglas": args.reglas
+            },
+            name="Verificador"
+        )
+    ]
+    for (_, recepcion), (inicio, fin) in zip(pipes, fragmentos):
+        procesos.append(Process(
+            target=proceso_analizador_pacientes,
+            args=(recepcion, queue_resultados, inicio, fin, args.ventana),
+            kwargs=opciones_salida,
+            name=f"Analizador-{inicio}-{fin - 1}"
+        ))
+    proceso_gen, proceso_verif, analizadores = procesos[0], procesos[1], procesos[2:]
+
+    try:
+        print("Iniciando procesos...")
+        for proceso in procesos:
+            proceso.start()
+        print("-" * 60)
+
+        proceso_gen.join(timeout=duracion_real + 10 if duracion_real is not None else None)
+        for proceso in analizadores:
+            proceso.join(timeout=10)
+        proceso_verif.join()
+
+    except KeyboardInterrupt:
+        print("\nInterrupción del usuario. Terminando procesos...")
+        for proceso in procesos:
+            if proceso.is_alive():
+                proceso.terminate()
+                proceso.join(timeout=2)
+                if proceso.is_alive():
+                    proceso.kill()
+
+    finally:
+        for envio, recepcion in pipes:
+            envio.close()
+            recepcion.close()
+        queue_resultados.close()
+
+    print(f"Listo. Cadenas por paciente en {args.cadena}/paciente_NNNN/")
 
 def main():
     """
     Función principal que coordina todo el sistema
     """
+    args = parsear_argumentos()
+
     print("=== Sistema Concurrente de Análisis Biométrico ===")
     print("Tarea 2: Verificación y Construcción de Bloques")
     print()
     
+    if args.reproducir is not None:
+        """
+        La espera máxima del verificador tiene que cubrir la mayor brecha
+        de la grabación a la velocidad de reproducción
+        """
+        try:
+            resumen = resumen_grabacion(args.reproducir, args.tasa)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error en la grabación: {e}")
+            return
+        if args.pacientes is not None:
+            print("❌ Error: --reproducir solo está disponible sin --pacientes")
+            return
+        print(f"Grabación: {args.reproducir} ({resumen['cantidad']} muestras, "
+              f"mayor brecha {resumen['brecha_max']:g}s)")
+        
+        """
+        Al reproducir importa no perder muestras (la misma grabación debe dar
+        la misma cadena): solo se descarta por --max-pendientes
+        """
+        if args.retraso_max is None:
+            args.retraso_max = math.inf
+        duracion_real = None
+        espera_maxima = max(10, 3 * resumen["brecha_max"] / args.velocidad) if args.velocidad > 0 else 10
+    else:
+        if args.muestras is None:
+            args.muestras = 60
+        if args.retraso_max is None:
+            args.retraso_max = 2.0
+        
+        """
+        Tiempo real esperado de la generación (None si corre sin límite) y
+        espera máxima del verificador entre resultados
+        """
+        muestras = int(args.duracion * args.tasa) if args.duracion is not None else args.muestras
+        duracion_real = muestras / (args.tasa * args.velocidad) if args.velocidad > 0 else None
+        espera_maxima = max(10, 3 / (args.tasa * args.velocidad)) if args.velocidad > 0 else 10
+    
+    if args.pacientes is not None:
+        if args.pacientes <= 0:
+            print("❌ Error: --pacientes debe ser mayor que 0")
+            return
+        if args.modo != "procesos":
+            print("❌ Error: --pacientes solo está disponible en el modo procesos")
+            return
+        if args.extendidas:
+            print("❌ Error: --extendidas solo está disponible sin --pacientes")
+            return
+        if args.merkle:
+            print("❌ Error: --merkle solo está disponible sin --pacientes")
+            return
+        ejecutar_pacientes(args, duracion_real, espera_maxima)
+        return
+    
+    if args.extendidas:
+        print("⚠️  Con --extendidas la cadena no se puede convertir al formato binario "
+              "(formato_binario.py guarda solo media y desviación)")
+    
     """
-    Crear pipes para comunicación Generador -> Analizadores 
+    Opciones de cada etapa, comunes a los tres modos de ejecución
     """
-    pipe_gen_freq, pipe_recv_freq = Pipe()  # Para analizador de frecuencia
-    pipe_gen_pres, pipe_recv_pres = Pipe()  # Para analizador de presión  
-    pipe_gen_oxi, pipe_recv_oxi = Pipe()    # Para analizador de oxígeno
+    opciones_generador = {
+        "muestras": args.muestras,
+        "duracion": args.duracion,
+        "tasa": args.tasa,
+        "velocidad": args.velocidad,
+        "detallado": args.detallado,
+        "intervalo_log": args.intervalo_log,
+        "grabacion": args.reproducir
+    }
+    opciones_analizador = {
+        "tamano_ventana": args.ventana,
+        "tamano_lote": args.lote,
+        "espera_lote": args.espera_lote,
+        "detallado": args.detallado,
+        "intervalo_log": args.intervalo_log,
+        "extendidas": args.extendidas,
+        "percentiles": tuple(args.percentiles),
+        "alfa_ewma": args.alfa_ewma
+    }
+    opciones_verificador = {
+        "directorio_cadena": args.cadena,
+        "politica_fsync": args.fsync,
+        "tamano_segmento": args.segmento_mb * 1024 * 1024,
+        "espera_maxima": espera_maxima,
+        "retraso_max": args.retraso_max,
+        "max_pendientes": args.max_pendientes,
+        "detallado": args.detallado,
+        "intervalo_log": args.intervalo_log,
+        "intervalo_metricas": args.intervalo_metricas,
+        "ruta_metricas": args.metricas,
+        "ruta_reglas": args.reglas,
+        "merkle_cada": max(0, args.merkle)
+    }
+    
+    if args.modo != "procesos":
+        """
+        Un solo proceso: las etapas se comunican por colas en memoria, sin
+        pickles ni IPC (y sin supervisor: una caída termina todo el proceso)
+        """
+        print(f"Modo de ejecución: {args.modo} (canales de {args.capacidad} muestras)")
+        ejecutar = ejecutar_hilos if args.modo == "hilos" else ejecutar_asyncio
+        try:
+            ejecutar(opciones_generador, opciones_analizador, opciones_verificador, args.capacidad)
+        except KeyboardInterrupt:
+            print("\nInterrupción del usuario. Terminando...")
+        print("Tarea 2 completada. Revisa el archivo blockchain.json generado.")
+        return
+    
+    anillo = None
+    if args.transporte == "memoria":
+        """
+        Buffer circular compartido: el generador escribe cada muestra una vez
+        y cada analizador la lee con su propio cursor
+        """
+        anillo = AnilloCompartido(capacidad=args.capacidad, lectores=3)
+        extremos_gen = (anillo.escritor(),)
+        recv_freq = anillo.lector(0)
+        recv_pres = anillo.lector(1)
+        recv_oxi = anillo.lector(2)
+    else:
+        """
+        Crear pipes para comunicación Generador -> Analizadores 
+        """
+        pipe_gen_freq, recv_freq = Pipe()  # Para analizador de frecuencia
+        pipe_gen_pres, recv_pres = Pipe()  # Para analizador de presión  
+        pipe_gen_oxi, recv_oxi = Pipe()    # Para analizador de oxígeno
+        extremos_gen = (pipe_gen_freq, pipe_gen_pres, pipe_gen_oxi)
+    
+    print(f"Transporte Generador -> Analizadores: {args.transporte}")
     
     """
-    Crear queue para comunicación Analizadores -> Verificador
+    Crear el canal Analizadores -> Verificador (una queue nueva por cada
+    reinicio del verificador)
     """
-    queue_resultados = Queue()
+    canales_resultados = CanalesResultados(args.reinicios_max)
+    
+    """
+    Estado compartido con el proceso principal para los reinicios: el
+    progreso del generador y un checkpoint de la ventana por analizador
+    """
+    progreso = Array("d", 2)
+    checkpoints = {senal: CheckpointVentana(args.ventana) for senal in ("frecuencia", "presion", "oxigeno")}
+    supervisor = Supervisor(reinicios_max=args.reinicios_max)
     
     try:
         """
-        Crear proceso generador 
+        Proceso generador 
         """
-        proceso_gen = Process(
-            target=proceso_generador,
-            args=(pipe_gen_freq, pipe_gen_pres, pipe_gen_oxi),
-            name="Generador"
-        )
+        def crear_generador(reinicio):
+            return Process(
+                target=proceso_generador,
+                args=extremos_gen,
+                kwargs={
+                    **opciones_generador,
+                    "progreso": progreso,
+                    "reinicio": reinicio
+                },
+                name="Generador"
+            )
         
         """
-        Crear proceso verificador
+        Proceso verificador (al reiniciarse no espera el fin de los
+        analizadores que ya terminaron)
         """
-        proceso_verif = Process(
-            target=proceso_verificador,
-            args=(queue_resultados,),
-            name="Verificador"
-        )
+        def crear_verificador(reinicio):
+            """
+            El reiniciado lee de una queue nueva: la anterior pudo quedar con
+            el lock de lectura tomado o un mensaje leído a medias
+            """
+            queue_resultados = canales_resultados.actual() if reinicio is None else canales_resultados.nueva()
+            terminados = [nombre.split("-")[1].lower() for nombre in supervisor.terminadas()
+                          if nombre.startswith("Analizador-")]
+            return Process(
+                target=proceso_verificador,
+                args=(queue_resultados,),
+                kwargs={
+                    **opciones_verificador,
+                    "reinicio": reinicio,
+                    "terminados": terminados
+                },
+                name="Verificador"
+            )
         
         """
-        Crear procesos analizadores
+        Procesos analizadores
         """
-        proceso_freq = Process(
-            target=proceso_analizador,
-            args=(pipe_recv_freq, queue_resultados, "frecuencia"),
-            name="Analizador-Frecuencia"
-        )
+        def fabrica_analizador(recepcion, senal):
+            def crear_analizador(reinicio):
+                return Process(
+                    target=proceso_analizador,
+                    args=(recepcion, canales_resultados, senal),
+                    kwargs={
+                        **opciones_analizador,
+                        "checkpoint": checkpoints[senal],
+                        "checkpoint_cada": args.checkpoint_cada,
+                        "reinicio": reinicio
+                    },
+                    name=f"Analizador-{senal.capitalize()}"
+                )
+            return crear_analizador
         
-        proceso_pres = Process(
-            target=proceso_analizador,
-            args=(pipe_recv_pres, queue_resultados, "presion"),
-            name="Analizador-Presion"
-        )
-        
-        proceso_oxi = Process(
-            target=proceso_analizador,
-            args=(pipe_recv_oxi, queue_resultados, "oxigeno"),
-            name="Analizador-Oxigeno"
-        )
+        supervisor.agregar("Generador", crear_generador)
+        supervisor.agregar("Verificador", crear_verificador)
+        supervisor.agregar("Analizador-Frecuencia", fabrica_analizador(recv_freq, "frecuencia"))
+        supervisor.agregar("Analizador-Presion", fabrica_analizador(recv_pres, "presion"))
+        supervisor.agregar("Analizador-Oxigeno", fabrica_analizador(recv_oxi, "oxigeno"))
         
         print("Iniciando procesos...")
-        proceso_gen.start()
-        proceso_verif.start()  
-        proceso_freq.start()
-        proceso_pres.start()
-        proceso_oxi.start()
+        supervisor.iniciar()
         
         print("Procesos iniciados. El verificador construirá la blockchain...")
         print("(Presiona Ctrl+C para terminar anticipadamente)")
         print("-" * 60)
         
-        proceso_gen.join(timeout=70)
-        
         """
-        Dar tiempo extra para que los analizadores terminen 
+        Esperar a que terminen todas las etapas, reiniciando las que caigan.
+        El verificador termina solo cuando los analizadores le avisan el fin,
+        o por inactividad
         """
-        proceso_freq.join(timeout=10)
-        proceso_pres.join(timeout=10)
-        proceso_oxi.join(timeout=10)
-        
-        """
-        Dar tiempo al verificador para procesar todos los resultados
-        """
-        proceso_verif.join(timeout=15)
+        supervisor.esperar()
+        print(f"Supervisor: {supervisor.resumen()}")
         
     except KeyboardInterrupt:
         print("\nInterrupción del usuario. Terminando procesos...")
@@ -102,25 +536,20 @@ def main():
         """
         Terminar procesos si siguen vivos 
         """
-        for proceso in [proceso_gen, proceso_verif, proceso_freq, proceso_pres, proceso_oxi]:
-            if proceso.is_alive():
-                proceso.terminate()
-                proceso.join(timeout=2)
-                if proceso.is_alive():
-                    proceso.kill()
+        supervisor.terminar()
         
     except Exception as e:
         print(f"Error en el programa principal: {e}")
         
     finally:
         try:
-            pipe_gen_freq.close()
-            pipe_gen_pres.close()
-            pipe_gen_oxi.close()
-            pipe_recv_freq.close()
-            pipe_recv_pres.close()
-            pipe_recv_oxi.close()
-            queue_resultados.close()
+            for extremo in extremos_gen + (recv_freq, recv_pres, recv_oxi):
+                extremo.close()
+            canales_resultados.close()
+            if anillo is not None:
+                anillo.liberar()
+            for checkpoint in checkpoints.values():
+                checkpoint.liberar()
         except:
             pass
         
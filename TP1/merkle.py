@@ -0,0 +1,288 @@
+"""
+Compromisos Merkle - Árboles sobre tramos de bloques y pruebas de inclusión
+El verificador guarda la raíz de cada tramo en un bloque de checkpoint; probar un bloque cuesta O(log n) hashes
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+
+from codificacion import hash_bloque
+
+"""
+Los bloques de checkpoint se distinguen por esta clave; sus `datos` son
+{"desde", "hasta", "raiz"}: el tramo de alturas [desde, hasta) y la raíz
+del árbol de sus bloques (el checkpoint va en la altura `hasta`)
+"""
+TIPO_CHECKPOINT = "merkle"
+
+"""
+Prefijos de hoja y de nodo interno (como en RFC 6962), para que un nodo
+interno no pueda hacerse pasar por una hoja. La hoja incluye la altura:
+la prueba compromete también la posición del bloque en la cadena
+"""
+PREFIJO_HOJA = b"\x00"
+PREFIJO_NODO = b"\x01"
+FORMATO_ALTURA = struct.Struct("<Q")
+
+def es_checkpoint(bloque):
+    """
+    True si el bloque es un checkpoint Merkle (no lleva mediciones)
+    """
+    return bloque.get("tipo") == TIPO_CHECKPOINT
+
+def hash_hoja(altura, hash_bloque):
+    return hashlib.sha256(PREFIJO_HOJA + FORMATO_ALTURA.pack(altura) + bytes.fromhex(hash_bloque)).digest()
+
+def hash_nodo(izquierdo, derecho):
+    return hashlib.sha256(PREFIJO_NODO + izquierdo + derecho).digest()
+
+class AcumuladorMerkle:
+    """
+    Raíz Merkle de un tramo que crece bloque a bloque, con memoria
+    O(log n): una pila con la raíz de cada subárbol completo (tamaños
+    potencia de 2 decrecientes). Agregar una hoja cuesta O(1) hashes
+    amortizados y la raíz es la misma que arma `raiz_merkle` con el tramo
+    completo
+    """
+
+    def __init__(self, desde=0, cantidad=0, pila=()):
+        self.desde = desde
+        self.cantidad = cantidad
+        self.pila = [(tamano, bytes.fromhex(nodo)) for tamano, nodo in pila]
+
+    def __len__(self):
+        return self.cantidad
+
+    def agregar(self, hash_bloque):
+        """
+        Agrega el bloque siguiente del tramo (altura desde + cantidad)
+        """
+        tamano, nodo = 1, hash_hoja(self.desde + self.cantidad, hash_bloque)
+        while self.pila and self.pila[-1][0] == tamano:
+            _, izquierdo = self.pila.pop()
+            tamano, nodo = 2 * tamano, hash_nodo(izquierdo, nodo)
+        self.pila.append((tamano, nodo))
+        self.cantidad += 1
+
+    def raiz(self):
+        """
+        Raíz del tramo actual en hexadecimal (None si está vacío)
+        """
+        if not self.pila:
+            return None
+        nodo = self.pila[-1][1]
+        for _, izquierdo in reversed(self.pila[:-1]):
+            nodo = hash_nodo(izquierdo, nodo)
+        return nodo.hex()
+
+    def estado(self):
+        return {"desde": self.desde, "cantidad": self.cantidad,
+                "pila": [[tamano, nodo.hex()] for tamano, nodo in self.pila]}
+
+def _subarbol(nodos):
+    """
+    Raíz de una lista de nodos: los pares se combinan nivel a nivel y un
+    nodo impar sube sin cambios (igual a dividir en la mayor potencia de 2)
+    """
+    while len(nodos) > 1:
+        nodos = [hash_nodo(nodos[i], nodos[i + 1]) if i + 1 < len(nodos) else nodos[i]
+                 for i in range(0, len(nodos), 2)]
+    return nodos[0]
+
+def raiz_merkle(hashes, desde=0):
+    """
+    Raíz (hex) del árbol de los bloques de alturas desde, desde+1, ...
+    con esos hashes
+    """
+    if not hashes:
+        return None
+    return _subarbol([hash_hoja(desde + i, h) for i, h in enumerate(hashes)]).hex()
+
+def camino_inclusion(hashes, indice, desde=0):
+    """
+    Hermanos del bloque `indice` del tramo desde la hoja hasta la raíz,
+    como pares (lado, hash): "izq" o "der" según de qué lado se combina
+    """
+    nodos = [hash_hoja(desde + i, h) for i, h in enumerate(hashes)]
+    camino = []
+    while len(nodos) > 1:
+        hermano = indice ^ 1
+        if hermano < len(nodos):
+            camino.append(("izq" if hermano < indice else "der", nodos[hermano].hex()))
+        nodos = [hash_nodo(nodos[i], nodos[i + 1]) if i + 1 < len(nodos) else nodos[i]
+                 for i in range(0, len(nodos), 2)]
+        indice //= 2
+    return camino
+
+def raiz_desde_camino(altura, hash_bloque, camino):
+    """
+    Recalcula la raíz a partir de una hoja y su camino: 1 + len(camino)
+    hashes, es decir O(log n) para un tramo de n bloques
+    """
+    nodo = hash_hoja(altura, hash_bloque)
+    for lado, hermano in camino:
+        hermano = bytes.fromhex(hermano)
+        nodo = hash_nodo(hermano, nodo) if lado == "izq" else hash_nodo(nodo, hermano)
+    return nodo.hex()
+
+def _tramo(bloques, altura):
+    """
+    Recorre (altura, bloque) desde el inicio de un tramo hasta el
+    checkpoint que cubre `altura`. Devuelve (bloque, hashes del tramo,
+    altura del checkpoint, checkpoint)
+    """
+    hashes = []
+    objetivo = None
+    for actual, bloque in bloques:
+        if es_checkpoint(bloque):
+            if actual == altura:
+                raise ValueError(f"El bloque {altura + 1} es un checkpoint Merkle")
+            if objetivo is not None:
+                return objetivo, hashes, actual, bloque
+            hashes = []
+            continue
+        if actual == altura:
+            objetivo = bloque
+        hashes.append(bloque["hash"])
+
+    if objetivo is None:
+        raise ValueError(f"El bloque {altura + 1} no existe")
+    raise ValueError(f"El bloque {altura + 1} todavía no está cubierto por un checkpoint Merkle")
+
+def generar_prueba(cadena, altura):
+    """
+    Prueba de inclusión del bloque `altura` (0-based): el bloque, los
+    hermanos de su camino y el checkpoint con la raíz de su tramo.
+
+    En un directorio de registro solo se leen los bloques del tramo (acceso
+    directo por el índice); en blockchain.json se recorre el archivo en
+    streaming hasta el checkpoint, sin recalcular ningún hash
+    """
+    if os.path.isdir(cadena):
+        from almacenamiento import RegistroBloques
+        registro = RegistroBloques(cadena, solo_lectura=True)
+        if not 0 <= altura < len(registro):
+            raise ValueError(f"El bloque {altura + 1} no existe (la cadena tiene {len(registro)})")
+
+        """
+        Primero el checkpoint siguiente (que indica dónde empieza el tramo)
+        y después el tramo completo
+        """
+        desde = None
+        for bloque in registro.iterar_bloques(altura):
+            if es_checkpoint(bloque):
+                desde = bloque["datos"]["desde"]
+                break
+        if desde is None or desde > altura:
+            desde = altura
+        bloques = enumerate(registro.iterar_bloques(desde), desde)
+    else:
+        from verificar_cadena import iterar_bloques_json
+        bloques = enumerate(bloque for bloque, _, _ in iterar_bloques_json(cadena))
+
+    bloque, hashes, altura_checkpoint, checkpoint = _tramo(bloques, altura)
+    desde = checkpoint["datos"]["desde"]
+    return {
+        "altura": altura,
+        "bloque": bloque,
+        "camino": [list(par) for par in camino_inclusion(hashes, altura - desde, desde)],
+        "altura_checkpoint": altura_checkpoint,
+        "checkpoint": checkpoint
+    }
+
+def verificar_prueba(prueba):
+    """
+    Verifica una prueba de inclusión sin leer la cadena: recalcula el hash
+    del bloque, sube por el camino hasta la raíz y la compara con la del
+    checkpoint, cuyo hash también se recalcula. Devuelve (válida, motivo,
+    hashes calculados)
+    """
+    bloque = prueba["bloque"]
+    checkpoint = prueba["checkpoint"]
+    altura = prueba["altura"]
+    tramo = checkpoint["datos"]
+
+    if hash_bloque(bloque) != bloque["hash"]:
+        return False, "el contenido del bloque no coincide con su hash", 1
+    if not es_checkpoint(checkpoint) or hash_bloque(checkpoint) != checkpoint["hash"]:
+        return False, "el checkpoint no coincide con su hash", 2
+    if not tramo["desde"] <= altura < tramo["hasta"] or prueba["altura_checkpoint"] != tramo["hasta"]:
+        return False, f"el bloque {altura + 1} no pertenece al tramo del checkpoint", 2
+
+    raiz = raiz_desde_camino(altura, bloque["hash"], prueba["camino"])
+    calculados = 3 + len(prueba["camino"])
+    if raiz != tramo["raiz"]:
+        return False, "la raíz calculada no coincide con la del checkpoint", calculados
+    return True, "el bloque está incluido en el tramo del checkpoint", calculados
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Pruebas de inclusión sobre los checkpoints Merkle de la cadena")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    probar = comandos.add_parser("probar", help="Generar la prueba de inclusión de un bloque")
+    probar.add_argument("bloque", nargs="?", type=int,
+                        help="Número de bloque, como en 'Bloque N' (1 = el primero)")
+    probar.add_argument("--hash", help="Elegir el bloque por su hash (requiere un directorio de registro)")
+    probar.add_argument("-c", "--cadena", default="cadena",
+                        help="Directorio de registro o blockchain.json (default: cadena)")
+    probar.add_argument("-o", "--salida", default=None,
+                        help="Archivo donde guardar la prueba (default: mostrarla)")
+
+    verificar = comandos.add_parser("verificar", help="Verificar una prueba de inclusión")
+    verificar.add_argument("prueba", help="Archivo JSON generado con 'probar' (- = entrada estándar)")
+    return parser.parse_args()
+
+def main():
+    args = parsear_argumentos()
+
+    try:
+        if args.comando == "probar":
+            if args.hash is not None:
+                from consultas import ConsultasCadena
+                consultas = ConsultasCadena(args.cadena)
+                encontrado = consultas.por_hash(args.hash)
+                consultas.cerrar()
+                if encontrado is None:
+                    raise ValueError(f"No hay ningún bloque con hash {args.hash}")
+                altura = encontrado[0]
+            elif args.bloque is not None:
+                altura = args.bloque - 1
+            else:
+                raise ValueError("Indicar el número de bloque o --hash")
+
+            prueba = generar_prueba(args.cadena, altura)
+            texto = json.dumps(prueba, indent=2, ensure_ascii=False)
+            if args.salida is None:
+                print(texto)
+                return
+            with open(args.salida, "w", encoding="utf-8") as f:
+                f.write(texto + "\n")
+            print(f"🌳 Prueba del bloque {altura + 1} guardada en {args.salida}: "
+                  f"{len(prueba['camino'])} hermanos, checkpoint en el bloque {prueba['altura_checkpoint'] + 1} "
+                  f"(Hash={prueba['checkpoint']['hash'][:16]}...)")
+
+        elif args.comando == "verificar":
+            if args.prueba == "-":
+                prueba = json.load(sys.stdin)
+            else:
+                with open(args.prueba, "r", encoding="utf-8") as f:
+                    prueba = json.load(f)
+            valida, motivo, calculados = verificar_prueba(prueba)
+            print(f"{'✅' if valida else '❌'} Bloque {prueba['altura'] + 1}: {motivo} "
+                  f"({calculados} hashes calculados)")
+            if valida:
+                print(f"   Checkpoint: bloque {prueba['altura_checkpoint'] + 1}, "
+                      f"Hash={prueba['checkpoint']['hash']}")
+                print("   Comparar ese hash con una copia confiable de la cadena completa la prueba")
+            else:
+                sys.exit(1)
+
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Métricas - Histogramas de latencia de memoria constante e instrumentación
+por etapa del pipeline (latencia, throughput y salida por consola limitada)
+"""
+import json
+import math
+import time
+
+class Histograma:
+    """
+    Histograma con cubetas logarítmicas (8 por cada potencia de 2) sobre
+    valores en segundos desde 1 µs. La memoria no depende de la cantidad
+    de observaciones; los percentiles tienen un error relativo < 10%
+    """
+
+    CUBETAS_POR_OCTAVA = 8
+    MINIMO = 1e-6
+
+    def __init__(self, octavas=32):
+        self.cubetas = [0] * (octavas * self.CUBETAS_POR_OCTAVA + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.minimo = None
+        self.maximo = None
+
+    def _cubeta(self, valor):
+        if valor <= self.MINIMO:
+            return 0
+        indice = int(math.log2(valor / self.MINIMO) * self.CUBETAS_POR_OCTAVA) + 1
+        return min(indice, len(self.cubetas) - 1)
+
+    def _limite_superior(self, cubeta):
+        return self.MINIMO * 2 ** (cubeta / self.CUBETAS_POR_OCTAVA)
+
+    def registrar(self, valor):
+        self.cubetas[self._cubeta(valor)] += 1
+        self.cantidad += 1
+        self.suma += valor
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+        if self.maximo is None or valor > self.maximo:
+            self.maximo = valor
+
+    def combinar(self, otro):
+        """
+        Suma las observaciones de otro histograma (por ejemplo, de otro proceso)
+        """
+        for i, cantidad in enumerate(otro.cubetas):
+            self.cubetas[i] += cantidad
+        self.cantidad += otro.cantidad
+        self.suma += otro.suma
+        for valor in (otro.minimo, otro.maximo):
+            if valor is not None:
+                self.minimo = valor if self.minimo is None else min(self.minimo, valor)
+                self.maximo = valor if self.maximo is None else max(self.maximo, valor)
+
+    def percentil(self, p):
+        """
+        Límite superior de la cubeta que contiene el percentil `p` (0-100)
+        """
+        if self.cantidad == 0:
+            return 0.0
+        objetivo = math.ceil(self.cantidad * p / 100)
+        acumulado = 0
+        for i, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= max(1, objetivo):
+                return min(self._limite_superior(i), self.maximo)
+        return self.maximo
+
+    @property
+    def media(self):
+        return self.suma / self.cantidad if self.cantidad else 0.0
+
+    def resumen(self):
+        """
+        Percentiles habituales, en milisegundos
+        """
+        if self.cantidad == 0:
+            return "sin datos"
+        return (f"n={self.cantidad} media={self.media * 1000:.2f}ms "
+                f"p50={self.percentil(50) * 1000:.2f}ms p95={self.percentil(95) * 1000:.2f}ms "
+                f"p99={self.percentil(99) * 1000:.2f}ms máx={self.maximo * 1000:.2f}ms")
+
+    def a_dict(self):
+        """
+        Resumen serializable a JSON, en segundos
+        """
+        return {
+            "cantidad": self.cantidad,
+            "media": self.media,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+            "maximo": self.maximo or 0.0
+        }
+
+class MedicionEtapa:
+    """
+    Latencias y throughput de una etapa: cuántas muestras pasaron por ella
+    y en qué intervalo de tiempo (reloj monótono, común a todos los procesos)
+    """
+
+    def __init__(self):
+        self.latencias = Histograma()
+        self.primera = None
+        self.ultima = None
+
+    @property
+    def cantidad(self):
+        return self.latencias.cantidad
+
+    def registrar(self, latencia, ahora):
+        self.latencias.registrar(latencia)
+        if self.primera is None:
+            self.primera = ahora
+        self.ultima = ahora
+
+    def combinar(self, otra):
+        self.latencias.combinar(otra.latencias)
+        for momento in (otra.primera, otra.ultima):
+            if momento is not None:
+                self.primera = momento if self.primera is None else min(self.primera, momento)
+                self.ultima = momento if self.ultima is None else max(self.ultima, momento)
+
+    @property
+    def throughput(self):
+        """
+        Muestras por segundo entre la primera y la última observación
+        """
+        if self.primera is None or self.ultima <= self.primera:
+            return 0.0
+        return (self.cantidad - 1) / (self.ultima - self.primera)
+
+class Instrumentacion:
+    """
+    Mediciones por etapa del pipeline. Cada proceso lleva la suya y el
+    verificador combina las de los analizadores al recibir su aviso de fin.
+
+    Etapas (latencia medida en cada muestra):
+    - transporte: generación -> recepción en el analizador (Pipe o memoria compartida)
+    - analisis: cálculo de la ventana en el analizador
+    - cola: analizador -> verificador (incluye la espera del lote)
+    - hash: validación y hash del bloque
+    - persistencia: escritura del bloque en el registro y el índice
+    - total: generación -> bloque persistido
+    """
+
+    ETAPAS = ("transporte", "analisis", "cola", "hash", "persistencia", "total")
+
+    def __init__(self, reloj=time.monotonic):
+        self.reloj = reloj
+        self.etapas = {nombre: MedicionEtapa() for nombre in self.ETAPAS}
+
+    def registrar(self, etapa, latencia, ahora=None):
+        self.etapas[etapa].registrar(latencia, self.reloj() if ahora is None else ahora)
+
+    def combinar(self, otra):
+        for nombre, medicion in otra.etapas.items():
+            self.etapas.setdefault(nombre, MedicionEtapa()).combinar(medicion)
+
+    def linea(self):
+        """
+        Resumen compacto para mostrar en vivo
+        """
+        partes = []
+        for nombre, medicion in self.etapas.items():
+            if medicion.cantidad:
+                partes.append(f"{nombre} p50={medicion.latencias.percentil(50) * 1000:.2f}ms "
+                              f"p99={medicion.latencias.percentil(99) * 1000:.2f}ms")
+        return " | ".join(partes) if partes else "sin datos"
+
+    def resumen(self):
+        """
+        Tabla por etapa: throughput y distribución de latencia
+        """
+        lineas = []
+        for nombre, medicion in self.etapas.items():
+            if medicion.cantidad:
+                lineas.append(f"{nombre:<13} {medicion.throughput:>10.1f}/s  {medicion.latencias.resumen()}")
+        return "\n".join(lineas) if lineas else "sin datos"
+
+    def a_dict(self):
+        return {
+            nombre: dict(medicion.latencias.a_dict(), throughput=medicion.throughput)
+            for nombre, medicion in self.etapas.items()
+        }
+
+    def guardar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.a_dict(), f, indent=2, ensure_ascii=False)
+
+class SalidaLimitada:
+    """
+    Limita los mensajes por muestra a uno cada `intervalo` segundos (imprimir
+    en consola también cuesta). Con `detallado` se muestran todos.
+
+        if salida.permite():
+            salida.imprimir(f"...")
+    """
+
+    def __init__(self, intervalo=1.0, detallado=False, reloj=time.monotonic):
+        self.intervalo = intervalo
+        self.detallado = detallado
+        self.reloj = reloj
+        self._proxima = 0.0
+        self._omitidas = 0
+
+    def permite(self):
+        if self.detallado:
+            return True
+        ahora = self.reloj()
+        if ahora >= self._proxima:
+            self._proxima = ahora + self.intervalo
+            return True
+        self._omitidas += 1
+        return False
+
+    def imprimir(self, texto):
+        if self._omitidas:
+            texto += f" (+{self._omitidas} omitidos)"
+            self._omitidas = 0
+        print(texto)
@@ -0,0 +1,313 @@
+"""
+Motor de Reglas de Alerta - Reglas declarativas evaluadas con operaciones vectorizadas
+Se usan al crear cada bloque y para recalificar retroactivamente una cadena archivada
+"""
+import argparse
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+SENALES = ("frecuencia", "presion", "oxigeno")
+CAMPOS = ("media", "desv")
+
+"""
+Campos de los analizadores con estadísticas extendidas (--extendidas),
+más los percentiles configurados ("p90", "p99", ...). Un bloque que no
+tiene el campo de una regla no la dispara
+"""
+CAMPOS_EXTENDIDOS = ("mediana", "min", "max", "ewma")
+PERCENTIL = re.compile(r"p\d+(\.\d+)?")
+
+"""
+Condiciones disponibles en una regla (la regla se cumple si se cumple
+cualquiera de sus condiciones):
+- mayor, mayor_o_igual, menor, menor_o_igual: umbral
+- fuera_de: [mínimo, máximo], se cumple si el valor sale del rango cerrado
+"""
+OPERADORES = {
+    "mayor": lambda valores, umbral: valores > umbral,
+    "mayor_o_igual": lambda valores, umbral: valores >= umbral,
+    "menor": lambda valores, umbral: valores < umbral,
+    "menor_o_igual": lambda valores, umbral: valores <= umbral,
+    "fuera_de": lambda valores, rango: (valores < rango[0]) | (valores > rango[1]),
+}
+
+"""
+Equivalentes a las validaciones de consignas (las de validar_datos)
+"""
+REGLAS_PREDETERMINADAS = [
+    {"nombre": "frecuencia_alta", "descripcion": "Frecuencia muy alta",
+     "senal": "frecuencia", "mayor_o_igual": 200},
+    {"nombre": "oxigeno_fuera_de_rango", "descripcion": "Oxígeno fuera de rango",
+     "senal": "oxigeno", "fuera_de": [90, 100]},
+    {"nombre": "presion_alta", "descripcion": "Presión sistólica muy alta",
+     "senal": "presion", "mayor_o_igual": 200},
+]
+
+class Regla:
+    """
+    Condición sobre una estadística (`campo`) de una señal. Con `sostenida`
+    N > 1 la regla solo dispara cuando la condición se cumple en N bloques
+    consecutivos (el bloque actual y los N-1 anteriores)
+    """
+
+    def __init__(self, nombre, senal, campo="media", sostenida=1, descripcion=None, **condiciones):
+        if senal not in SENALES:
+            raise ValueError(f"Señal desconocida en la regla {nombre}: {senal}")
+        if campo not in CAMPOS + CAMPOS_EXTENDIDOS and not PERCENTIL.fullmatch(campo):
+            raise ValueError(f"Campo desconocido en la regla {nombre}: {campo}")
+        desconocidas = set(condiciones) - set(OPERADORES)
+        if desconocidas:
+            raise ValueError(f"Condiciones desconocidas en la regla {nombre}: {sorted(desconocidas)}")
+        if not condiciones:
+            raise ValueError(f"La regla {nombre} no tiene condiciones")
+        if "fuera_de" in condiciones and len(condiciones["fuera_de"]) != 2:
+            raise ValueError(f"fuera_de de la regla {nombre} debe ser [mínimo, máximo]")
+        if sostenida < 1:
+            raise ValueError(f"sostenida de la regla {nombre} debe ser >= 1")
+
+        self.nombre = nombre
+        self.senal = senal
+        self.campo = campo
+        self.sostenida = int(sostenida)
+        self.descripcion = descripcion or nombre
+        self.condiciones = condiciones
+
+    @classmethod
+    def desde_dict(cls, definicion):
+        return cls(**definicion)
+
+    def a_dict(self):
+        definicion = {"nombre": self.nombre, "descripcion": self.descripcion,
+                      "senal": self.senal, "campo": self.campo, **self.condiciones}
+        if self.sostenida > 1:
+            definicion["sostenida"] = self.sostenida
+        return definicion
+
+    def condicion_texto(self):
+        return ", ".join(f"{operador} {umbral}" for operador, umbral in self.condiciones.items())
+
+    def cumple(self, valores):
+        """
+        Evalúa la condición instantánea (sin `sostenida`) sobre un arreglo
+        """
+        valores = np.asarray(valores, dtype=np.float64)
+        resultado = np.zeros(valores.shape, dtype=bool)
+        for operador, umbral in self.condiciones.items():
+            resultado |= OPERADORES[operador](valores, umbral)
+        return resultado
+
+def _rachas(cumple, racha_previa=0):
+    """
+    Largo de la racha de valores True que termina en cada posición, en forma
+    vectorizada. `racha_previa` es la racha con la que terminó el tramo anterior
+    """
+    indices = np.arange(len(cumple))
+    ultimo_falso = np.maximum.accumulate(np.where(cumple, -1, indices))
+    rachas = indices - ultimo_falso
+    sin_corte = ultimo_falso == -1
+    rachas[sin_corte] += racha_previa
+    return rachas
+
+class MotorReglas:
+    """
+    Conjunto de reglas. Dos formas de evaluarlo:
+    - `evaluar_tick`: un bloque nuevo por flujo (uno o varios pacientes a la
+      vez); mantiene la racha de cada regla para las condiciones sostenidas
+    - `evaluar_cadena`: una cadena completa (o un tramo, continuando las
+      rachas del anterior) con operaciones sobre columnas, sin bucles por bloque
+    """
+
+    def __init__(self, reglas=None):
+        definiciones = REGLAS_PREDETERMINADAS if reglas is None else reglas
+        self.reglas = [r if isinstance(r, Regla) else Regla.desde_dict(r) for r in definiciones]
+        nombres = [regla.nombre for regla in self.reglas]
+        if len(set(nombres)) != len(nombres):
+            raise ValueError(f"Nombres de regla repetidos: {nombres}")
+        self.reiniciar()
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """
+        Carga las reglas de un archivo JSON (lista de definiciones)
+        """
+        with open(ruta, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def reiniciar(self):
+        self._rachas = {regla.nombre: 0 for regla in self.reglas}
+
+    def evaluar_tick(self, columnas):
+        """
+        Evalúa un tick. `columnas[(senal, campo)]` tiene un valor por flujo
+        (escalar para un paciente, arreglo para varios). Devuelve la máscara
+        de alerta y un dict nombre -> máscara de las reglas que dispararon
+        """
+        alerta = None
+        disparadas = {}
+        forma = np.shape(next(iter(columnas.values())))
+        for regla in self.reglas:
+            cumple = regla.cumple(columnas.get((regla.senal, regla.campo), np.full(forma, np.nan)))
+            racha = np.where(cumple, self._rachas[regla.nombre] + 1, 0)
+            self._rachas[regla.nombre] = racha
+            dispara = racha >= regla.sostenida
+            if dispara.any():
+                disparadas[regla.nombre] = dispara
+            alerta = dispara if alerta is None else alerta | dispara
+        if alerta is None:
+            alerta = np.zeros(forma, dtype=bool)
+        return alerta, disparadas
+
+    def evaluar_bloque(self, datos):
+        """
+        Evalúa el bloque siguiente de una única cadena a partir de su `datos`.
+        Devuelve (alerta, lista de (regla, valor) que dispararon)
+        """
+        columnas = {(senal, campo): datos[senal][campo] for senal in SENALES for campo in CAMPOS}
+        for regla in self.reglas:
+            columnas[(regla.senal, regla.campo)] = datos[regla.senal].get(regla.campo, math.nan)
+        alerta, disparadas = self.evaluar_tick(columnas)
+        reglas = [(regla, columnas[(regla.senal, regla.campo)])
+                  for regla in self.reglas if regla.nombre in disparadas]
+        return bool(alerta), reglas
+
+    def evaluar_cadena(self, columnas, continuar=False):
+        """
+        Evalúa todos los bloques de una cadena de una vez. `columnas[(senal,
+        campo)]` es un arreglo con un valor por bloque. Con `continuar` las
+        rachas siguen desde el tramo evaluado anteriormente.
+        Devuelve la máscara de alerta y un dict nombre -> máscara por regla
+        """
+        if not continuar:
+            self.reiniciar()
+
+        cantidad = len(next(iter(columnas.values()))) if columnas else 0
+        alerta = np.zeros(cantidad, dtype=bool)
+        por_regla = {}
+        for regla in self.reglas:
+            cumple = regla.cumple(columnas.get((regla.senal, regla.campo), np.full(cantidad, np.nan)))
+            rachas = _rachas(cumple, int(self._rachas[regla.nombre]))
+            if cantidad:
+                self._rachas[regla.nombre] = int(rachas[-1])
+            por_regla[regla.nombre] = rachas >= regla.sostenida
+            alerta |= por_regla[regla.nombre]
+        return alerta, por_regla
+
+def columnas_de_cadena(ruta):
+    """
+    Columnas (senal, campo) de una cadena archivada, la columna de
+    alertas guardada y la altura de cada fila en la cadena. Acepta el
+    formato binario (se usan las columnas mapeadas en memoria),
+    blockchain.json o un directorio de registro.
+    Incluye las estadísticas extendidas que tengan los bloques (NaN en los
+    que no las tienen) y omite los checkpoints Merkle, que no llevan
+    mediciones (así las reglas sostenidas no se cortan en ellos)
+    """
+    import formato_binario
+    from merkle import es_checkpoint
+
+    if os.path.isfile(ruta) and formato_binario.es_binario(ruta):
+        arreglo = formato_binario.leer_binario(ruta)
+        alturas = np.flatnonzero(arreglo["tipo"] == formato_binario.REGISTRO_MEDICION)
+        if len(alturas) < len(arreglo):
+            arreglo = arreglo[alturas]
+        columnas = {}
+        for k, senal in enumerate(SENALES):
+            columnas[(senal, "media")] = arreglo["media"][:, k]
+            columnas[(senal, "desv")] = arreglo["desv"][:, k]
+        return columnas, arreglo["alerta"].astype(bool), alturas
+
+    registro = None
+    if os.path.isdir(ruta):
+        from almacenamiento import RegistroBloques
+        registro = RegistroBloques(ruta, solo_lectura=True)
+        bloques = registro.iterar_bloques()
+    else:
+        from verificar_cadena import iterar_bloques_json
+        bloques = (bloque for bloque, _, _ in iterar_bloques_json(ruta))
+
+    valores = {(senal, campo): [] for senal in SENALES for campo in CAMPOS}
+    alertas = []
+    alturas = []
+    try:
+        for altura, bloque in enumerate(bloques):
+            if es_checkpoint(bloque):
+                continue
+            fila = len(alturas)
+            datos = bloque["datos"]
+            for senal in SENALES:
+                for campo, valor in datos[senal].items():
+                    lista = valores.get((senal, campo))
+                    if lista is None:
+                        lista = valores[(senal, campo)] = [math.nan] * fila
+                    lista.append(valor)
+            for lista in valores.values():
+                if len(lista) == fila:
+                    lista.append(math.nan)
+            alertas.append(bloque.get("alerta", False))
+            alturas.append(altura)
+    finally:
+        if registro is not None:
+            registro.cerrar()
+
+    columnas = {clave: np.array(lista, dtype=np.float64) for clave, lista in valores.items()}
+    return columnas, np.array(alertas, dtype=bool), np.array(alturas, dtype=np.int64)
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Recalificación retroactiva de alertas de una cadena")
+    parser.add_argument("-a", "--archivo", default="blockchain.json",
+                        help="Cadena: blockchain.json, formato binario o directorio de registro (default: blockchain.json)")
+    parser.add_argument("-r", "--reglas", default=None,
+                        help="Archivo JSON con las reglas (default: las de consignas)")
+    parser.add_argument("--mostrar-reglas", action="store_true",
+                        help="Mostrar las reglas cargadas en JSON y salir")
+    parser.add_argument("--json", action="store_true",
+                        help="Listar en JSON las alturas con alerta de cada regla")
+    return parser.parse_args()
+
+def main():
+    args = parsear_argumentos()
+
+    try:
+        motor = MotorReglas.desde_archivo(args.reglas) if args.reglas else MotorReglas()
+    except (OSError, ValueError, TypeError) as e:
+        print(f"❌ Error en las reglas: {e}")
+        return
+
+    if args.mostrar_reglas:
+        print(json.dumps([regla.a_dict() for regla in motor.reglas], indent=2, ensure_ascii=False))
+        return
+
+    if not os.path.exists(args.archivo):
+        print(f"❌ Error: No se encontró la cadena {args.archivo}")
+        return
+
+    columnas, alertas_guardadas, alturas = columnas_de_cadena(args.archivo)
+    alertas, por_regla = motor.evaluar_cadena(columnas)
+
+    if args.json:
+        print(json.dumps({nombre: alturas[mascara].tolist() for nombre, mascara in por_regla.items()},
+                         indent=2, ensure_ascii=False))
+        return
+
+    total = len(alertas)
+    print(f"📋 {total} bloques recalificados con {len(motor.reglas)} reglas")
+    for regla in motor.reglas:
+        sostenida = f", sostenida {regla.sostenida}" if regla.sostenida > 1 else ""
+        print(f"   - {regla.nombre} ({regla.senal}.{regla.campo}: {regla.condicion_texto()}{sostenida}): "
+              f"{int(np.count_nonzero(por_regla[regla.nombre]))} bloques")
+    print(f"🚨 Bloques con alerta: {int(np.count_nonzero(alertas))} "
+          f"(guardadas en la cadena: {int(np.count_nonzero(alertas_guardadas))})")
+
+    nuevas = alturas[alertas & ~alertas_guardadas]
+    retiradas = alturas[~alertas & alertas_guardadas]
+    print(f"   Nuevas alertas: {len(nuevas)}"
+          + (f" (primeros bloques: {(nuevas[:10] + 1).tolist()})" if len(nuevas) else ""))
+    print(f"   Alertas que dejan de serlo: {len(retiradas)}"
+          + (f" (primeros bloques: {(retiradas[:10] + 1).tolist()})" if len(retiradas) else ""))
+
+if __name__ == "__main__":
+    main()
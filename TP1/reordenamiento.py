@@ -0,0 +1,156 @@
+"""
+Etapa de Reordenamiento - Agrupa los resultados de los analizadores por secuencia
+Emite las muestras estrictamente en orden, con memoria acotada y un límite de demora
+"""
+import time
+
+from metricas import Histograma
+
+class BufferReordenamiento:
+    """
+    Buffer de reordenamiento acotado con marca de agua de demora.
+
+    Las muestras se emiten en orden estricto de `seq` a medida que se
+    completan (un resultado por cada tipo de señal). Si la siguiente muestra
+    en orden sigue incompleta cuando:
+    - pasaron más de `retraso_max` segundos desde que llegó su primer
+      resultado (o desde que llegó una muestra posterior, si de ella no llegó
+      nada), o
+    - hay más de `max_entradas` muestras pendientes,
+    se descarta marcándola como incompleta y el orden continúa con la
+    siguiente. Así la memoria queda acotada aunque un analizador muera.
+    """
+
+    def __init__(self, tipos, retraso_max=2.0, max_entradas=10000, reloj=time.monotonic):
+        self.tipos = frozenset(tipos)
+        self.retraso_max = retraso_max
+        self.max_entradas = max_entradas
+        self.reloj = reloj
+
+        self._pendientes = {}
+        self._siguiente = None
+        self._espera_hueco = None
+
+        self.latencias = Histograma()
+        self.completas = 0
+        self.incompletas = 0
+        self.tardias = 0
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def agregar(self, seq, tipo, timestamp, valores, marca=None):
+        """
+        Registra un resultado y devuelve la lista de muestras que quedan listas
+        para emitir, como tuplas (seq, timestamp, datos, completa, marca).
+        `marca` es un dato opaco de la muestra (por ejemplo, su instante de
+        generación) que se devuelve tal cual al emitirla
+        """
+        ahora = self.reloj()
+
+        if self._siguiente is None:
+            self._siguiente = seq
+        if seq < self._siguiente:
+            """
+            Llegó después de que la muestra se descartara: ya no se puede usar
+            """
+            self.tardias += 1
+            return self.vencer(ahora)
+
+        entrada = self._pendientes.get(seq)
+        if entrada is None:
+            entrada = {"timestamp": timestamp, "datos": {}, "llegada": ahora, "marca": marca}
+            self._pendientes[seq] = entrada
+        entrada["datos"][tipo] = valores
+
+        return self.vencer(ahora)
+
+    def vencer(self, ahora=None):
+        """
+        Emite todo lo que esté listo en orden y descarta la cabeza si venció
+        su marca de agua. Conviene llamarlo periódicamente aunque no lleguen
+        resultados, para que una muestra trabada no detenga la cadena
+        """
+        ahora = self.reloj() if ahora is None else ahora
+        emitidas = []
+
+        while self._pendientes:
+            entrada = self._pendientes.get(self._siguiente)
+
+            if entrada is not None and self.tipos.issubset(entrada["datos"].keys()):
+                emitidas.append(self._emitir(entrada, True, ahora))
+                continue
+
+            if entrada is not None:
+                desde = entrada["llegada"]
+            else:
+                """
+                De la siguiente muestra no llegó nada: la demora se mide desde
+                que se detectó el hueco
+                """
+                if self._espera_hueco is None:
+                    self._espera_hueco = ahora
+                desde = self._espera_hueco
+
+            if ahora - desde > self.retraso_max or len(self._pendientes) > self.max_entradas:
+                if entrada is not None:
+                    emitidas.append(self._emitir(entrada, False, ahora))
+                else:
+                    """
+                    El hueco ya venció: saltarlo entero hasta la primera
+                    muestra pendiente, no de a una muestra por `retraso_max`
+                    """
+                    emitidas.extend(self._saltar_hasta(min(self._pendientes)))
+                continue
+
+            break
+
+        return emitidas
+
+    def _saltar(self):
+        """
+        Descarta una muestra de la que no llegó ningún resultado
+        """
+        seq = self._siguiente
+        self._avanzar()
+        self.incompletas += 1
+        return seq, None, {}, False, None
+
+    def _saltar_hasta(self, seq):
+        """
+        Descarta todas las muestras anteriores a `seq` (de ninguna llegó nada)
+        """
+        saltadas = []
+        while self._siguiente < seq:
+            saltadas.append(self._saltar())
+        return saltadas
+
+    def _avanzar(self):
+        self._siguiente += 1
+        self._espera_hueco = None
+
+    def _emitir(self, entrada, completa, ahora):
+        seq = self._siguiente
+        del self._pendientes[seq]
+        self._avanzar()
+
+        self.latencias.registrar(ahora - entrada["llegada"])
+        if completa:
+            self.completas += 1
+        else:
+            self.incompletas += 1
+        return seq, entrada["timestamp"], entrada["datos"], completa, entrada["marca"]
+
+    def vaciar(self):
+        """
+        Fin del flujo: emite en orden todo lo pendiente (lo incompleto, marcado)
+        """
+        emitidas = []
+        ahora = self.reloj()
+        while self._pendientes:
+            entrada = self._pendientes.get(self._siguiente)
+            if entrada is None:
+                emitidas.append(self._saltar())
+                continue
+            emitidas.append(self._emitir(entrada, self.tipos.issubset(entrada["datos"].keys()), ahora))
+        return emitidas
@@ -0,0 +1,378 @@
+"""
+Reproductor de Grabaciones - Alimenta el sistema con sesiones biométricas grabadas
+Lee CSV, JSON Lines o NumPy .npy (mapeado en memoria) por tramos y los reproduce a
+velocidad original, acelerada o sin límite, con los mismos bloques en cada reproducción
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from generador import EtapaGenerador
+from metricas import SalidaLimitada
+
+"""
+Muestra grabada: timestamp en microsegundos desde epoch y los valores de
+las señales (float64, para admitir sensores con decimales)
+"""
+TIPO_MUESTRA = np.dtype([
+    ("timestamp_us", "<i8"),
+    ("frecuencia", "<f8"),
+    ("sistolica", "<f8"),
+    ("diastolica", "<f8"),
+    ("oxigeno", "<f8")
+])
+COLUMNAS = ("frecuencia", "sistolica", "diastolica", "oxigeno")
+
+FORMATOS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".npy": "npy"}
+
+EPOCH = datetime(1970, 1, 1)
+MICROSEGUNDO = timedelta(microseconds=1)
+
+"""
+Inicio del reloj de las grabaciones sin timestamps: fijo, para que dos
+reproducciones den los mismos bloques y hashes (la muestra i está en
+INICIO_SIN_TIMESTAMP + i / tasa)
+"""
+INICIO_SIN_TIMESTAMP = datetime(2000, 1, 1)
+
+"""
+Muestras por tramo al leer y convertir
+"""
+TRAMO = 65536
+
+def formato_grabacion(ruta):
+    """
+    Formato de la grabación según la extensión (ValueError si no se reconoce)
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato de grabación no soportado: {ruta} (se esperaba .csv, .jsonl o .npy)")
+    return FORMATOS[extension]
+
+def _microsegundos(valor):
+    """
+    Timestamp de una grabación (ISO 8601 o segundos desde epoch) a
+    microsegundos desde epoch; los que tienen zona horaria se pasan a UTC
+    """
+    if isinstance(valor, (int, float)):
+        return round(valor * 1_000_000)
+    try:
+        return round(float(valor) * 1_000_000)
+    except ValueError:
+        pass
+    momento = datetime.fromisoformat(valor)
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return (momento - EPOCH) // MICROSEGUNDO
+
+def _timestamp_implicito(i, tasa):
+    return (INICIO_SIN_TIMESTAMP - EPOCH) // MICROSEGUNDO + round(i * 1_000_000 / tasa)
+
+def _registros_csv(ruta, tasa):
+    with open(ruta, "r", encoding="utf-8", newline="") as f:
+        lector = csv.DictReader(f)
+        faltantes = [columna for columna in COLUMNAS if columna not in (lector.fieldnames or ())]
+        if faltantes:
+            raise ValueError(f"{ruta}: faltan las columnas {faltantes}")
+        con_timestamp = "timestamp" in lector.fieldnames
+        for i, fila in enumerate(lector):
+            try:
+                timestamp = _microsegundos(fila["timestamp"]) if con_timestamp else _timestamp_implicito(i, tasa)
+                yield (timestamp, *(float(fila[columna]) for columna in COLUMNAS))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{ruta}, fila {i + 2}: {e}")
+
+def _registros_jsonl(ruta, tasa):
+    """
+    Una muestra por línea, con el formato del generador
+    ({"timestamp", "frecuencia", "presion": [sistólica, diastólica], "oxigeno"})
+    o con `sistolica` y `diastolica` por separado; el timestamp es opcional
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        i = 0
+        for numero, linea in enumerate(f, 1):
+            if not linea.strip():
+                continue
+            try:
+                muestra = json.loads(linea)
+                if "presion" in muestra:
+                    sistolica, diastolica = muestra["presion"]
+                else:
+                    sistolica, diastolica = muestra["sistolica"], muestra["diastolica"]
+                timestamp = (_microsegundos(muestra["timestamp"]) if "timestamp" in muestra
+                             else _timestamp_implicito(i, tasa))
+                yield (timestamp, float(muestra["frecuencia"]), float(sistolica),
+                       float(diastolica), float(muestra["oxigeno"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{ruta}, línea {numero}: {e!r}")
+            i += 1
+
+def abrir_npy(ruta):
+    """
+    Mapea una grabación .npy en memoria (arreglo estructurado TIPO_MUESTRA)
+    """
+    arreglo = np.load(ruta, mmap_mode="r")
+    if arreglo.dtype != TIPO_MUESTRA or arreglo.ndim != 1:
+        raise ValueError(f"{ruta}: se esperaba un arreglo 1-D con dtype {TIPO_MUESTRA.descr}")
+    return arreglo
+
+def iterar_tramos(ruta, tasa=1.0, tamano=TRAMO):
+    """
+    Recorre la grabación en tramos de hasta `tamano` muestras (arreglos
+    TIPO_MUESTRA). Los .npy se mapean en memoria y cada tramo es una vista;
+    CSV y JSON Lines se leen línea por línea, sin cargar el archivo entero.
+    `tasa` asigna los timestamps de las grabaciones que no los tienen
+    """
+    formato = formato_grabacion(ruta)
+    if formato == "npy":
+        arreglo = abrir_npy(ruta)
+        for inicio in range(0, len(arreglo), tamano):
+            yield arreglo[inicio:inicio + tamano]
+        return
+
+    registros = _registros_csv(ruta, tasa) if formato == "csv" else _registros_jsonl(ruta, tasa)
+    tramo = []
+    for registro in registros:
+        tramo.append(registro)
+        if len(tramo) >= tamano:
+            yield np.array(tramo, dtype=TIPO_MUESTRA)
+            tramo = []
+    if tramo:
+        yield np.array(tramo, dtype=TIPO_MUESTRA)
+
+def resumen_grabacion(ruta, tasa=1.0):
+    """
+    Cantidad de muestras, primer y último timestamp (µs) y la mayor brecha
+    entre muestras consecutivas (s), calculados tramo a tramo
+    """
+    cantidad = 0
+    primero = ultimo = None
+    brecha = 0.0
+    for tramo in iterar_tramos(ruta, tasa):
+        if not len(tramo):
+            continue
+        marcas = tramo["timestamp_us"]
+        if ultimo is not None:
+            brecha = max(brecha, (int(marcas[0]) - ultimo) / 1e6)
+        if len(marcas) > 1:
+            brecha = max(brecha, float(np.max(np.diff(marcas))) / 1e6)
+        if primero is None:
+            primero = int(marcas[0])
+        ultimo = int(marcas[-1])
+        cantidad += len(tramo)
+    return {"cantidad": cantidad, "primero_us": primero, "ultimo_us": ultimo, "brecha_max": brecha}
+
+class EtapaReproductor(EtapaGenerador):
+    """
+    Fuente que reemplaza al generador aleatorio: reproduce una grabación
+    con la misma interfaz que EtapaGenerador, así la usan igual los tres
+    modos de ejecución.
+
+    - `velocidad`: 1 respeta los intervalos grabados, N los acelera N veces
+      y 0 reproduce tan rápido como lo permitan los analizadores
+    - `muestras` / `duracion`: reproducir solo las primeras muestras o los
+      primeros segundos grabados (None: toda la grabación)
+    - `progreso` / `reinicio`: como en EtapaGenerador, para retomar la
+      reproducción tras una caída del proceso
+
+    Los timestamps de los bloques son los grabados, así que reproducir dos
+    veces la misma grabación produce la misma cadena
+    """
+
+    def __init__(self, grabacion, muestras=None, duracion=None, tasa=1.0, velocidad=0.0,
+                 detallado=False, intervalo_log=1.0, progreso=None, reinicio=None):
+        self.grabacion = grabacion
+        self.formato = formato_grabacion(grabacion)
+        self.muestras = muestras
+        self.duracion = duracion
+        self.tasa = tasa
+        self.velocidad = velocidad
+        self.progreso = progreso
+        self.desde = 0
+        if progreso is not None:
+            if progreso[1]:
+                self.desde = int(progreso[0])
+            else:
+                progreso[1] = time.time()
+        if reinicio is not None:
+            print(f"♻️  Reproductor reanudado en la muestra {self.desde + 1} "
+                  f"(recuperación: {(time.monotonic() - reinicio) * 1000:.1f} ms)")
+
+        limite = "completa" if muestras is None else f"primeras {muestras} muestras"
+        if duracion is not None:
+            limite += f", primeros {duracion:g}s"
+        print(f"Reproduciendo {grabacion} ({self.formato}, {limite}, "
+              f"velocidad {'sin límite' if velocidad <= 0 else f'x{velocidad:g}'}, pid={os.getpid()})")
+
+        self.salida = SalidaLimitada(intervalo_log, detallado)
+        self.enviadas = 0
+        self.inicio_real = time.monotonic()
+
+    def programa(self):
+        """
+        (i, muestra grabada, instante real programado): el instante sale de
+        la diferencia entre timestamps grabados, dividida por la velocidad.
+
+        `duracion` se mide desde la primera muestra de la grabación (aunque
+        se retome en `desde`, así cada reproducción da los mismos bloques) y
+        el ritmo, desde la primera muestra reproducida en esta ejecución
+        """
+        inicio_real = time.monotonic()
+        base = None
+        base_ritmo = None
+        i = 0
+        for tramo in iterar_tramos(self.grabacion, self.tasa):
+            if base is None and len(tramo):
+                base = int(tramo["timestamp_us"][0])
+            if i + len(tramo) <= self.desde:
+                i += len(tramo)
+                continue
+            if i < self.desde:
+                tramo = tramo[self.desde - i:]
+                i = self.desde
+
+            """
+            Pasar el tramo a listas de Python de una vez (no por elemento)
+            """
+            columnas = [tramo[nombre].tolist() for nombre in TIPO_MUESTRA.names]
+            for registro in zip(*columnas):
+                if self.muestras is not None and i >= self.muestras:
+                    return
+                if self.duracion is not None and (registro[0] - base) / 1e6 >= self.duracion:
+                    return
+                if base_ritmo is None:
+                    base_ritmo = registro[0]
+                transcurrido = (registro[0] - base_ritmo) / 1e6
+                instante = inicio_real + transcurrido / self.velocidad if self.velocidad > 0 else None
+                yield i, registro, instante
+                i += 1
+
+    def muestra(self, i, registro):
+        timestamp, frecuencia, sistolica, diastolica, oxigeno = registro
+        datos = {
+            "seq": i,
+            "timestamp": (EPOCH + timestamp * MICROSEGUNDO).isoformat(timespec="microseconds"),
+            "frecuencia": frecuencia,
+            "presion": [sistolica, diastolica],
+            "oxigeno": oxigeno
+        }
+
+        if self.salida.permite():
+            self.salida.imprimir(f"Muestra {i+1} - {datos['timestamp']}: FC={frecuencia:g}, "
+                                 f"PA={sistolica:g}/{diastolica:g}, O2={oxigeno:g}% (grabada)")
+
+        datos["t_gen"] = time.monotonic()
+        return datos
+
+def escribir_grabacion(tramos, ruta, cantidad=None):
+    """
+    Escribe tramos TIPO_MUESTRA en CSV, JSON Lines o .npy (según la
+    extensión). Para .npy hace falta la `cantidad` total, porque el archivo
+    se crea mapeado en memoria con su tamaño final. Devuelve las muestras escritas
+    """
+    formato = formato_grabacion(ruta)
+    escritas = 0
+
+    if formato == "npy":
+        destino = np.lib.format.open_memmap(ruta, mode="w+", dtype=TIPO_MUESTRA, shape=(cantidad,))
+        for tramo in tramos:
+            destino[escritas:escritas + len(tramo)] = tramo
+            escritas += len(tramo)
+        destino.flush()
+        del destino
+        return escritas
+
+    with open(ruta, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f) if formato == "csv" else None
+        if escritor:
+            escritor.writerow(("timestamp",) + COLUMNAS)
+        for tramo in tramos:
+            columnas = [tramo[nombre].tolist() for nombre in TIPO_MUESTRA.names]
+            for timestamp, frecuencia, sistolica, diastolica, oxigeno in zip(*columnas):
+                momento = (EPOCH + timestamp * MICROSEGUNDO).isoformat(timespec="microseconds")
+                if escritor:
+                    escritor.writerow((momento, repr(frecuencia), repr(sistolica), repr(diastolica), repr(oxigeno)))
+                else:
+                    f.write(json.dumps({"timestamp": momento, "frecuencia": frecuencia,
+                                        "presion": [sistolica, diastolica], "oxigeno": oxigeno}) + "\n")
+            escritas += len(tramo)
+    return escritas
+
+def tramos_sinteticos(cantidad, tasa=1.0, semilla=None):
+    """
+    Grabación sintética con los rangos de generar_datos_biometricos,
+    reproducible con `semilla`
+    """
+    rng = np.random.default_rng(semilla)
+    for inicio in range(0, cantidad, TRAMO):
+        n = min(TRAMO, cantidad - inicio)
+        tramo = np.empty(n, dtype=TIPO_MUESTRA)
+        tramo["timestamp_us"] = (_timestamp_implicito(0, tasa)
+                                 + np.round(np.arange(inicio, inicio + n) * 1_000_000 / tasa).astype(np.int64))
+        tramo["frecuencia"] = rng.integers(60, 181, n)
+        tramo["sistolica"] = rng.integers(110, 181, n)
+        tramo["diastolica"] = rng.integers(70, 111, n)
+        tramo["oxigeno"] = rng.integers(90, 101, n)
+        yield tramo
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Grabaciones para reproducir con main.py --reproducir")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    info = comandos.add_parser("info", help="Resumen de una grabación")
+    info.add_argument("archivo")
+    info.add_argument("-r", "--tasa", type=float, default=1.0,
+                      help="Muestras por segundo, si la grabación no tiene timestamps (default: 1)")
+
+    convertir = comandos.add_parser("convertir", help="Convertir entre CSV, JSON Lines y .npy")
+    convertir.add_argument("entrada")
+    convertir.add_argument("salida")
+    convertir.add_argument("-r", "--tasa", type=float, default=1.0,
+                           help="Muestras por segundo, si la entrada no tiene timestamps (default: 1)")
+
+    sintetica = comandos.add_parser("sintetica", help="Crear una grabación sintética")
+    sintetica.add_argument("salida")
+    sintetica.add_argument("-n", "--muestras", type=int, default=3600,
+                           help="Cantidad de muestras (default: 3600)")
+    sintetica.add_argument("-r", "--tasa", type=float, default=1.0,
+                           help="Muestras por segundo grabadas (default: 1)")
+    sintetica.add_argument("--semilla", type=int, default=None,
+                           help="Semilla para obtener siempre la misma grabación")
+    return parser.parse_args()
+
+def main():
+    args = parsear_argumentos()
+
+    try:
+        if args.comando == "info":
+            resumen = resumen_grabacion(args.archivo, args.tasa)
+            print(f"📼 {args.archivo} ({formato_grabacion(args.archivo)}): {resumen['cantidad']} muestras")
+            if resumen["cantidad"]:
+                primero = EPOCH + resumen["primero_us"] * MICROSEGUNDO
+                ultimo = EPOCH + resumen["ultimo_us"] * MICROSEGUNDO
+                print(f"   Desde {primero.isoformat()} hasta {ultimo.isoformat()} "
+                      f"({(ultimo - primero).total_seconds():g}s grabados, "
+                      f"mayor brecha {resumen['brecha_max']:g}s)")
+
+        elif args.comando == "convertir":
+            cantidad = None
+            if formato_grabacion(args.salida) == "npy":
+                cantidad = resumen_grabacion(args.entrada, args.tasa)["cantidad"]
+            escritas = escribir_grabacion(iterar_tramos(args.entrada, args.tasa), args.salida, cantidad)
+            print(f"✅ {escritas} muestras convertidas: {args.entrada} -> {args.salida}")
+
+        elif args.comando == "sintetica":
+            escritas = escribir_grabacion(tramos_sinteticos(args.muestras, args.tasa, args.semilla),
+                                          args.salida, args.muestras)
+            print(f"✅ Grabación sintética de {escritas} muestras en {args.salida}")
+
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Supervisión de Procesos - Reinicio de etapas caídas
+Los analizadores guardan el estado de su ventana en memoria compartida para reanudar en caliente
+"""
+import math
+import struct
+import time
+from multiprocessing import Queue, RawValue, shared_memory
+
+import numpy as np
+
+"""
+Marca de generación al inicio y al final de cada ranura: si coinciden, la
+ranura se escribió completa (un proceso que muere a mitad de escritura
+deja marcas distintas y se usa la otra ranura)
+"""
+FORMATO_MARCA = struct.Struct("<Q")
+
+"""
+Estado del analizador: muestras procesadas y las variables de la ventana
+(inicio, cantidad, actualizaciones desde la resincronización, media, M2 y
+la EWMA de las estadísticas extendidas, NaN si no se usan)
+"""
+FORMATO_ESTADO = struct.Struct("<qqqqddd")
+
+class CheckpointVentana:
+    """
+    Checkpoint del estado de un analizador en multiprocessing.shared_memory,
+    con doble ranura: cada guardado escribe la ranura que no tiene el
+    último estado completo, así siempre queda uno consistente.
+
+    Lo crea el proceso principal (que sobrevive a la caída del analizador)
+    y el analizador reiniciado lo lee para retomar con la ventana llena.
+    """
+
+    def __init__(self, tamano_ventana, nombre=None):
+        self.tamano_ventana = tamano_ventana
+        self.tamano_ranura = 2 * FORMATO_MARCA.size + FORMATO_ESTADO.size + 8 * tamano_ventana
+        self.shm = shared_memory.SharedMemory(name=nombre, create=True, size=2 * self.tamano_ranura)
+        self.shm.buf[:] = bytes(2 * self.tamano_ranura)
+        self._generacion = None
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado["_generacion"] = None
+        return estado
+
+    def _leer_ranura(self, ranura):
+        base = ranura * self.tamano_ranura
+        fin = base + self.tamano_ranura - FORMATO_MARCA.size
+        inicio, = FORMATO_MARCA.unpack_from(self.shm.buf, base)
+        final, = FORMATO_MARCA.unpack_from(self.shm.buf, fin)
+        return inicio if inicio == final else 0
+
+    def _ultima(self):
+        """
+        (generación, ranura) del último estado completo; generación 0 = ninguno
+        """
+        return max((self._leer_ranura(ranura), ranura) for ranura in (0, 1))
+
+    def guardar(self, ventana, procesadas):
+        """
+        Guarda el estado de la ventana y la cantidad de muestras procesadas
+        """
+        if self._generacion is None:
+            self._generacion = self._ultima()[0]
+        self._generacion += 1
+        ranura = self._generacion % 2
+
+        buffer, inicio, cantidad, media, m2, desde_resync, *extra = ventana.estado()
+        ewma = extra[0] if extra else math.nan
+        base = ranura * self.tamano_ranura
+        posicion = base + FORMATO_MARCA.size
+
+        FORMATO_MARCA.pack_into(self.shm.buf, base, self._generacion)
+        FORMATO_ESTADO.pack_into(self.shm.buf, posicion, procesadas, inicio, cantidad, desde_resync, media, m2, ewma)
+        posicion += FORMATO_ESTADO.size
+        self.shm.buf[posicion:posicion + buffer.nbytes] = buffer.tobytes()
+        FORMATO_MARCA.pack_into(self.shm.buf, posicion + buffer.nbytes, self._generacion)
+
+    def restaurar(self, ventana):
+        """
+        Carga en la ventana el último estado completo. Devuelve la cantidad
+        de muestras procesadas guardada, o None si no hay checkpoint
+        """
+        generacion, ranura = self._ultima()
+        if generacion == 0:
+            return None
+        self._generacion = generacion
+
+        posicion = ranura * self.tamano_ranura + FORMATO_MARCA.size
+        procesadas, inicio, cantidad, desde_resync, media, m2, ewma = FORMATO_ESTADO.unpack_from(self.shm.buf, posicion)
+        posicion += FORMATO_ESTADO.size
+        buffer = np.frombuffer(self.shm.buf[posicion:posicion + 8 * self.tamano_ventana], dtype=np.float64).copy()
+
+        extra = () if math.isnan(ewma) else (ewma,)
+        ventana.restaurar(buffer, inicio, cantidad, media, m2, desde_resync, *extra)
+        return procesadas
+
+    def close(self):
+        self.shm.close()
+
+    def liberar(self):
+        """
+        Cierra y elimina el segmento (solo lo llama el proceso que lo creó)
+        """
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class CanalesResultados:
+    """
+    Canal Analizadores -> Verificador que sobrevive a la caída del
+    verificador: una Queue por cada vez que puede arrancar (el inicial más
+    `reinicios` reinicios), todas creadas por el proceso principal antes de
+    iniciar las etapas.
+
+    Un verificador que muere dentro de get() puede dejar tomado el lock de
+    lectura de su Queue o un mensaje leído a medias en el pipe, así que el
+    reiniciado no la reutiliza: `nueva()` pasa a la siguiente y los
+    analizadores, que envían con `put()`, la usan desde su próximo mensaje.
+    Lo que quedó en la Queue anterior se pierde, igual que el buffer de
+    reordenamiento del verificador caído.
+    """
+
+    def __init__(self, reinicios=3):
+        self.colas = [Queue() for _ in range(reinicios + 1)]
+        self.generacion = RawValue("i", 0)
+        self._usada = None
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado["_usada"] = None
+        return estado
+
+    def actual(self):
+        """
+        Queue de la que lee el verificador actual
+        """
+        return self.colas[self.generacion.value]
+
+    def nueva(self):
+        """
+        Pasa a la Queue siguiente (la del verificador reiniciado)
+        """
+        if self.generacion.value + 1 >= len(self.colas):
+            raise ValueError(f"No quedan canales de resultados ({len(self.colas)} en total)")
+        self.generacion.value += 1
+        return self.actual()
+
+    def put(self, mensaje):
+        generacion = self.generacion.value
+        if generacion != self._usada:
+            """
+            Nadie más lee la Queue anterior: al terminar, el proceso no
+            espera a que se vacíe lo que quedó en su buffer
+            """
+            if self._usada is not None:
+                self.colas[self._usada].cancel_join_thread()
+            self._usada = generacion
+        self.colas[generacion].put(mensaje)
+
+    def close(self):
+        for cola in self.colas:
+            cola.close()
+
+class Supervisor:
+    """
+    Vigila los procesos de las etapas y reinicia los que terminan con error.
+
+    Cada etapa se registra con una fábrica `crear(reinicio)` que devuelve un
+    Process nuevo; `reinicio` es None en el arranque o, en un reinicio, el
+    instante (reloj monótono) en que se detectó la caída, para que la etapa
+    informe el tiempo de recuperación. Un proceso que termina con código 0
+    terminó normalmente y no se reinicia.
+    """
+
+    def __init__(self, reinicios_max=3, intervalo=0.1):
+        self.reinicios_max = reinicios_max
+        self.intervalo = intervalo
+        self.etapas = {}
+        self.reinicios = {}
+
+    def agregar(self, nombre, crear):
+        self.etapas[nombre] = {"crear": crear, "proceso": None}
+        self.reinicios[nombre] = 0
+
+    def proceso(self, nombre):
+        return self.etapas[nombre]["proceso"]
+
+    def iniciar(self):
+        for etapa in self.etapas.values():
+            etapa["proceso"] = etapa["crear"](None)
+            etapa["proceso"].start()
+
+    def terminadas(self):
+        """
+        Etapas que ya terminaron normalmente (código de salida 0)
+        """
+        return {nombre for nombre, etapa in self.etapas.items()
+                if etapa["proceso"] is not None and etapa["proceso"].exitcode == 0}
+
+    def revisar(self):
+        """
+        Reinicia las etapas caídas. Devuelve True mientras quede alguna viva
+        """
+        vivas = False
+        for nombre, etapa in self.etapas.items():
+            proceso = etapa["proceso"]
+            if proceso.is_alive():
+                vivas = True
+                continue
+            if proceso.exitcode in (0, None):
+                continue
+
+            if self.reinicios[nombre] >= self.reinicios_max:
+                if self.reinicios[nombre] == self.reinicios_max:
+                    print(f"🛑 Supervisor: {nombre} cayó (código {proceso.exitcode}) y superó "
+                          f"los {self.reinicios_max} reinicios; no se reinicia")
+                    self.reinicios[nombre] += 1
+                continue
+
+            detectada = time.monotonic()
+            self.reinicios[nombre] += 1
+            print(f"🔁 Supervisor: {nombre} cayó (código {proceso.exitcode}), "
+                  f"reinicio {self.reinicios[nombre]}/{self.reinicios_max}")
+            etapa["proceso"] = etapa["crear"](detectada)
+            etapa["proceso"].start()
+            vivas = True
+        return vivas
+
+    def esperar(self):
+        """
+        Supervisa hasta que todas las etapas terminen (normalmente o sin
+        más reinicios disponibles)
+        """
+        while self.revisar():
+            time.sleep(self.intervalo)
+
+    def terminar(self):
+        for etapa in self.etapas.values():
+            proceso = etapa["proceso"]
+            if proceso is not None and proceso.is_alive():
+                proceso.terminate()
+                proceso.join(timeout=2)
+                if proceso.is_alive():
+                    proceso.kill()
+
+    def resumen(self):
+        total = sum(min(n, self.reinicios_max) for n in self.reinicios.values())
+        if total == 0:
+            return "sin caídas"
+        return ", ".join(f"{nombre}: {min(n, self.reinicios_max)}"
+                         for nombre, n in self.reinicios.items() if n)
@@ -0,0 +1,199 @@
+"""
+Transporte por Memoria Compartida - Buffer circular un productor / varios consumidores
+El generador escribe cada muestra una sola vez y cada analizador la lee con su propio cursor
+"""
+import struct
+import time
+from multiprocessing import shared_memory
+
+"""
+Registro de ancho fijo de una muestra: número de secuencia (int64),
+timestamp (32 bytes ASCII), frecuencia, sistólica, diastólica, oxígeno (int32)
+y el instante de generación en el reloj monótono (float64, para métricas)
+"""
+FORMATO_REGISTRO = struct.Struct("<q32siiiid")
+
+"""
+Cabecera: cursor de escritura, bandera de cierre y un cursor por lector (uint64)
+"""
+TAMANO_CONTADOR = 8
+
+def _esperar(intentos):
+    """
+    Espera activa con retroceso: primero cede la CPU y luego duerme hasta 1 ms
+    """
+    if intentos < 100:
+        time.sleep(0)
+    else:
+        time.sleep(min(0.001, 0.00001 * (intentos - 99)))
+
+def empaquetar_muestra(datos):
+    """
+    Convierte el diccionario del generador a un registro binario de ancho fijo
+    """
+    return FORMATO_REGISTRO.pack(
+        datos["seq"],
+        datos["timestamp"].encode("ascii"),
+        datos["frecuencia"],
+        datos["presion"][0],
+        datos["presion"][1],
+        datos["oxigeno"],
+        datos.get("t_gen", 0.0)
+    )
+
+def desempaquetar_muestra(registro):
+    """
+    Reconstruye el diccionario del generador a partir del registro binario
+    """
+    seq, timestamp, frecuencia, sistolica, diastolica, oxigeno, t_gen = FORMATO_REGISTRO.unpack(registro)
+    return {
+        "seq": seq,
+        "timestamp": timestamp.rstrip(b"\0").decode("ascii"),
+        "frecuencia": frecuencia,
+        "presion": [sistolica, diastolica],
+        "oxigeno": oxigeno,
+        "t_gen": t_gen
+    }
+
+class AnilloCompartido:
+    """
+    Buffer circular en multiprocessing.shared_memory con registros de ancho fijo.
+
+    El escritor publica un registro y recién después avanza su cursor, por lo
+    que los lectores nunca ven un registro a medio escribir. Si el lector más
+    lento está `capacidad` registros atrás, el escritor espera (contrapresión).
+    """
+
+    def __init__(self, capacidad=1024, lectores=3, nombre=None):
+        self.capacidad = capacidad
+        self.lectores = lectores
+        self.tamano_cabecera = TAMANO_CONTADOR * (2 + lectores)
+
+        tamano = self.tamano_cabecera + capacidad * FORMATO_REGISTRO.size
+        self.shm = shared_memory.SharedMemory(name=nombre, create=True, size=tamano)
+        self.shm.buf[:self.tamano_cabecera] = bytes(self.tamano_cabecera)
+
+    def escritor(self):
+        return EscritorAnillo(self)
+
+    def lector(self, indice):
+        if not 0 <= indice < self.lectores:
+            raise ValueError(f"Lector inválido: {indice} (hay {self.lectores})")
+        return LectorAnillo(self, indice)
+
+    def liberar(self):
+        """
+        Cierra y elimina el segmento (solo lo llama el proceso que lo creó)
+        """
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class _ExtremoAnillo:
+    """
+    Acceso común a la cabecera y los registros del anillo
+    """
+
+    def __init__(self, anillo):
+        self.shm = anillo.shm
+        self.capacidad = anillo.capacidad
+        self.lectores = anillo.lectores
+        self.tamano_cabecera = anillo.tamano_cabecera
+        self._contadores = None
+
+    def __getstate__(self):
+        """
+        Las vistas de memoria no se pueden serializar; se recrean al usarlas
+        """
+        estado = self.__dict__.copy()
+        estado["_contadores"] = None
+        return estado
+
+    @property
+    def contadores(self):
+        if self._contadores is None:
+            self._contadores = self.shm.buf[:self.tamano_cabecera].cast("Q")
+        return self._contadores
+
+    def _posicion(self, cursor):
+        return self.tamano_cabecera + (cursor % self.capacidad) * FORMATO_REGISTRO.size
+
+    def close(self):
+        """
+        Libera las vistas para que el segmento se pueda cerrar
+        """
+        if self._contadores is not None:
+            self._contadores.release()
+            self._contadores = None
+
+class EscritorAnillo(_ExtremoAnillo):
+    """
+    Extremo productor, con la misma interfaz `send` que un Pipe
+    """
+
+    def send(self, datos):
+        if datos is None:
+            self.contadores[1] = 1
+            return
+
+        contadores = self.contadores
+        escritura = contadores[0]
+
+        """
+        Contrapresión: esperar a que el lector más lento libere un lugar
+        """
+        intentos = 0
+        while escritura - min(contadores[2:2 + self.lectores]) >= self.capacidad:
+            _esperar(intentos)
+            intentos += 1
+
+        inicio = self._posicion(escritura)
+        self.shm.buf[inicio:inicio + FORMATO_REGISTRO.size] = empaquetar_muestra(datos)
+        contadores[0] = escritura + 1
+
+class LectorAnillo(_ExtremoAnillo):
+    """
+    Extremo consumidor con cursor propio, con la misma interfaz `recv` que un Pipe.
+    Devuelve None cuando el escritor cerró y no quedan registros por leer.
+    """
+
+    def __init__(self, anillo, indice):
+        super().__init__(anillo)
+        self.indice = indice
+
+    def poll(self, timeout=0.0):
+        """
+        Igual que Pipe.poll: True si hay un registro para leer (o el escritor
+        cerró), esperando como máximo `timeout` segundos
+        """
+        contadores = self.contadores
+        cursor = contadores[2 + self.indice]
+        limite = time.monotonic() + timeout
+
+        intentos = 0
+        while cursor >= contadores[0] and not contadores[1]:
+            if time.monotonic() >= limite:
+                return False
+            _esperar(intentos)
+            intentos += 1
+        return True
+
+    def recv(self):
+        contadores = self.contadores
+        cursor = contadores[2 + self.indice]
+
+        intentos = 0
+        while cursor >= contadores[0]:
+            if contadores[1]:
+                if cursor >= contadores[0]:
+                    return None
+                break
+            _esperar(intentos)
+            intentos += 1
+
+        inicio = self._posicion(cursor)
+        datos = desempaquetar_muestra(self.shm.buf[inicio:inicio + FORMATO_REGISTRO.size])
+        contadores[2 + self.indice] = cursor + 1
+        return datos
@@ -2,149 +2,613 @@
 Proceso Verificador - Construye la cadena de bloques
 Recibe resultados de analizadores, valida y construye bloques
 """
-import json
-import hashlib
+import os
+import queue
+import time
 from multiprocessing import Queue
-from collections import defaultdict
 
-def calcular_hash(prev_hash, datos, timestamp):
-    """
-    Calcula el hash SHA-256 del bloque según especificaciones
-    """
+from almacenamiento import RegistroBloques
+from analizador import SENALES, iterar_resultados
+from codificacion import VERSION_ACTUAL, VERSION_LEGADO, calcular_hash
+from consultas import IndiceConsultas
+from merkle import TIPO_CHECKPOINT, AcumuladorMerkle, es_checkpoint
+from metricas import Instrumentacion, SalidaLimitada
+from reglas import MotorReglas
+from reordenamiento import BufferReordenamiento
 
-    contenido = prev_hash + str(datos) + timestamp
-    return hashlib.sha256(contenido.encode()).hexdigest()
+"""
+Reglas de consignas (sin condiciones sostenidas, así que no guarda estado útil)
+"""
+MOTOR_PREDETERMINADO = MotorReglas()
 
-def validar_datos(datos):
+def validar_datos(datos, motor=None):
     """
-    Aplica las validaciones según consignas:
+    Aplica las reglas de alerta (por defecto, las de consignas):
     - frecuencia < 200
     - 90 <= oxigeno <= 100  
     - presión sistólica < 200
+    Con un `motor` propio se usan sus reglas, que pueden incluir
+    condiciones sostenidas durante varios bloques de la misma cadena
     """
-    alerta = False
+    motor = motor or MOTOR_PREDETERMINADO
+    alerta, disparadas = motor.evaluar_bloque(datos)
     
-    if datos["frecuencia"]["media"] >= 200:
-        alerta = True
-        print(f"⚠️  ALERTA: Frecuencia muy alta ({datos['frecuencia']['media']:.2f} >= 200)")
-    
-    oxigeno_media = datos["oxigeno"]["media"]
-    if oxigeno_media < 90 or oxigeno_media > 100:
-        alerta = True
-        print(f"⚠️  ALERTA: Oxígeno fuera de rango ({oxigeno_media:.2f}, debe estar entre 90-100)")
-    
-    if datos["presion"]["media"] >= 200:
-        alerta = True
-        print(f"⚠️  ALERTA: Presión sistólica muy alta ({datos['presion']['media']:.2f} >= 200)")
+    for regla, valor in disparadas:
+        print(f"⚠️  ALERTA: {regla.descripcion} ({regla.senal}.{regla.campo}={valor:.2f}; "
+              f"{regla.condicion_texto()})")
     
     return alerta
 
-def construir_bloque(timestamp, datos_completos, prev_hash, indice):
+def alertas_pacientes(medias, desvios, motor):
+    """
+    Las mismas reglas que validar_datos, vectorizadas sobre un fragmento de
+    pacientes (arreglos de medias y desvíos por señal). El motor debe ser
+    propio del fragmento, porque guarda las rachas de cada paciente
+    """
+    columnas = {}
+    for senal in SENALES:
+        columnas[(senal, "media")] = medias[senal]
+        columnas[(senal, "desv")] = desvios[senal]
+    alerta, _ = motor.evaluar_tick(columnas)
+    return alerta
+
+def construir_bloque(timestamp, datos_completos, prev_hash, indice, alerta=None, version=VERSION_ACTUAL):
 
     """
-    Validar datos y determinar si hay alerta
+    Validar datos y determinar si hay alerta (salvo que ya venga calculada)
     """
-    alerta = validar_datos(datos_completos)
+    if alerta is None:
+        alerta = validar_datos(datos_completos)
     
-    bloque = {
+    """
+    Los bloques v2 declaran su versión (ver codificacion.py); los v1 se
+    arman como en las consignas, sin la clave
+    """
+    bloque = {"version": version} if version != VERSION_LEGADO else {}
+    bloque.update({
         "timestamp": timestamp,
         "datos": datos_completos,
         "alerta": alerta,
         "prev_hash": prev_hash,
         "hash": ""  # Se calculará después
-    }
+    })
     
     """
     Calcular hash del bloque
     """
-    bloque["hash"] = calcular_hash(prev_hash, datos_completos, timestamp)
+    bloque["hash"] = calcular_hash(prev_hash, datos_completos, timestamp, version)
     
     return bloque, alerta
 
-def proceso_verificador(queue_resultados):
+class EtapaVerificador:
     """
-    Proceso verificador principal
-    Recibe resultados, agrupa por timestamp, construye y encadena bloques
+    Lógica del verificador, independiente del transporte: recibe los
+    mensajes de los analizadores, los reordena por número de secuencia y
+    construye y encadena los bloques. La usan tanto proceso_verificador
+    (proceso o hilo, con una cola bloqueante) como la tarea de asyncio de
+    ejecucion.py. Las opciones son las de proceso_verificador
     """
-    print("Verificador iniciado - Esperando resultados...")
 
-    buffer_resultados = defaultdict(dict)
+    def __init__(self, directorio_cadena="cadena", politica_fsync="lote",
+                 tamano_segmento=16 * 1024 * 1024, espera_maxima=10,
+                 retraso_max=2.0, max_pendientes=10000, detallado=False,
+                 intervalo_log=1.0, intervalo_metricas=5.0, ruta_metricas=None,
+                 ruta_reglas=None, merkle_cada=0, reinicio=None, terminados=()):
+        print(f"Verificador iniciado - Esperando resultados... (pid={os.getpid()})")
+        
+        self.motor = MotorReglas.desde_archivo(ruta_reglas) if ruta_reglas else MotorReglas()
+
+        self.tipos_requeridos = {"frecuencia", "presion", "oxigeno"}
+        self.reordenador = BufferReordenamiento(self.tipos_requeridos, retraso_max, max_pendientes)
+        self.directorio_cadena = directorio_cadena
+        self.espera_maxima = espera_maxima
+        self.retraso_max = retraso_max
+        self.ruta_metricas = ruta_metricas
+        
+        self.registro = RegistroBloques(
+            directorio_cadena,
+            politica_fsync=politica_fsync,
+            tamano_segmento=tamano_segmento,
+            reiniciar=reinicio is None
+        )
+        self.indice = IndiceConsultas(directorio_cadena, registro=self.registro)
+        self.prev_hash = "0" * 64 
+        self.merkle_cada = merkle_cada
+        self.arbol = AcumuladorMerkle() if merkle_cada > 0 else None
+        self.checkpoints_merkle = 0
+        self.ultimo_timestamp = None
+        
+        self.resultados_procesados = 0
+        self.bloques_creados = 0
+        self.muestras_descartadas = 0
+        self.primeras_descartadas = []
+        self.analizadores_activos = set(self.tipos_requeridos) - set(terminados)
+        
+        if reinicio is not None:
+            """
+            Retomar la cadena persistida: el siguiente bloque se encadena al último
+            """
+            self.bloques_creados = len(self.registro)
+            if self.bloques_creados:
+                self.prev_hash = self.registro.leer_bloque(self.bloques_creados - 1)["hash"]
+            print(f"♻️  Verificador reanudado sobre {self.bloques_creados} bloques "
+                  f"(recuperación: {(time.monotonic() - reinicio) * 1000:.1f} ms)")
+        self.ultima_actividad = time.monotonic()
+        
+        self.instrumentacion = Instrumentacion()
+        self.salida_resultados = SalidaLimitada(intervalo_log, detallado)
+        self.salida_bloques = SalidaLimitada(intervalo_log, detallado)
+        self.intervalo_metricas = intervalo_metricas
+        self.inicio = time.monotonic()
+        self.proximo_reporte = self.inicio + intervalo_metricas
+        
+        if reinicio is not None and self.arbol is not None:
+            self._retomar_arbol()
+
+    @property
+    def activa(self):
+        """
+        True hasta que los 3 analizadores avisen que no envían más resultados
+        """
+        return bool(self.analizadores_activos)
+
+    def espera(self):
+        """
+        Cuánto esperar el próximo mensaje antes de revisar la marca de agua
+        """
+        return min(self.espera_maxima, max(self.retraso_max / 4, 0.01))
     
-    blockchain = []
-    prev_hash = "0" * 64 
+    def _reportar(self, ahora):
+        """
+        Resumen en vivo: bloques por segundo y latencias por etapa
+        """
+        if self.intervalo_metricas <= 0 or ahora < self.proximo_reporte:
+            return
+        self.proximo_reporte = ahora + self.intervalo_metricas
+        transcurrido = ahora - self.inicio
+        print(f"📈 [{transcurrido:.1f}s] bloques={self.bloques_creados} "
+              f"({self.bloques_creados / transcurrido:.1f}/s) | {self.instrumentacion.linea()}")
     
-    resultados_procesados = 0
-    bloques_creados = 0
-    total_esperado = 60 * 3  
+    def _retomar_arbol(self):
+        """
+        Tras un reinicio, rearma el árbol del tramo abierto con los bloques
+        escritos después del último checkpoint (a lo sumo `merkle_cada`)
+        """
+        self.checkpoints_merkle = self.bloques_creados // (self.merkle_cada + 1)
+        inicio = max(0, self.bloques_creados - self.merkle_cada - 1)
+        self.arbol = AcumuladorMerkle(inicio)
+        for altura, bloque in enumerate(self.registro.iterar_bloques(inicio), inicio):
+            if es_checkpoint(bloque):
+                self.arbol = AcumuladorMerkle(altura + 1)
+            else:
+                self.arbol.agregar(bloque["hash"])
+                self.ultimo_timestamp = bloque["timestamp"]
+        
+        """
+        La caída pudo ocurrir entre el último bloque del tramo y su checkpoint
+        """
+        if len(self.arbol) >= self.merkle_cada:
+            self._cerrar_tramo()
     
-    while resultados_procesados < total_esperado:
-        try:
+    def _agregar_bloque(self, bloque):
+        self.registro.agregar(bloque)
+        self.indice.agregar(bloque)
+        self.prev_hash = bloque["hash"]
+        self.bloques_creados += 1
+    
+    def _cerrar_tramo(self):
+        """
+        Encadena un checkpoint con la raíz Merkle de los bloques del tramo
+        abierto; lleva el timestamp del último bloque (el índice de tiempos
+        sigue ordenado)
+        """
+        datos = {"desde": self.arbol.desde, "hasta": self.bloques_creados, "raiz": self.arbol.raiz()}
+        bloque = {
+            "version": VERSION_ACTUAL,
+            "timestamp": self.ultimo_timestamp,
+            "tipo": TIPO_CHECKPOINT,
+            "datos": datos,
+            "alerta": False,
+            "prev_hash": self.prev_hash,
+            "hash": calcular_hash(self.prev_hash, datos, self.ultimo_timestamp, VERSION_ACTUAL)
+        }
+        self._agregar_bloque(bloque)
+        self.checkpoints_merkle += 1
+        self.arbol = AcumuladorMerkle(self.bloques_creados)
+        
+        if self.salida_bloques.permite():
+            self.salida_bloques.imprimir(f"🌳 Checkpoint Merkle en el bloque {self.bloques_creados}: "
+                                          f"bloques {datos['desde'] + 1}-{datos['hasta']}, "
+                                          f"raíz={datos['raiz'][:16]}...")
+    
+    def _emitir(self, listas):
+        """
+        Encadena un bloque por cada muestra completa, en orden de secuencia
+        """
+        for seq, timestamp, datos, completa, t_gen in listas:
+            if not completa:
+                faltantes = sorted(self.tipos_requeridos - datos.keys())
+                self.muestras_descartadas += 1
+                if len(self.primeras_descartadas) < 10:
+                    self.primeras_descartadas.append(seq)
+                print(f"⏳ Muestra #{seq} descartada: incompleta (faltan {', '.join(faltantes)})")
+                continue
             
-            resultado = queue_resultados.get(timeout=10)
-            resultados_procesados += 1
+            """
+            Señales en orden fijo (no en el de llegada de los resultados):
+            el hash v2 no depende del orden, pero así la misma entrada
+            produce siempre el mismo blockchain.json
+            """
+            datos = {senal: datos[senal] for senal in SENALES}
             
-            timestamp = resultado["timestamp"]
-            tipo = resultado["tipo"]
+            antes = time.monotonic()
+            bloque, tiene_alerta = construir_bloque(timestamp, datos, self.prev_hash, self.bloques_creados,
+                                                    alerta=validar_datos(datos, self.motor))
+            hasheado = time.monotonic()
 
-            buffer_resultados[timestamp][tipo] = {
-                "media": resultado["media"],
-                "desv": resultado["desv"]
-            }
+            self._agregar_bloque(bloque)
+            persistido = time.monotonic()
             
-            print(f"Recibido {tipo} para {timestamp} "
-                  f"({len(buffer_resultados[timestamp])}/3 completo)")
+            self.instrumentacion.registrar("hash", hasheado - antes, hasheado)
+            self.instrumentacion.registrar("persistencia", persistido - hasheado, persistido)
+            if t_gen:
+                self.instrumentacion.registrar("total", persistido - t_gen, persistido)
             
             """
-            Si tenemos los 3 resultados para este timestamp, crear bloque 
+            Mostrar información del bloque (los de alerta, siempre)
             """
-            if len(buffer_resultados[timestamp]) == 3:
- 
-                tipos_requeridos = {"frecuencia", "presion", "oxigeno"}
-                if tipos_requeridos.issubset(buffer_resultados[timestamp].keys()):
-                    
-                    bloque, tiene_alerta = construir_bloque(
-                        timestamp, 
-                        buffer_resultados[timestamp], 
-                        prev_hash, 
-                        bloques_creados
-                    )
-
-                    blockchain.append(bloque)
-                    prev_hash = bloque["hash"]
-                    bloques_creados += 1
-                    
-                    """
-                    Mostrar información del bloque 
-                    """
-                    print(f"📦 Bloque {bloques_creados} creado: "
-                          f"Hash={bloque['hash'][:16]}... "
-                          f"{'🚨 ALERTA' if tiene_alerta else '✅ OK'}")
-                    
-                    del buffer_resultados[timestamp]
-
-                    guardar_blockchain(blockchain)
+            if tiene_alerta or self.salida_bloques.permite():
+                self.salida_bloques.imprimir(f"📦 Bloque {self.bloques_creados} creado: "
+                                              f"Hash={bloque['hash'][:16]}... "
+                                              f"{'🚨 ALERTA' if tiene_alerta else '✅ OK'}")
+            
+            if self.arbol is not None:
+                self.arbol.agregar(bloque["hash"])
+                self.ultimo_timestamp = timestamp
+                if len(self.arbol) >= self.merkle_cada:
+                    self._cerrar_tramo()
+
+    def sin_resultados(self):
+        """
+        No llegó nada en `espera()`: revisar igual la marca de agua.
+        Devuelve False si hay que terminar por inactividad
+        """
+        self._emitir(self.reordenador.vencer())
+        self._reportar(time.monotonic())
+        if time.monotonic() - self.ultima_actividad > self.espera_maxima:
+            print(f"Verificador: sin resultados durante {self.espera_maxima}s, finalizando "
+                  f"(analizadores sin terminar: {', '.join(sorted(self.analizadores_activos))})")
+            return False
+        return True
+
+    def recibir(self, resultado):
+        """
+        Procesa un mensaje de un analizador (lote de resultados o aviso de fin)
+        """
+        self.ultima_actividad = time.monotonic()
+        
+        if resultado.get("fin"):
+            self.analizadores_activos.discard(resultado["tipo"])
+            if resultado.get("metricas") is not None:
+                self.instrumentacion.combinar(resultado["metricas"])
+            return
+        
+        """
+        Los analizadores envían lotes columnares: desarmarlos en resultados
+        """
+        for individual in iterar_resultados(resultado):
+            self.resultados_procesados += 1
+            
+            seq = individual["seq"]
+            tipo = individual["tipo"]
+            
+            if individual.get("t_ana"):
+                self.instrumentacion.registrar("cola", self.ultima_actividad - individual["t_ana"],
+                                               self.ultima_actividad)
+            
+            if self.salida_resultados.permite():
+                self.salida_resultados.imprimir(f"Recibido {tipo} para #{seq} {individual['timestamp']}")
+            
+            valores = {"media": individual["media"], "desv": individual["desv"]}
+            if individual.get("extra"):
+                valores.update(individual["extra"])
+            self._emitir(self.reordenador.agregar(
+                seq, tipo, individual["timestamp"], valores, individual.get("t_gen")
+            ))
+        
+        self._reportar(time.monotonic())
+
+    def finalizar(self):
+        """
+        Fin del flujo: encadenar lo que quede completo y descartar el resto
+        """
+        self._emitir(self.reordenador.vaciar())
+        if self.arbol is not None and len(self.arbol):
+            self._cerrar_tramo()
+        
+        """
+        Cerrar el registro y exportar blockchain 
+        """
+        self.registro.cerrar()
+        self.indice.cerrar()
+        guardar_blockchain(self.registro)
+        
+        print(f"\n📊 Verificador finalizado:")
+        print(f"   - Bloques creados: {self.bloques_creados}"
+              + (f" (incluye {self.checkpoints_merkle} checkpoints Merkle)" if self.checkpoints_merkle else ""))
+        print(f"   - Resultados procesados: {self.resultados_procesados}")
+        print(f"   - Muestras descartadas por incompletas: {self.muestras_descartadas}"
+              + (f" (primeras: {self.primeras_descartadas})" if self.primeras_descartadas else ""))
+        print(f"   - Resultados tardíos ignorados: {self.reordenador.tardias}")
+        print(f"   - Latencia de reordenamiento: {self.reordenador.latencias.resumen()}")
+        print(f"   - Registro append-only en: {self.directorio_cadena}/")
+        print(f"   - Blockchain guardado en: blockchain.json")
+        mostrar_metricas(self.instrumentacion, self.ruta_metricas)
+
+def proceso_verificador(queue_resultados, directorio_cadena="cadena", politica_fsync="lote",
+                         tamano_segmento=16 * 1024 * 1024, espera_maxima=10,
+                         retraso_max=2.0, max_pendientes=10000, detallado=False,
+                         intervalo_log=1.0, intervalo_metricas=5.0, ruta_metricas=None,
+                         ruta_reglas=None, merkle_cada=0, reinicio=None, terminados=()):
+    """
+    Proceso verificador principal
+    Recibe resultados, los reordena por número de secuencia, construye y encadena bloques.
+    Cada bloque se agrega al registro append-only (sin reescribir la cadena)
+    y al final se exporta blockchain.json por compatibilidad.
+    `queue_resultados` es cualquier cola con `get(timeout)` que lance
+    queue.Empty (multiprocessing.Queue o queue.Queue entre hilos).
+
+    Las muestras a las que les falta algún resultado después de `retraso_max`
+    segundos (o cuando hay más de `max_pendientes` esperando) se descartan y
+    se informan, así la memoria no crece si un analizador se cae.
+
+    Mide la latencia de cada etapa (cola, hash, persistencia y total desde la
+    generación), muestra un resumen cada `intervalo_metricas` segundos y al
+    final la tabla completa, combinada con las mediciones de los analizadores
+    (y la guarda en JSON si se indica `ruta_metricas`).
+
+    Las alertas se evalúan con las reglas de `ruta_reglas` (JSON), o con
+    las de consignas si no se indica.
+
+    Con `merkle_cada` > 0, cada `merkle_cada` bloques se encadena un
+    checkpoint con la raíz Merkle de ese tramo (y uno más al final por el
+    tramo incompleto), para probar la inclusión de un bloque con O(log n)
+    hashes sin recorrer la cadena (ver merkle.py).
+
+    Si es un reinicio tras una caída (`reinicio`: instante en que se
+    detectó), continúa la cadena ya persistida en lugar de empezar una
+    nueva; `terminados` son los analizadores que ya enviaron su aviso de fin
+    """
+    etapa = EtapaVerificador(directorio_cadena, politica_fsync, tamano_segmento, espera_maxima,
+                             retraso_max, max_pendientes, detallado, intervalo_log,
+                             intervalo_metricas, ruta_metricas, ruta_reglas, merkle_cada, reinicio,
+                             terminados)
+    
+    """
+    Terminar cuando los 3 analizadores avisen que no envían más resultados
+    (o tras `espera_maxima` segundos sin recibir nada)
+    """
+    while etapa.activa:
+        try:
+            try:
+                resultado = queue_resultados.get(timeout=etapa.espera())
+            except queue.Empty:
+                if not etapa.sin_resultados():
+                    break
+                continue
+            
+            etapa.recibir(resultado)
         
         except Exception as e:
             print(f"Error en verificador: {e}")
             break
     
+    etapa.finalizar()
+
+class RegistrosPacientes:
     """
-    Guardar blockchain 
+    Registros de bloques de varios pacientes sin tener uno abierto por
+    paciente (cada uno usa dos descriptores; con cientos de pacientes se
+    agota el límite del proceso).
+
+    Los bloques de cada paciente se acumulan en memoria y se escriben de a
+    `lote`: se abre el registro, se agregan y se cierra (persistiendo el
+    lote). Con la política "siempre" el lote es de un bloque. Así nunca hay
+    más de un registro abierto a la vez.
     """
-    guardar_blockchain(blockchain)
-    
+
+    def __init__(self, directorios, politica_fsync="lote", tamano_segmento=16 * 1024 * 1024, lote=64):
+        self.directorios = directorios
+        self.politica_fsync = politica_fsync
+        self.tamano_segmento = tamano_segmento
+        self.lote = 1 if politica_fsync == "siempre" else max(1, lote)
+        self.alturas = [0] * len(directorios)
+        self._pendientes = [[] for _ in directorios]
+        self._iniciados = [False] * len(directorios)
+
+    def altura(self, paciente):
+        """
+        Altura del próximo bloque del paciente (contando los pendientes)
+        """
+        return self.alturas[paciente]
+
+    def agregar(self, paciente, bloque):
+        self._pendientes[paciente].append(bloque)
+        self.alturas[paciente] += 1
+        if len(self._pendientes[paciente]) >= self.lote:
+            self.escribir(paciente)
+
+    def abrir(self, paciente):
+        """
+        Abre el registro del paciente en modo append; la primera vez lo
+        reinicia (descarta la cadena de una ejecución anterior)
+        """
+        registro = RegistroBloques(self.directorios[paciente], politica_fsync=self.politica_fsync,
+                                   tamano_segmento=self.tamano_segmento,
+                                   reiniciar=not self._iniciados[paciente])
+        self._iniciados[paciente] = True
+        return registro
+
+    def escribir(self, paciente):
+        """
+        Escribe los bloques pendientes del paciente (abrir, agregar, cerrar)
+        """
+        if not self._pendientes[paciente] and self._iniciados[paciente]:
+            return
+        with self.abrir(paciente) as registro:
+            for bloque in self._pendientes[paciente]:
+                registro.agregar(bloque)
+        self._pendientes[paciente] = []
+
+def proceso_verificador_pacientes(queue_resultados, pacientes, fragmentos, directorio_cadena="cadena",
+                                  politica_fsync="lote", tamano_segmento=16 * 1024 * 1024,
+                                  espera_maxima=10, detallado=False, intervalo_log=1.0,
+                                  intervalo_metricas=5.0, ruta_metricas=None, ruta_reglas=None):
+    """
+    Verificador de varios pacientes: mantiene una cadena independiente por
+    paciente en `directorio_cadena/paciente_NNNN/` (registro append-only,
+    índice de consultas y blockchain.json al finalizar).
+
+    Cada analizador cubre un fragmento de pacientes con las tres señales y
+    sus mensajes llegan en orden por la Queue, así que cada tick trae
+    resultados completos y no hace falta reordenar. Termina cuando los
+    `fragmentos` analizadores avisan el fin (o por inactividad).
+    Las alertas se evalúan con un motor de reglas por fragmento
+    """
+    print(f"Verificador iniciado - {pacientes} pacientes en {fragmentos} fragmentos...")
+
+    reglas = MotorReglas.desde_archivo(ruta_reglas).reglas if ruta_reglas else None
+    motores = {}
+
+    directorios = [os.path.join(directorio_cadena, f"paciente_{p:04d}") for p in range(pacientes)]
+    registros = RegistrosPacientes(directorios, politica_fsync, tamano_segmento)
+    prev_hashes = ["0" * 64] * pacientes
+
+    ticks_procesados = 0
+    bloques_creados = 0
+    alertas = 0
+    fragmentos_activos = fragmentos
+    ultima_actividad = time.monotonic()
+
+    instrumentacion = Instrumentacion()
+    salida = SalidaLimitada(intervalo_log, detallado)
+    inicio_verificacion = time.monotonic()
+    proximo_reporte = inicio_verificacion + intervalo_metricas
+
+    while fragmentos_activos:
+        try:
+            try:
+                resultado = queue_resultados.get(timeout=min(espera_maxima, 1.0))
+            except queue.Empty:
+                if time.monotonic() - ultima_actividad > espera_maxima:
+                    print(f"Verificador: sin resultados durante {espera_maxima}s, finalizando "
+                          f"({fragmentos_activos} analizadores sin terminar)")
+                    break
+                continue
+
+            ultima_actividad = time.monotonic()
+
+            if resultado.get("fin"):
+                fragmentos_activos -= 1
+                if resultado.get("metricas") is not None:
+                    instrumentacion.combinar(resultado["metricas"])
+                continue
+
+            if resultado.get("t_ana"):
+                instrumentacion.registrar("cola", ultima_actividad - resultado["t_ana"], ultima_actividad)
+
+            inicio, fin = resultado["pacientes"]
+            timestamp = resultado["timestamp"]
+            if (inicio, fin) not in motores:
+                motores[(inicio, fin)] = MotorReglas(reglas)
+            marcas_alerta = alertas_pacientes(resultado["media"], resultado["desv"], motores[(inicio, fin)])
+
+            """
+            Pasar a listas de Python una sola vez (en lugar de leer escalares
+            de numpy bloque por bloque)
+            """
+            medias = {senal: resultado["media"][senal].tolist() for senal in SENALES}
+            desvios = {senal: resultado["desv"][senal].tolist() for senal in SENALES}
+
+            antes = time.monotonic()
+            bloques = []
+            for k, paciente in enumerate(range(inicio, fin)):
+                datos = {senal: {"media": medias[senal][k], "desv": desvios[senal][k]} for senal in SENALES}
+                bloque, tiene_alerta = construir_bloque(
+                    timestamp, datos, prev_hashes[paciente], registros.altura(paciente),
+                    alerta=bool(marcas_alerta[k])
+                )
+                prev_hashes[paciente] = bloque["hash"]
+                bloques.append(bloque)
+                if tiene_alerta:
+                    alertas += 1
+                    print(f"🚨 Paciente {paciente} - bloque {registros.altura(paciente) + 1}: ALERTA "
+                          f"(FC={datos['frecuencia']['media']:.2f}, "
+                          f"PA={datos['presion']['media']:.2f}, O2={datos['oxigeno']['media']:.2f})")
+            hasheado = time.monotonic()
+
+            for paciente, bloque in zip(range(inicio, fin), bloques):
+                registros.agregar(paciente, bloque)
+            persistido = time.monotonic()
+
+            bloques_creados += len(bloques)
+            ticks_procesados += 1
+            instrumentacion.registrar("hash", hasheado - antes, hasheado)
+            instrumentacion.registrar("persistencia", persistido - hasheado, persistido)
+            if resultado.get("t_gen"):
+                instrumentacion.registrar("total", persistido - resultado["t_gen"], persistido)
+
+            if salida.permite():
+                salida.imprimir(f"📦 Tick #{resultado['seq']}: {len(bloques)} bloques "
+                                f"(pacientes {inicio}-{fin - 1})")
+
+            if intervalo_metricas > 0 and persistido >= proximo_reporte:
+                proximo_reporte = persistido + intervalo_metricas
+                transcurrido = persistido - inicio_verificacion
+                print(f"📈 [{transcurrido:.1f}s] bloques={bloques_creados} "
+                      f"({bloques_creados / transcurrido:.1f}/s) | {instrumentacion.linea()}")
+
+        except Exception as e:
+            print(f"Error en verificador: {e}")
+            break
+
+    """
+    De a un paciente por vez: escribir los bloques pendientes, construir el
+    índice de consultas (se pone al día con el registro) y exportar el JSON
+    """
+    for paciente, directorio in enumerate(directorios):
+        registros.escribir(paciente)
+        with RegistroBloques(directorio, solo_lectura=True) as registro:
+            IndiceConsultas(directorio, registro=registro).cerrar()
+            guardar_blockchain(registro, os.path.join(directorio, "blockchain.json"))
+
     print(f"\n📊 Verificador finalizado:")
+    print(f"   - Pacientes: {pacientes} (cadenas en {directorio_cadena}/paciente_NNNN/)")
     print(f"   - Bloques creados: {bloques_creados}")
-    print(f"   - Resultados procesados: {resultados_procesados}")
-    print(f"   - Blockchain guardado en: blockchain.json")
+    print(f"   - Mensajes de fragmento procesados: {ticks_procesados}")
+    print(f"   - Bloques con alerta: {alertas}")
+    mostrar_metricas(instrumentacion, ruta_metricas)
+
+def mostrar_metricas(instrumentacion, ruta_metricas=None):
+    """
+    Tabla final de métricas por etapa (y opcionalmente su exportación a JSON)
+    """
+    print(f"\n⏱️  Métricas por etapa (throughput y latencia):")
+    for linea in instrumentacion.resumen().splitlines():
+        print(f"   {linea}")
+    if ruta_metricas:
+        try:
+            instrumentacion.guardar(ruta_metricas)
+            print(f"   - Métricas guardadas en: {ruta_metricas}")
+        except OSError as e:
+            print(f"Error guardando métricas: {e}")
 
-def guardar_blockchain(blockchain):
+def guardar_blockchain(registro, ruta="blockchain.json"):
     """
-    Persiste la blockchain a archivo JSON
+    Exporta el registro de bloques al formato JSON compatible
     """
     try:
-        with open("blockchain.json", "w", encoding="utf-8") as f:
-            json.dump(blockchain, f, indent=2, ensure_ascii=False)
+        registro.exportar_json(ruta)
     except Exception as e:
         print(f"Error guardando blockchain: {e}")
 
@@ -1,73 +1,502 @@
 """
 Verificador de Integridad de la cadena de bloques
 """
+import argparse
+import codecs
 import json
-import hashlib
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def calcular_hash(prev_hash, datos, timestamp):
+import numpy as np
+
+import formato_binario
+from codificacion import calcular_hash, hash_bloque, version_bloque
+from merkle import AcumuladorMerkle, es_checkpoint
+
+def iterar_bloques_json(ruta, offset=0, tamano_lectura=1024 * 1024, tamano_max_bloque=16 * 1024 * 1024):
+    """
+    Recorre la lista JSON de `ruta` bloque por bloque sin cargarla entera.
+    Devuelve tuplas (bloque, offset_inicio, offset_fin) en bytes dentro del archivo.
+    Un bloque que no decodifica aunque el buffer ya tenga más de
+    `tamano_max_bloque` caracteres se informa como JSON inválido, sin
+    seguir leyendo el archivo
+    """
+    decodificador = json.JSONDecoder()
+    decodificador_utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    with open(ruta, "rb") as f:
+        f.seek(offset)
+        texto = ""
+        pos = 0
+        offset_texto = offset
+        fin_archivo = False
+        abierta = offset > 0
+
+        while True:
+            """
+            Saltar espacios y las comas entre bloques, y la apertura de la
+            lista solo al principio del archivo
+            """
+            while pos < len(texto) and (texto[pos] in " \t\r\n," or (texto[pos] == "[" and not abierta)):
+                abierta = abierta or texto[pos] == "["
+                pos += 1
+
+            if pos < len(texto) and texto[pos] == "]":
+                return
+
+            try:
+                if pos >= len(texto):
+                    raise json.JSONDecodeError("buffer vacío", texto, pos)
+                bloque, fin = decodificador.raw_decode(texto, pos)
+            except json.JSONDecodeError:
+                if fin_archivo or len(texto) - pos > tamano_max_bloque:
+                    if texto[pos:].strip():
+                        raise
+                    return
+
+                """
+                Bloque incompleto en el buffer: descartar lo consumido y leer más
+                """
+                consumido = texto[:pos]
+                offset_texto += len(consumido) if consumido.isascii() else len(consumido.encode("utf-8"))
+                texto = texto[pos:]
+                pos = 0
+
+                chunk = f.read(tamano_lectura)
+                fin_archivo = not chunk
+                texto += decodificador_utf8.decode(chunk, final=fin_archivo)
+                continue
+
+            if not isinstance(bloque, dict):
+                raise json.JSONDecodeError("se esperaba un bloque (objeto JSON)", texto, pos)
+
+            previo = texto[:pos]
+            inicio = offset_texto + (len(previo) if previo.isascii() else len(previo.encode("utf-8")))
+            cuerpo = texto[pos:fin]
+            offset_fin = inicio + (len(cuerpo) if cuerpo.isascii() else len(cuerpo.encode("utf-8")))
+
+            yield bloque, inicio, offset_fin
+            abierta = True
+            pos = fin
+
+def _hashes_invalidos(lote):
+    """
+    Recalcula los hashes de un lote de bloques (se ejecuta en un proceso del pool),
+    cada uno con la versión de codificación que declara.
+    Solo devuelve los corruptos, como (posición en el lote, hash calculado)
+    """
+    invalidos = []
+    for i, (prev_hash, datos, timestamp, hash_guardado, version) in enumerate(lote):
+        try:
+            hash_calculado = calcular_hash(prev_hash, datos, timestamp, version)
+        except ValueError as e:
+            hash_calculado = f"(no calculable: {e})"
+        if hash_calculado != hash_guardado:
+            invalidos.append((i, hash_calculado))
+    return invalidos
+
+def _lotes(ruta, tamano_lote, offset=0, acumulador=None):
+    """
+    Agrupa los bloques leídos en streaming en lotes de tamaño fijo.
+    Junto con cada lote devuelve su columna (prev_hash, hash, datos del
+    checkpoint Merkle o None) y los offsets (inicio, fin) de su último bloque.
+    Si se pasa un acumulador, cada bloque se suma al reporte en la misma pasada
+    """
+    lote = []
+    columnas = []
+    offsets = None
+    for bloque, inicio, fin in iterar_bloques_json(ruta, offset):
+        if acumulador is not None:
+            acumulador.agregar(bloque)
+        lote.append((bloque['prev_hash'], bloque['datos'], bloque['timestamp'], bloque['hash'],
+                     version_bloque(bloque)))
+        columnas.append((bloque['prev_hash'], bloque['hash'],
+                         bloque['datos'] if es_checkpoint(bloque) else None))
+        offsets = (inicio, fin)
+        if len(lote) == tamano_lote:
+            yield lote, columnas, offsets
+            lote = []
+            columnas = []
+    if lote:
+        yield lote, columnas, offsets
+
+def _resultados_en_orden(ruta, workers, tamano_lote, offset=0, acumulador=None):
+    """
+    Reparte los lotes en un pool de procesos manteniendo como máximo
+    2 lotes por worker en vuelo (memoria acotada) y entrega los resultados
+    en el orden de la cadena junto con la columna del lote (ver `_lotes`)
+    """
+    if workers <= 1:
+        for lote, columnas, offsets in _lotes(ruta, tamano_lote, offset, acumulador):
+            yield columnas, _hashes_invalidos(lote), offsets
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        en_vuelo = deque()
+        for lote, columnas, offsets in _lotes(ruta, tamano_lote, offset, acumulador):
+            en_vuelo.append((columnas, pool.submit(_hashes_invalidos, lote), offsets))
+            if len(en_vuelo) >= 2 * workers:
+                columnas, futuro, offsets_lote = en_vuelo.popleft()
+                yield columnas, futuro.result(), offsets_lote
+        while en_vuelo:
+            columnas, futuro, offsets_lote = en_vuelo.popleft()
+            yield columnas, futuro.result(), offsets_lote
+
+SENALES = ("frecuencia", "presion", "oxigeno")
+
+class AcumuladorReporte:
     """
-    Calcula el hash SHA-256 de un bloque
+    Agregados del reporte (alertas, media/mín/máx por señal, duración)
+    actualizados bloque a bloque durante la misma pasada de verificación.
+    Su estado se guarda en el checkpoint para que una verificación
+    incremental siga produciendo el reporte de la cadena completa.
+    Los checkpoints Merkle no llevan mediciones: solo se cuentan
     """
-    contenido = prev_hash + str(datos) + timestamp
-    return hashlib.sha256(contenido.encode()).hexdigest()
 
-def verificar_cadena():
+    def __init__(self, estado=None):
+        self.restaurar(estado)
+
+    def restaurar(self, estado=None):
+        """
+        Vuelve al estado guardado en un checkpoint (o al inicial, sin estado)
+        """
+        self.total_bloques = 0
+        self.checkpoints_merkle = 0
+        self.bloques_con_alerta = 0
+        self.suma = {senal: 0.0 for senal in SENALES}
+        self.minimo = {senal: None for senal in SENALES}
+        self.maximo = {senal: None for senal in SENALES}
+        self.primer_timestamp = None
+        self.ultimo_timestamp = None
+        if estado:
+            self.__dict__.update(estado)
+
+    def agregar(self, bloque):
+        if es_checkpoint(bloque):
+            self.checkpoints_merkle += 1
+            return
+
+        self.total_bloques += 1
+        if bloque.get('alerta', False):
+            self.bloques_con_alerta += 1
+
+        datos = bloque['datos']
+        for senal in SENALES:
+            media = datos[senal]['media']
+            self.suma[senal] += media
+            if self.minimo[senal] is None or media < self.minimo[senal]:
+                self.minimo[senal] = media
+            if self.maximo[senal] is None or media > self.maximo[senal]:
+                self.maximo[senal] = media
+
+        if self.primer_timestamp is None:
+            self.primer_timestamp = bloque['timestamp']
+        self.ultimo_timestamp = bloque['timestamp']
+
+    def agregar_arreglo(self, arreglo, inicio=0, fin=None):
+        """
+        Igual que `agregar`, pero sobre un tramo de un arreglo del formato
+        binario y con operaciones vectorizadas (sin un dict por bloque)
+        """
+        tramo = arreglo[inicio:fin]
+        mediciones = np.flatnonzero(tramo["tipo"] == formato_binario.REGISTRO_MEDICION)
+        self.checkpoints_merkle += len(tramo) - len(mediciones)
+        if len(mediciones) == 0:
+            return
+        if len(mediciones) < len(tramo):
+            tramo = tramo[mediciones]
+
+        self.total_bloques += len(tramo)
+        self.bloques_con_alerta += int(np.count_nonzero(tramo["alerta"]))
+
+        medias = tramo["media"]
+        for k, senal in enumerate(SENALES):
+            columna = medias[:, k]
+            self.suma[senal] += float(columna.sum())
+            minimo, maximo = float(columna.min()), float(columna.max())
+            self.minimo[senal] = minimo if self.minimo[senal] is None else min(self.minimo[senal], minimo)
+            self.maximo[senal] = maximo if self.maximo[senal] is None else max(self.maximo[senal], maximo)
+
+        primero, ultimo = inicio + int(mediciones[0]), inicio + int(mediciones[-1])
+        extremos = formato_binario.timestamps(arreglo, primero, primero + 1) + \
+            formato_binario.timestamps(arreglo, ultimo, ultimo + 1)
+        if self.primer_timestamp is None:
+            self.primer_timestamp = extremos[0]
+        self.ultimo_timestamp = extremos[1]
+
+    def estado(self):
+        return dict(self.__dict__)
+
+    def promedio(self, senal):
+        return self.suma[senal] / self.total_bloques if self.total_bloques > 0 else 0
+
+    def duracion_segundos(self):
+        """
+        Lapso entre el primer y el último bloque más un intervalo medio
+        (cada bloque representa un intervalo de muestreo)
+        """
+        if self.total_bloques == 0:
+            return 0.0
+        if self.total_bloques == 1:
+            return 1.0
+        lapso = (datetime.fromisoformat(self.ultimo_timestamp) -
+                 datetime.fromisoformat(self.primer_timestamp)).total_seconds()
+        return lapso * self.total_bloques / (self.total_bloques - 1)
+
+def cargar_checkpoint(ruta_checkpoint):
+    """
+    Lee el checkpoint de la última verificación exitosa (o None si no hay)
+    """
+    try:
+        with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def guardar_checkpoint(ruta_checkpoint, checkpoint):
+    """
+    Persiste el checkpoint reemplazando el archivo de forma atómica
+    """
+    temporal = ruta_checkpoint + ".tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temporal, ruta_checkpoint)
+
+def checkpoint_vigente(ruta, checkpoint):
+    """
+    Comprueba que el bloque del checkpoint siga en el mismo lugar del archivo
+    y con el mismo hash; si la cadena fue regenerada o truncada no sirve
+    """
+    try:
+        if os.path.getsize(ruta) < checkpoint['offset']:
+            return False
+        with open(ruta, 'rb') as f:
+            f.seek(checkpoint['offset_inicio'])
+            bloque = json.loads(f.read(checkpoint['offset'] - checkpoint['offset_inicio']))
+        return bloque['hash'] == checkpoint['hash'] and hash_bloque(bloque) == bloque['hash']
+    except (OSError, KeyError, ValueError, TypeError):
+        return False
+
+def checkpoint_binario_vigente(arreglo, checkpoint):
     """
-    Verifica la integridad de la cadena de bloques
+    En el formato binario la altura determina la posición del bloque:
+    basta comprobar que siga existiendo con el mismo hash (y que sea válido)
+    """
+    try:
+        if checkpoint.get('formato') != 'binario' or not 0 < checkpoint['altura'] <= len(arreglo):
+            return False
+        altura = checkpoint['altura'] - 1
+        return (arreglo[altura]["hash"].tobytes().hex() == checkpoint['hash'] and
+                not formato_binario.hashes_invalidos_arreglo(arreglo, altura, altura + 1))
+    except (KeyError, TypeError, ValueError):
+        return False
+
+def _verificar_binario(ruta, workers, tamano_lote, detallado, completa, ruta_checkpoint, acumulador):
+    """
+    Verificación de una cadena en formato binario: el archivo se mapea en
+    memoria, cada worker recalcula los hashes de un rango de alturas sobre
+    las columnas, y el encadenamiento y el reporte se resuelven con
+    operaciones vectorizadas (sin crear un objeto por bloque)
+    """
+    arreglo = formato_binario.leer_binario(ruta)
+
+    checkpoint = None if completa else cargar_checkpoint(ruta_checkpoint)
+    if checkpoint is not None and not checkpoint_binario_vigente(arreglo, checkpoint):
+        print("⚠️  El checkpoint no coincide con la cadena actual: verificación completa")
+        checkpoint = None
+    if checkpoint is not None and acumulador is not None and 'reporte' not in checkpoint:
+        checkpoint = None
+
+    desde = 0
+    if checkpoint is not None:
+        print(f"⏩ Retomando desde el checkpoint: {checkpoint['altura']} bloques ya verificados")
+        desde = checkpoint['altura']
+        if acumulador is not None:
+            acumulador.restaurar(checkpoint['reporte'])
+
+    print("=" * 60)
+
+    rangos = [(inicio, min(inicio + tamano_lote, len(arreglo)))
+              for inicio in range(desde, len(arreglo), tamano_lote)]
+    if workers <= 1 or len(rangos) <= 1:
+        resultados = [formato_binario.hashes_invalidos(ruta, inicio, fin) for inicio, fin in rangos]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(formato_binario.hashes_invalidos,
+                                       [ruta] * len(rangos), *zip(*rangos)))
+    invalidos = dict(par for resultado in resultados for par in resultado)
+
+    rotos = [altura for altura in formato_binario.encadenamientos_rotos(arreglo) if altura >= max(desde, 1)]
+    merkle_invalidos = formato_binario.checkpoints_invalidos(arreglo, desde)
+    if acumulador is not None:
+        acumulador.agregar_arreglo(arreglo, desde)
+
+    if detallado:
+        rotos_conjunto = set(rotos)
+        for i in range(desde, len(arreglo)):
+            if i not in invalidos:
+                print(f"✅ Bloque {i+1}: Hash válido")
+            if i > 0 and i not in rotos_conjunto:
+                print(f"🔗 Bloque {i+1}: Encadenamiento válido")
+
+    for i, hash_calculado in sorted(invalidos.items()):
+        print(f"❌ Bloque {i+1}: Hash corrupto")
+        print(f"   Hash esperado: {arreglo[i]['hash'].tobytes().hex()}")
+        print(f"   Hash calculado: {hash_calculado}")
+    for i in rotos:
+        print(f"💔 Bloque {i+1}: Encadenamiento corrupto")
+        print(f"   Prev_hash esperado: {arreglo[i - 1]['hash'].tobytes().hex()}")
+        print(f"   Prev_hash actual: {arreglo[i]['prev_hash'].tobytes().hex()}")
+    for i, esperado in merkle_invalidos:
+        print(f"🌳 Bloque {i+1}: Checkpoint Merkle inválido")
+        print(f"   Esperado: {esperado}")
+        print(f"   Guardado: {formato_binario.datos_checkpoint(arreglo[i])}")
+
+    corruptos = sorted({i + 1 for i in invalidos} | {i + 1 for i in rotos} |
+                       {i + 1 for i, _ in merkle_invalidos})
+
+    print("=" * 60)
+    print(f"📊 RESUMEN DE VERIFICACIÓN:")
+    print(f"   Total de bloques: {len(arreglo)}")
+    print(f"   Bloques válidos: {len(arreglo) - len(invalidos)}")
+    print(f"   Bloques corruptos: {len(corruptos)}")
+
+    if corruptos:
+        print(f"   Bloques con problemas: {corruptos}")
+        return False
+
+    print("✅ La cadena de bloques es íntegra y válida")
+    if len(arreglo) > 0:
+        checkpoint = {
+            "formato": "binario",
+            "altura": len(arreglo),
+            "hash": arreglo[-1]["hash"].tobytes().hex()
+        }
+        if acumulador is not None:
+            checkpoint["reporte"] = acumulador.estado()
+        guardar_checkpoint(ruta_checkpoint, checkpoint)
+    return True
+
+def verificar_cadena(ruta='blockchain.json', workers=None, tamano_lote=2000, detallado=True,
+                     completa=False, ruta_checkpoint=None, acumulador=None):
+    """
+    Verifica la integridad de la cadena de bloques.
+    Los hashes se recalculan por lotes en paralelo (cada hash depende solo
+    del propio bloque) y el encadenamiento se valida en una sola pasada
+    sobre la columna de hashes, leyendo el archivo en streaming.
+
+    Tras una verificación exitosa se guarda un checkpoint (altura, hash y
+    offset del último bloque); las ejecuciones siguientes solo verifican
+    los bloques agregados después, salvo que se pida `completa=True`.
+
+    Si se pasa un `AcumuladorReporte`, los agregados del reporte se
+    calculan durante la misma lectura (sin volver a cargar la cadena).
+
+    Las cadenas en formato binario (formato_binario.py) se detectan por su
+    cabecera y se verifican sobre el archivo mapeado en memoria
     """
     
     # Verificar si existe el archivo
-    if not os.path.exists('blockchain.json'):
-        print("❌ Error: No se encontró el archivo blockchain.json")
+    if not os.path.exists(ruta):
+        print(f"❌ Error: No se encontró el archivo {ruta}")
         return False
     
+    workers = workers or os.cpu_count() or 1
+    ruta_checkpoint = ruta_checkpoint or ruta + ".checkpoint"
+    
     try:
-        # Cargar la cadena de bloques
-        with open('blockchain.json', 'r') as f:
-            blockchain = json.load(f)
+        print(f"🔍 Verificando cadena de bloques de {ruta} (workers={workers}, lote={tamano_lote})...")
+        
+        if formato_binario.es_binario(ruta):
+            return _verificar_binario(ruta, workers, tamano_lote, detallado, completa,
+                                      ruta_checkpoint, acumulador)
+        
+        checkpoint = None if completa else cargar_checkpoint(ruta_checkpoint)
+        if checkpoint is not None and not checkpoint_vigente(ruta, checkpoint):
+            print("⚠️  El checkpoint no coincide con la cadena actual: verificación completa")
+            checkpoint = None
+        if checkpoint is not None and acumulador is not None and 'reporte' not in checkpoint:
+            checkpoint = None
+        if checkpoint is not None and 'merkle' not in checkpoint:
+            checkpoint = None
+        
+        if checkpoint is not None:
+            print(f"⏩ Retomando desde el checkpoint: {checkpoint['altura']} bloques ya verificados")
+            offset = checkpoint['offset']
+            total_bloques = checkpoint['altura']
+            hash_anterior = checkpoint['hash']
+            arbol = AcumuladorMerkle(**checkpoint['merkle'])
+            if acumulador is not None:
+                acumulador.restaurar(checkpoint['reporte'])
+        else:
+            offset = 0
+            total_bloques = 0
+            hash_anterior = None
+            arbol = AcumuladorMerkle()
         
-        print(f"🔍 Verificando cadena de bloques con {len(blockchain)} bloques...")
         print("=" * 60)
         
         bloques_corruptos = []
-        bloques_validos = 0
+        bloques_validos = total_bloques
+        ultimo_offset = (checkpoint['offset_inicio'], offset) if checkpoint else None
         
-        for i, bloque in enumerate(blockchain):
-            # Recalcular el hash del bloque
-            hash_calculado = calcular_hash(
-                bloque['prev_hash'],
-                bloque['datos'],
-                bloque['timestamp']
-            )
+        for columnas, invalidos, offsets_lote in _resultados_en_orden(ruta, workers, tamano_lote, offset,
+                                                                            acumulador):
+            ultimo_offset = offsets_lote
+            invalidos = dict(invalidos)
             
-            # Verificar si el hash coincide
-            if hash_calculado == bloque['hash']:
-                bloques_validos += 1
-                print(f"✅ Bloque {i+1}: Hash válido")
-            else:
-                bloques_corruptos.append(i+1)
-                print(f"❌ Bloque {i+1}: Hash corrupto")
-                print(f"   Hash esperado: {bloque['hash']}")
-                print(f"   Hash calculado: {hash_calculado}")
-            
-            # Verificar encadenamiento (excepto para el primer bloque)
-            if i > 0:
-                prev_hash_esperado = blockchain[i-1]['hash']
-                if bloque['prev_hash'] == prev_hash_esperado:
-                    print(f"🔗 Bloque {i+1}: Encadenamiento válido")
+            for j, (prev_hash, hash_guardado, tramo) in enumerate(columnas):
+                i = total_bloques
+                total_bloques += 1
+                
+                # Verificar si el hash coincide
+                if j not in invalidos:
+                    bloques_validos += 1
+                    if detallado:
+                        print(f"✅ Bloque {i+1}: Hash válido")
                 else:
                     bloques_corruptos.append(i+1)
-                    print(f"💔 Bloque {i+1}: Encadenamiento corrupto")
-                    print(f"   Prev_hash esperado: {prev_hash_esperado}")
-                    print(f"   Prev_hash actual: {bloque['prev_hash']}")
+                    print(f"❌ Bloque {i+1}: Hash corrupto")
+                    print(f"   Hash esperado: {hash_guardado}")
+                    print(f"   Hash calculado: {invalidos[j]}")
+                
+                # Verificar encadenamiento (excepto para el primer bloque)
+                if i > 0:
+                    if prev_hash == hash_anterior:
+                        if detallado:
+                            print(f"🔗 Bloque {i+1}: Encadenamiento válido")
+                    else:
+                        bloques_corruptos.append(i+1)
+                        print(f"💔 Bloque {i+1}: Encadenamiento corrupto")
+                        print(f"   Prev_hash esperado: {hash_anterior}")
+                        print(f"   Prev_hash actual: {prev_hash}")
+                
+                """
+                Raíz Merkle: se acumulan los hashes de los bloques desde el
+                último checkpoint y cada checkpoint tiene que coincidir
+                """
+                if tramo is None:
+                    arbol.agregar(hash_guardado)
+                else:
+                    esperado = {"desde": arbol.desde, "hasta": i, "raiz": arbol.raiz()}
+                    if tramo != esperado:
+                        bloques_corruptos.append(i+1)
+                        print(f"🌳 Bloque {i+1}: Checkpoint Merkle inválido")
+                        print(f"   Esperado: {esperado}")
+                        print(f"   Guardado: {tramo}")
+                    elif detallado:
+                        print(f"🌳 Bloque {i+1}: Raíz Merkle válida (bloques {arbol.desde + 1}-{i})")
+                    arbol = AcumuladorMerkle(i + 1)
+                
+                hash_anterior = hash_guardado
         
         print("=" * 60)
         
         # Resumen de la verificación
         print(f"📊 RESUMEN DE VERIFICACIÓN:")
-        print(f"   Total de bloques: {len(blockchain)}")
+        print(f"   Total de bloques: {total_bloques}")
         print(f"   Bloques válidos: {bloques_validos}")
         print(f"   Bloques corruptos: {len(set(bloques_corruptos))}")
         
@@ -76,48 +505,50 @@ def verificar_cadena():
             return False
         else:
             print("✅ La cadena de bloques es íntegra y válida")
+            if total_bloques > 0:
+                checkpoint = {
+                    "altura": total_bloques,
+                    "hash": hash_anterior,
+                    "offset_inicio": ultimo_offset[0],
+                    "offset": ultimo_offset[1],
+                    "merkle": arbol.estado()
+                }
+                if acumulador is not None:
+                    checkpoint["reporte"] = acumulador.estado()
+                guardar_checkpoint(ruta_checkpoint, checkpoint)
             return True
             
     except json.JSONDecodeError:
-        print("❌ Error: El archivo blockchain.json tiene formato inválido")
+        print(f"❌ Error: El archivo {ruta} tiene formato inválido")
         return False
     except Exception as e:
         print(f"❌ Error inesperado: {e}")
         return False
 
-def generar_reporte():
-    """Genera el archivo reporte.txt con estadísticas"""
-    
-    if not os.path.exists('blockchain.json'):
-        print("❌ Error: No se encontró el archivo blockchain.json")
-        return
+def ruta_reporte_por_defecto(ruta):
+    """reporte.txt junto a la cadena verificada (archivo o directorio de registro)"""
+    return os.path.join(os.path.dirname(os.path.normpath(ruta)) or ".", "reporte.txt")
+
+def generar_reporte(acumulador, cadena_integra, ruta='blockchain.json', destino=None):
+    """
+    Genera el reporte con las estadísticas acumuladas durante la
+    verificación (no vuelve a leer la cadena). Sin `destino` se escribe
+    reporte.txt junto a la cadena
+    """
+    destino = destino or ruta_reporte_por_defecto(ruta)
     
     try:
-        with open('blockchain.json', 'r') as f:
-            blockchain = json.load(f)
-        
-        # Contadores y acumuladores
-        total_bloques = len(blockchain)
-        bloques_con_alerta = 0
-        suma_frecuencia = 0
-        suma_presion = 0
-        suma_oxigeno = 0
-        
-        for bloque in blockchain:
-            # Contar alertas
-            if bloque.get('alerta', False):
-                bloques_con_alerta += 1
-            
-            # Acumular promedios
-            datos = bloque['datos']
-            suma_frecuencia += datos['frecuencia']['media']
-            suma_presion += datos['presion']['media']
-            suma_oxigeno += datos['oxigeno']['media']
+        total_bloques = acumulador.total_bloques
+        bloques_con_alerta = acumulador.bloques_con_alerta
+        porcentaje_alertas = bloques_con_alerta / total_bloques * 100 if total_bloques > 0 else 0
+        duracion = acumulador.duracion_segundos()
+        checkpoints = (f" (más {acumulador.checkpoints_merkle} checkpoints Merkle)"
+                       if acumulador.checkpoints_merkle else "")
         
-        # Calcular promedios generales
-        promedio_frecuencia = suma_frecuencia / total_bloques if total_bloques > 0 else 0
-        promedio_presion = suma_presion / total_bloques if total_bloques > 0 else 0
-        promedio_oxigeno = suma_oxigeno / total_bloques if total_bloques > 0 else 0
+        def rango(senal):
+            if acumulador.minimo[senal] is None:
+                return "sin datos"
+            return f"{acumulador.minimo[senal]:.2f} - {acumulador.maximo[senal]:.2f}"
         
         # Generar reporte
         fecha_reporte = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -126,28 +557,33 @@ def generar_reporte():
 ================================
 
 Fecha de generación: {fecha_reporte}
-Archivo analizado: blockchain.json
+Archivo analizado: {ruta}
 
 ESTADÍSTICAS GENERALES:
-- Cantidad total de bloques: {total_bloques}
+- Cantidad total de bloques: {total_bloques}{checkpoints}
 - Número de bloques con alertas: {bloques_con_alerta}
-- Porcentaje de bloques con alertas: {(bloques_con_alerta/total_bloques*100):.2f}%
+- Porcentaje de bloques con alertas: {porcentaje_alertas:.2f}%
 
 PROMEDIOS GENERALES:
-- Frecuencia cardíaca promedio: {promedio_frecuencia:.2f} bpm
-- Presión arterial promedio: {promedio_presion:.2f} mmHg
-- Oxígeno en sangre promedio: {promedio_oxigeno:.2f}%
+- Frecuencia cardíaca promedio: {acumulador.promedio('frecuencia'):.2f} bpm
+- Presión arterial promedio: {acumulador.promedio('presion'):.2f} mmHg
+- Oxígeno en sangre promedio: {acumulador.promedio('oxigeno'):.2f}%
+
+RANGOS DE LAS MEDIAS POR BLOQUE (mín - máx):
+- Frecuencia cardíaca: {rango('frecuencia')} bpm
+- Presión arterial: {rango('presion')} mmHg
+- Oxígeno en sangre: {rango('oxigeno')}%
 
 INFORMACIÓN ADICIONAL:
-- Duración total del monitoreo: {total_bloques} segundos ({total_bloques/60:.2f} minutos)
-- Integridad de la cadena: {"✅ Verificada" if verificar_integridad_silenciosa() else "❌ Comprometida"}
+- Duración total del monitoreo: {duracion:.0f} segundos ({duracion/60:.2f} minutos)
+- Integridad de la cadena: {"✅ Verificada" if cadena_integra else "❌ Comprometida"}
 """
         
         # Escribir archivo de reporte
-        with open('reporte.txt', 'w', encoding='utf-8') as f:
+        with open(destino, 'w', encoding='utf-8') as f:
             f.write(contenido_reporte)
         
-        print(f"📄 Reporte generado: reporte.txt")
+        print(f"📄 Reporte generado: {destino}")
         print("📊 Contenido del reporte:")
         print("-" * 40)
         print(contenido_reporte)
@@ -155,41 +591,59 @@ INFORMACIÓN ADICIONAL:
     except Exception as e:
         print(f"❌ Error al generar el reporte: {e}")
 
-def verificar_integridad_silenciosa():
-    """Verificación silenciosa para el reporte"""
-    try:
-        with open('blockchain.json', 'r') as f:
-            blockchain = json.load(f)
-        
-        for i, bloque in enumerate(blockchain):
-            hash_calculado = calcular_hash(
-                bloque['prev_hash'],
-                bloque['datos'],
-                bloque['timestamp']
-            )
-            
-            if hash_calculado != bloque['hash']:
-                return False
-            
-            if i > 0 and bloque['prev_hash'] != blockchain[i-1]['hash']:
-                return False
-        
-        return True
-    except:
-        return False
+def parsear_argumentos():
+    """Opciones de la verificación"""
+    parser = argparse.ArgumentParser(description="Verificador de integridad de la cadena de bloques")
+    parser.add_argument(
+        "-a", "--archivo",
+        default="blockchain.json",
+        help="Cadena a verificar (default: blockchain.json)"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=None,
+        help="Procesos para recalcular hashes (default: cpu_count(); 1 = sin pool)"
+    )
+    parser.add_argument(
+        "-l", "--lote",
+        type=int,
+        default=2000,
+        help="Bloques por lote enviado a cada proceso (default: 2000)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignorar el checkpoint y verificar la cadena completa desde el génesis"
+    )
+    parser.add_argument(
+        "-q", "--silencioso",
+        action="store_true",
+        help="Mostrar solo los bloques con problemas y el resumen"
+    )
+    parser.add_argument(
+        "-o", "--reporte",
+        default=None,
+        help="Archivo del reporte (default: reporte.txt junto a la cadena)"
+    )
+    return parser.parse_args()
 
 def main():
     """Función principal"""
+    args = parsear_argumentos()
+    
     print("🔐 VERIFICADOR DE CADENA DE BLOQUES")
     print("=" * 60)
     
-    # Verificar integridad de la cadena
-    cadena_integra = verificar_cadena()
+    # Verificar integridad y acumular el reporte en una sola pasada
+    acumulador = AcumuladorReporte()
+    cadena_integra = verificar_cadena(args.archivo, args.workers, args.lote, not args.silencioso,
+                                      completa=args.full, acumulador=acumulador)
     
     print("\n" + "=" * 60)
     
     # Generar reporte
-    generar_reporte()
+    generar_reporte(acumulador, cadena_integra, args.archivo, args.reporte)
     
     print("\n" + "=" * 60)
     print("✅ Tarea 3 completada exitosamente")
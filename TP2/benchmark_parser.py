@@ -0,0 +1,91 @@
+"""
+Benchmark del parseo de HTML: motor de una pasada (lxml) vs BeautifulSoup.
+
+Parsea cada página del corpus (tests/pages por defecto) con parse_html_full
+y con parse_html_soup, verifica que ambos den el mismo resultado y muestra
+el tiempo mediano por página y la aceleración.
+
+Uso:
+    python3 benchmark_parser.py
+    python3 benchmark_parser.py -r 50 --corpus /ruta/a/paginas --json resultados.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+from scraper.html_parser import parse_html_full, parse_html_soup
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "pages")
+BASE_URL = "https://example.com/corpus/"
+
+
+def time_parser(parser: Callable, content: bytes, repeat: int) -> float:
+    """Tiempo mediano (segundos) de `repeat` parseos de `content`."""
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(content, BASE_URL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_benchmark(paths: List[str], repeat: int) -> List[Dict[str, object]]:
+    results = []
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+
+        same = parse_html_full(content, BASE_URL) == parse_html_soup(content, BASE_URL)
+        soup_s = time_parser(parse_html_soup, content, repeat)
+        lxml_s = time_parser(parse_html_full, content, repeat)
+        results.append({
+            "page": os.path.basename(path),
+            "bytes": len(content),
+            "soup_ms": soup_s * 1000,
+            "lxml_ms": lxml_s * 1000,
+            "speedup": soup_s / lxml_s if lxml_s else float("inf"),
+            "same_result": same,
+        })
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de parse_html_full (lxml, una pasada) vs BeautifulSoup")
+    parser.add_argument("--corpus", default=CORPUS, help=f"Directorio con páginas .html (default: {CORPUS})")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="Repeticiones por página (default: 20)")
+    parser.add_argument("--json", dest="json_path", default=None, help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "*.html")))
+    if not paths:
+        print(f"❌ Error: no hay páginas .html en {args.corpus}")
+        return 1
+
+    results = run_benchmark(paths, args.repeat)
+
+    print(f"{'Página':<24}{'KB':>8}{'BeautifulSoup':>16}{'lxml 1 pasada':>16}{'Aceleración':>14}  Igual")
+    for r in results:
+        print(f"{r['page']:<24}{r['bytes'] / 1024:>8.1f}{r['soup_ms']:>13.2f} ms{r['lxml_ms']:>13.2f} ms"
+              f"{r['speedup']:>13.1f}x  {'sí' if r['same_result'] else 'NO'}")
+    total_soup = sum(r["soup_ms"] for r in results)
+    total_lxml = sum(r["lxml_ms"] for r in results)
+    print(f"{'Total':<24}{sum(r['bytes'] for r in results) / 1024:>8.1f}{total_soup:>13.2f} ms"
+          f"{total_lxml:>13.2f} ms{total_soup / total_lxml:>13.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"Resultados guardados en {args.json_path}")
+
+    # Código de salida distinto de 0 si algún resultado difiere entre implementaciones
+    return 0 if all(r["same_result"] for r in results) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,25 +2,162 @@
 
 import logging
 import asyncio
-from typing import Optional
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
 import aiohttp
 
+from scraper.extractor import sniff_encoding
+
 logger = logging.getLogger("scraper.async_http")
 
+# Tamaño máximo del cuerpo de una respuesta (más grande = error "too_large")
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Tipos de contenido aceptados (sin Content-Type también se acepta)
+DEFAULT_ALLOWED_TYPES: Tuple[str, ...] = ("text/html", "application/xhtml+xml")
+
+CHUNK_SIZE = 64 * 1024
+
 
-async def fetch_page(session: aiohttp.ClientSession, url: str) -> Optional[str]:
+async def fetch_stream(
+    session: aiohttp.ClientSession,
+    url: str,
+    parser_factory: Optional[Callable[[Optional[str]], object]] = None,
+    max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+    allowed_types: Optional[Sequence[str]] = DEFAULT_ALLOWED_TYPES,
+    stop_at: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+    headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, object]:
     """
-    Realiza un GET a `url` con timeout de 30 segundos usando la sesión proporcionada.
-    Devuelve el contenido (texto) en caso de éxito, o None si ocurre ClientError o TimeoutError.
+    GET a `url` leyendo el cuerpo por partes, a medida que llega.
+
+    - parser_factory(charset) crea un parser incremental (feed(bytes) y un
+      atributo `done`, como ExtractionEngine): cada parte se le pasa en
+      bytes apenas llega y el cuerpo no se guarda. Si el parser termina
+      antes (done, p. ej. head_only) se deja de leer la respuesta.
+      Sin parser_factory el cuerpo completo se devuelve en "body".
+    - max_bytes (0 = sin límite): si Content-Length o lo leído lo supera,
+      error "too_large" sin seguir descargando.
+    - allowed_types (None = cualquiera): Content-Type aceptados; otro tipo
+      devuelve error "unsupported_content_type" sin leer el cuerpo.
+    - stop_at (0 = sin límite): cantidad de bytes a partir de la cual se deja
+      de leer sin error; el resultado lleva "truncated": True.
+    - headers: encabezados extra del GET (p. ej. If-None-Match para una
+      revalidación); si la página responde 304 a un GET condicional se
+      devuelve {"status": 304} sin cuerpo ni parser. Un 304 sin encabezados
+      condicionales es un error "fetch_failed".
+
+    Devuelve {"status", "body", "parser", "charset", "content_type",
+    "content_length", "bytes_read", "truncated", "stopped_early", "etag",
+    "last_modified", "cache_control"} o {"error", "detail"} (error:
+    "fetch_failed", "timeout", "too_large" o "unsupported_content_type").
     """
     try:
         timeout = aiohttp.ClientTimeout(total=30)
-        async with session.get(url, timeout=timeout) as resp:
+        async with session.get(url, timeout=timeout, headers=headers) as resp:
             resp.raise_for_status()
-            return await resp.text()
+            if resp.status == 304:
+                if headers and ("If-None-Match" in headers or "If-Modified-Since" in headers):
+                    return {"status": 304}
+                logger.warning("fetch_stream: %s respondió 304 a un GET no condicional", url)
+                return {"error": "fetch_failed", "detail": "304 Not Modified sin GET condicional"}
+
+            content_type = resp.content_type if "Content-Type" in resp.headers else None
+            if allowed_types is not None and content_type is not None and content_type not in allowed_types:
+                logger.warning("fetch_stream: %s tiene Content-Type %s, no se lee", url, content_type)
+                return {"error": "unsupported_content_type", "detail": content_type}
+
+            content_length = resp.content_length
+            if max_bytes and content_length is not None and content_length > max_bytes:
+                logger.warning("fetch_stream: %s declara %d bytes (máximo %d)", url, content_length, max_bytes)
+                return {"error": "too_large", "detail": f"Content-Length {content_length} > {max_bytes}"}
+
+            parser = parser_factory(resp.charset) if parser_factory is not None else None
+            chunks = []
+            bytes_read = 0
+            truncated = stopped_early = False
+
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                cut = bool(stop_at) and bytes_read + len(chunk) >= stop_at
+                if cut:
+                    chunk = chunk[:stop_at - bytes_read]
+                bytes_read += len(chunk)
+                if max_bytes and bytes_read > max_bytes:
+                    logger.warning("fetch_stream: %s supera %d bytes, se corta la descarga", url, max_bytes)
+                    return {"error": "too_large", "detail": f"más de {max_bytes} bytes"}
+
+                if parser is not None:
+                    parser.feed(chunk)
+                    if parser.done:
+                        stopped_early = True
+                        break
+                else:
+                    chunks.append(chunk)
+                if cut:
+                    truncated = True
+                    break
+
+            # Si la respuesta terminó justo en stop_at no hubo nada que cortar
+            if truncated and content_length is not None and content_length <= bytes_read:
+                truncated = False
+
+            return {
+                "status": resp.status,
+                "body": b"".join(chunks) if parser is None else None,
+                "parser": parser,
+                "charset": resp.charset,
+                "content_type": content_type,
+                "content_length": content_length,
+                "bytes_read": bytes_read,
+                "truncated": truncated,
+                "stopped_early": stopped_early,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "cache_control": resp.headers.get("Cache-Control"),
+            }
     except aiohttp.ClientError as e:
         logger.exception("ClientError al obtener %s: %s", url, e)
+        return {"error": "fetch_failed", "detail": str(e)}
     except asyncio.TimeoutError:
         logger.warning("Timeout al obtener %s", url)
-    return None
+        return {"error": "timeout", "detail": "timeout de 30 s"}
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str,
+                     max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                     allowed_types: Optional[Sequence[str]] = DEFAULT_ALLOWED_TYPES) -> Optional[str]:
+    """
+    Realiza un GET a `url` con timeout de 30 segundos usando la sesión proporcionada.
+    Devuelve el contenido (texto) en caso de éxito, o None si ocurre ClientError o TimeoutError,
+    si el cuerpo supera max_bytes o si el Content-Type no está en allowed_types.
+
+    El texto se decodifica con el charset del Content-Type o, si no lo declara,
+    con el <meta charset> del documento (UTF-8 por defecto), sin la detección
+    de resp.text() sobre el cuerpo completo.
+    """
+    fetched = await fetch_stream(session, url, max_bytes=max_bytes, allowed_types=allowed_types)
+    if "error" in fetched:
+        return None
+    body = fetched["body"]
+    encoding = fetched["charset"] or sniff_encoding(body)
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+async def fetch_page_bytes(session: aiohttp.ClientSession, url: str,
+                           max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                           allowed_types: Optional[Sequence[str]] = DEFAULT_ALLOWED_TYPES,
+                           ) -> Optional[Tuple[bytes, Optional[str]]]:
+    """
+    Igual que fetch_page pero sin decodificar: devuelve (cuerpo en bytes, charset
+    del Content-Type o None), o None si ocurre ClientError o TimeoutError.
+    Los bytes pasan a otro proceso sin copias extra de texto y lxml detecta la
+    codificación (charset o <meta charset>) al parsear.
+    """
+    fetched = await fetch_stream(session, url, max_bytes=max_bytes, allowed_types=allowed_types)
+    if "error" in fetched:
+        return None
+    return fetched["body"], fetched["charset"]
@@ -0,0 +1,153 @@
+"""Caché de respuestas de /scrape por URL normalizada (TTL + LRU)"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger("scraper.cache")
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Forma canónica de una URL para usarla como clave: esquema y host en
+    minúsculas, sin puerto por defecto, path vacío -> "/", parámetros de la
+    query ordenados y sin fragmento (#...), que no llega al servidor.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username or parts.password:
+        userinfo = parts.username or ""
+        if parts.password:
+            userinfo += f":{parts.password}"
+        host = f"{userinfo}@{host}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CacheEntry:
+    """
+    Respuesta ya serializada (body) con los validadores de la página
+    (ETag / Last-Modified) para revalidarla cuando vence.
+    """
+
+    __slots__ = ("body", "etag", "last_modified", "expires")
+
+    def __init__(self, body: bytes, etag: Optional[str], last_modified: Optional[str], expires: float) -> None:
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (time.monotonic() if now is None else now) < self.expires
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Encabezados para un GET condicional (vacío si la página no dio validadores)."""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Caché LRU con vencimiento: cada entrada vale `ttl` segundos y, si se
+    superan max_entries o max_bytes (tamaño de las respuestas serializadas),
+    se descartan las usadas hace más tiempo. Las entradas vencidas no se
+    borran: se revalidan con la página (GET condicional) y, si no cambió
+    (304), se renuevan sin volver a parsear ni procesar.
+
+    Un solo event loop la usa (un caché por worker), así que no necesita locks.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.bytes = 0
+        self.counters: Dict[str, int] = {
+            "hits": 0,            # entrada vigente, sin tocar la red
+            "misses": 0,          # sin entrada (o vencida sin validadores): fetch + parseo completos
+            "revalidations": 0,   # entrada vencida y la página respondió 304: se reutiliza
+            "revalidation_misses": 0,  # entrada vencida y la página cambió (200)
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Entrada de `key` (vigente o vencida) o None; la marca como usada recientemente."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> Optional[CacheEntry]:
+        """Guarda una respuesta serializada; None si sola ya supera max_bytes."""
+        if self.max_bytes and len(body) > self.max_bytes:
+            logger.info("ResponseCache: respuesta de %d bytes no entra en el caché", len(body))
+            self.discard(key)
+            return None
+
+        self.discard(key)
+        entry = CacheEntry(body, etag, last_modified, time.monotonic() + self.ttl)
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self.counters["stores"] += 1
+
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or (self.max_bytes and self.bytes > self.max_bytes)):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.counters["evictions"] += 1
+        return entry
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """La página no cambió (304): la entrada vuelve a valer `ttl` segundos."""
+        entry.expires = time.monotonic() + self.ttl
+
+    def discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def count(self, counter: str) -> None:
+        self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["revalidations"] \
+            + self.counters["revalidation_misses"]
+        served = self.counters["hits"] + self.counters["revalidations"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hit_ratio": round(served / lookups, 4) if lookups else None,
+        }
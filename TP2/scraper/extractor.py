@@ -0,0 +1,315 @@
+"""Extracción de datos de HTML en una sola pasada con lxml"""
+
+import codecs
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+from urllib.parse import urljoin
+
+from lxml import etree
+
+logger = logging.getLogger("scraper.extractor")
+
+# <meta charset="..."> o <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+# Bytes que se juntan antes de crear el parser, para encontrar el <meta charset>
+SNIFF_BYTES = 4096
+
+
+class Extractor(ABC):
+    """
+    Extractor por etiqueta: el motor llama a handle(element) al cerrarse cada
+    etiqueta de `tags` (con sus atributos y su texto completos) y al final
+    combina result() de todos los extractores en un solo diccionario.
+
+    Para agregar un campo alcanza con una subclase que declare sus `tags` y
+    pasarla en `extractors` (o registrarla con register_extractor): no agrega
+    otra pasada sobre el documento.
+    """
+
+    tags: Tuple[str, ...] = ()
+
+    def __init__(self, base_url: str = "") -> None:
+        self.base_url = base_url
+
+    @abstractmethod
+    def handle(self, element: etree._Element) -> None:
+        ...
+
+    @abstractmethod
+    def result(self) -> Dict[str, object]:
+        ...
+
+
+class TitleExtractor(Extractor):
+    """title: texto del primer <title> (sin espacios en los extremos) o None"""
+
+    tags = ("title",)
+
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(base_url)
+        self.title: Optional[str] = None
+        self._seen = False
+
+    def handle(self, element: etree._Element) -> None:
+        if self._seen:
+            return
+        self._seen = True
+        # Igual que soup.title.string: solo si el <title> tiene únicamente texto
+        if element.text and len(element) == 0:
+            self.title = element.text.strip()
+
+    def result(self) -> Dict[str, object]:
+        return {"title": self.title}
+
+
+class LinkExtractor(Extractor):
+    """links: href absolutos de todos los <a> con href no vacío"""
+
+    tags = ("a",)
+
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(base_url)
+        self.links: List[str] = []
+
+    def handle(self, element: etree._Element) -> None:
+        href = element.get("href")
+        if href:
+            self.links.append(urljoin(self.base_url, href))
+
+    def result(self) -> Dict[str, object]:
+        return {"links": self.links}
+
+
+class ImageExtractor(Extractor):
+    """images_count: total de <img>; image_urls: src absolutos de las primeras 5 con src"""
+
+    tags = ("img",)
+    max_urls = 5
+
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(base_url)
+        self.count = 0
+        self.urls: List[str] = []
+
+    def handle(self, element: etree._Element) -> None:
+        self.count += 1
+        if len(self.urls) < self.max_urls:
+            src = element.get("src")
+            if src:
+                self.urls.append(urljoin(self.base_url, src))
+
+    def result(self) -> Dict[str, object]:
+        return {"images_count": self.count, "image_urls": self.urls}
+
+
+class MetaExtractor(Extractor):
+    """
+    meta_tags: description y keywords (del primer <meta name=...> de cada uno)
+    y cada propiedad Open Graph como clave plana "og:<prop>", igual que
+    extract_metadata.
+    """
+
+    tags = ("meta",)
+
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(base_url)
+        self.named: Dict[str, Optional[str]] = {}
+        self.og: Dict[str, str] = {}
+
+    def handle(self, element: etree._Element) -> None:
+        name = element.get("name")
+        content = element.get("content")
+        if name in ("description", "keywords") and name not in self.named:
+            self.named[name] = content.strip() if content else None
+
+        prop = element.get("property") or name
+        if prop:
+            prop = prop.strip()
+            if prop.lower().startswith("og:") and content:
+                self.og[prop[3:]] = content.strip()
+
+    def result(self) -> Dict[str, object]:
+        meta: Dict[str, Optional[str]] = {
+            "description": self.named.get("description"),
+            "keywords": self.named.get("keywords"),
+        }
+        for key, value in self.og.items():
+            meta[f"og:{key}"] = value
+        return {"meta_tags": meta}
+
+
+class StructureExtractor(Extractor):
+    """structure: cantidad de encabezados h1..h6"""
+
+    tags = tuple(f"h{i}" for i in range(1, 7))
+
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(base_url)
+        self.counts: Dict[str, int] = {tag: 0 for tag in self.tags}
+
+    def handle(self, element: etree._Element) -> None:
+        self.counts[element.tag] += 1
+
+    def result(self) -> Dict[str, object]:
+        return {"structure": self.counts}
+
+
+# Extractores por defecto, en el orden de las claves de parse_html_full
+EXTRACTORS: List[Type[Extractor]] = [
+    TitleExtractor,
+    LinkExtractor,
+    ImageExtractor,
+    MetaExtractor,
+    StructureExtractor,
+]
+
+
+def register_extractor(extractor: Type[Extractor]) -> Type[Extractor]:
+    """Agrega un extractor a los de por defecto (se puede usar como decorador)."""
+    if extractor not in EXTRACTORS:
+        EXTRACTORS.append(extractor)
+    return extractor
+
+
+def sniff_encoding(prefix: bytes, default: str = "utf-8") -> str:
+    """
+    Codificación de un documento según su BOM o su <meta charset> (en los
+    primeros bytes). libxml2 supone ISO-8859-1 si no la encuentra; acá el
+    default es UTF-8, como hace BeautifulSoup.
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(prefix[:SNIFF_BYTES])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return default
+
+
+class ExtractionEngine:
+    """
+    Recorre el documento una sola vez: el parser incremental de lxml emite
+    un evento al cerrarse cada elemento y el motor lo despacha a los
+    extractores registrados para esa etiqueta. Los elementos ya procesados
+    se descartan, así la memoria no crece con el tamaño del documento.
+
+    Se alimenta con feed() (bytes o texto, de una vez o por partes) y
+    close() devuelve el diccionario combinado.
+
+    Con head_only=True el motor termina (done = True) al cerrarse el <head>
+    o al empezar el <body>: title y meta tags ya están completos y el resto
+    del documento no hace falta. Los feed() siguientes se ignoran.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "",
+        encoding: Optional[str] = None,
+        extractors: Optional[Sequence[Type[Extractor]]] = None,
+        head_only: bool = False,
+    ) -> None:
+        self.base_url = base_url
+        self.encoding = encoding
+        self.head_only = head_only
+        self.done = False
+        self._pending = b""
+        self.extractors = [cls(base_url) for cls in (EXTRACTORS if extractors is None else extractors)]
+        self._handlers: Dict[str, List[Callable[[etree._Element], None]]] = {}
+        for extractor in self.extractors:
+            for tag in extractor.tags:
+                self._handlers.setdefault(tag, []).append(extractor.handle)
+        self._parser: Optional[etree.HTMLPullParser] = None
+
+    def _create_parser(self, data: Union[str, bytes]) -> etree.HTMLPullParser:
+        encoding = self.encoding
+        if isinstance(data, bytes) and not encoding:
+            encoding = sniff_encoding(data)
+        # El evento "start" solo hace falta para cortar al empezar el <body>
+        events = ("start", "end") if self.head_only else ("end",)
+        return etree.HTMLPullParser(events=events, encoding=encoding if isinstance(data, bytes) else None)
+
+    def feed(self, data: Union[str, bytes]) -> None:
+        if not data or self.done:
+            return
+        if self._parser is None:
+            if isinstance(data, bytes) and not self.encoding and len(self._pending) + len(data) < SNIFF_BYTES:
+                # Primeros bytes de un stream: esperar a tener suficientes para detectar el charset
+                self._pending += data
+                return
+            if self._pending:
+                data, self._pending = self._pending + data, b""
+            self._parser = self._create_parser(data)
+        self._parser.feed(data)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        handlers = self._handlers
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if element.tag == "body":
+                    self.done = True
+                    break
+                continue
+            for handle in handlers.get(element.tag, ()):
+                handle(element)
+            if self.head_only and element.tag == "head":
+                self.done = True
+                break
+            # Liberar lo ya procesado: los hermanos anteriores (con sus subárboles)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    def close(self) -> Dict[str, object]:
+        if self._parser is None and self._pending:
+            self._parser = self._create_parser(self._pending)
+            self._parser.feed(self._pending)
+            self._pending = b""
+        if self._parser is not None and not self.done:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError as e:
+                # Documento vacío o sin elementos: quedan los valores iniciales
+                logger.debug("ExtractionEngine: %s", e)
+            self._dispatch()
+        return self.result()
+
+    def result(self) -> Dict[str, object]:
+        data: Dict[str, object] = {}
+        for extractor in self.extractors:
+            data.update(extractor.result())
+        return data
+
+
+def extract_page(
+    html_content: Union[str, bytes],
+    base_url: str = "",
+    encoding: Optional[str] = None,
+    extractors: Optional[Sequence[Type[Extractor]]] = None,
+) -> Dict[str, object]:
+    """
+    Extrae de un documento completo los campos de `extractors` (por defecto
+    los de parse_html_full: title, links, images_count, image_urls,
+    meta_tags y structure) en una sola pasada.
+    """
+    engine = ExtractionEngine(base_url, encoding, extractors)
+    engine.feed(html_content)
+    return engine.close()
+
+
+def extract_head(html_content: Union[str, bytes], base_url: str = "", encoding: Optional[str] = None) -> Dict[str, object]:
+    """
+    Como extract_page pero solo hasta el final del <head> (title y meta
+    tags completos; links, imágenes y encabezados quedan vacíos).
+    """
+    engine = ExtractionEngine(base_url, encoding, head_only=True)
+    engine.feed(html_content)
+    return engine.close()
@@ -1,10 +1,11 @@
-"""Módulo para parsear HTML con BeautifulSoup"""
+"""Módulo para parsear HTML (lxml en una sola pasada, BeautifulSoup como referencia)"""
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
+from scraper.extractor import extract_page
 from scraper.metadata_extractor import extract_metadata
 
 logger = logging.getLogger("scraper.html_parser")
@@ -39,7 +40,8 @@ def parse_html_basic(html_content: str, base_url: str = "") -> Dict[str, object]
         return {"title": None, "links": [], "images_count": 0}
 
 
-def parse_html_full(html_content: str, base_url: str = "") -> Dict[str, object]:
+def parse_html_full(html_content: Union[str, bytes], base_url: str = "",
+                    encoding: Optional[str] = None) -> Dict[str, object]:
     """
     Parsea HTML y devuelve un diccionario con:
     - title
@@ -48,10 +50,44 @@ def parse_html_full(html_content: str, base_url: str = "") -> Dict[str, object]:
     - image_urls: lista de src absolutos de las primeras 5 imágenes
     - meta_tags
     - structure
+
+    html_content puede ser texto o los bytes de la respuesta; en ese caso
+    `encoding` (charset del Content-Type) tiene prioridad sobre la detección.
+
+    Usa el motor de una sola pasada de scraper.extractor; parse_html_soup es
+    la versión con BeautifulSoup (misma salida, varias pasadas sobre el árbol).
+    """
+    try:
+        return extract_page(html_content, base_url, encoding)
+    except Exception as e:
+        logger.exception("Error al parsear HTML completo: %s", e)
+        return _empty_full_result()
+
+
+def _empty_full_result() -> Dict[str, object]:
+    return {
+        "title": None,
+        "links": [],
+        "images_count": 0,
+        "image_urls": [],
+        "meta_tags": {"description": None, "keywords": None, "og": {}},
+        "structure": {f"h{i}": 0 for i in range(1, 7)},
+    }
+
+
+def parse_html_soup(html_content: Union[str, bytes], base_url: str = "",
+                    encoding: Optional[str] = None) -> Dict[str, object]:
+    """
+    Implementación original de parse_html_full con BeautifulSoup: un
+    find_all por cada tipo de etiqueta. Se mantiene como referencia para
+    los tests y el benchmark (benchmark_parser.py).
     """
     try:
         #  usar lxml
-        soup = BeautifulSoup(html_content, "lxml")
+        if isinstance(html_content, bytes) and encoding:
+            soup = BeautifulSoup(html_content, "lxml", from_encoding=encoding)
+        else:
+            soup = BeautifulSoup(html_content, "lxml")
 
         title: Optional[str] = None
         if soup.title and soup.title.string:
@@ -84,15 +120,8 @@ def parse_html_full(html_content: str, base_url: str = "") -> Dict[str, object]:
             "structure": structure,
         }
     except Exception as e:
-        logger.exception("Error al parsear HTML completo: %s", e)
-        return {
-            "title": None,
-            "links": [],
-            "images_count": 0,
-            "image_urls": [],
-            "meta_tags": {"description": None, "keywords": None, "og": {}},
-            "structure": {f"h{i}": 0 for i in range(1, 7)},
-        }
+        logger.exception("Error al parsear HTML con BeautifulSoup: %s", e)
+        return _empty_full_result()
 
 
 def extract_structure(soup: BeautifulSoup) -> Dict[str, int]:
@@ -0,0 +1,92 @@
+"""Parseo de HTML fuera del event loop (pool de procesos o de hilos)"""
+
+import asyncio
+import logging
+import os
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from scraper.html_parser import parse_html_full
+
+logger = logging.getLogger("scraper.parse_executor")
+
+# Tipos de executor soportados: "process" (default, paralelismo real con varios
+# núcleos) o "thread" (sin costo de IPC, pero comparte el GIL con el event loop)
+EXECUTOR_KINDS = ("process", "thread")
+
+# Documentos más grandes se parsean solo hasta este tamaño (resultado degradado)
+DEFAULT_MAX_PARSE_BYTES = 5 * 1024 * 1024
+
+
+def default_workers(servers: int = 1) -> int:
+    """
+    Tamaño por defecto del pool cuando `servers` procesos del servidor
+    (cada uno con su propio pool) comparten las CPUs: cpu_count // servers,
+    como mínimo 1.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, servers))
+
+
+def create_executor(kind: str = "process", workers: Optional[int] = None, servers: int = 1) -> Executor:
+    """
+    Crea el executor donde corre parse_html_full. workers=None reparte las
+    CPUs disponibles entre los `servers` procesos del servidor (ver
+    default_workers).
+    """
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"executor desconocido: {kind!r} (opciones: {', '.join(EXECUTOR_KINDS)})")
+    workers = workers or default_workers(servers)
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_process)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parser")
+
+
+def _init_parse_process() -> None:
+    """
+    Los procesos del pool no atienden señales: Ctrl+C llega a todo el grupo de
+    procesos y el cierre lo maneja el servidor, que apaga el pool.
+    """
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _parse_document(content: bytes, base_url: str, encoding: Optional[str]) -> Dict[str, object]:
+    """Función que corre en el worker del pool (debe ser picklable: nivel de módulo)."""
+    return parse_html_full(content, base_url, encoding)
+
+
+async def parse_in_executor(
+    executor: Executor,
+    content: bytes,
+    base_url: str = "",
+    encoding: Optional[str] = None,
+    max_bytes: int = DEFAULT_MAX_PARSE_BYTES,
+) -> Dict[str, object]:
+    """
+    Parsea `content` (bytes de la respuesta) en `executor` sin bloquear el event loop.
+
+    Si el documento supera max_bytes (0 = sin límite) solo se envía al pool el
+    prefijo de max_bytes: título, meta tags y el principio del <body> salen
+    igual, pero links, imágenes y encabezados quedan incompletos. El resultado
+    lo indica con "truncated": True y "original_size".
+
+    Si un proceso del pool muere, propaga BrokenProcessPool: quien creó el
+    executor debe reemplazarlo.
+    """
+    original_size = len(content)
+    truncated = bool(max_bytes) and original_size > max_bytes
+    if truncated:
+        logger.warning("parse_in_executor: %s ocupa %d bytes, se parsean solo los primeros %d",
+                       base_url, original_size, max_bytes)
+        content = content[:max_bytes]
+
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(executor, _parse_document, content, base_url, encoding)
+
+    if truncated:
+        result["truncated"] = True
+        result["original_size"] = original_size
+    return result
+
@@ -4,16 +4,38 @@ import asyncio
 import aiohttp
 import struct
 import argparse
-from scraper.async_http import fetch_page
-from scraper.html_parser import parse_html_full
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+from scraper.async_http import DEFAULT_ALLOWED_TYPES, DEFAULT_MAX_BODY_BYTES, fetch_stream
+from scraper.cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, CacheEntry, ResponseCache, normalize_url
+from scraper.extractor import ExtractionEngine
+from scraper.parse_executor import DEFAULT_MAX_PARSE_BYTES, EXECUTOR_KINDS, create_executor, default_workers, parse_in_executor
 from common.protocol import pack_message
-from common.serialization import deserialize_data
+from common.serialization import deserialize_data, serialize_data
 import datetime
 
+# Dónde se parsea el HTML: en un pool (EXECUTOR_KINDS) o "stream": en el event
+# loop, por partes a medida que llega la respuesta
+PARSER_MODES = EXECUTOR_KINDS + ("stream",)
+
+# Mensaje de error de /scrape para cada error de fetch_stream
+FETCH_ERRORS = {
+    "fetch_failed": "failed to fetch url",
+    "timeout": "failed to fetch url",
+    "too_large": "response too large",
+    "unsupported_content_type": "unsupported content type",
+}
+
 # Logging setup (to console and file)
 logger = logging.getLogger("server_a")
 logger.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+formatter = logging.Formatter("%(asctime)s %(levelname)s [%(process)d]: %(message)s", "%Y-%m-%d %H:%M:%S")
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
@@ -26,17 +48,28 @@ if not logger.handlers:
 
 
 async def handle_health(request: web.Request) -> web.Response:
-    """GET /health -> {"status": "ok", "server": "A - Asyncio"}"""
+    """GET /health -> {"status": "ok", "server": "A - Asyncio", "pid": <pid del worker>}"""
     logger.info("Received /health request")
-    return web.json_response({"status": "ok", "server": "A - Asyncio"})
+    return web.json_response({"status": "ok", "server": "A - Asyncio", "pid": os.getpid()})
 
 
 async def handle_scrape(request: web.Request) -> web.Response:
     """
-    GET /scrape?url=<...>
+    GET /scrape?url=<...>[&head_only=1]
     Lee el parámetro 'url' de la query string, usa app['http_session'] para obtener la página,
     parsea el HTML con parse_html_full y devuelve el diccionario resultante como JSON.
     Además envía el resultado al servidor de procesamiento B y combina ambas respuestas.
+
+    El parseo corre en app['parse_executor'] (pool de procesos o de hilos), así
+    una página grande no bloquea al resto de las peticiones. En modo "stream"
+    (sin executor) y con head_only=1 la página se parsea por partes a medida
+    que llega; head_only deja de descargar al terminar el <head> y devuelve
+    solo title y meta_tags ("head_only": true).
+
+    Con app['cache'] las respuestas completas se guardan por URL normalizada:
+    mientras valen se devuelven sin tocar la red y, vencidas, se revalidan
+    con un GET condicional (304 = se reutilizan). El encabezado X-Cache
+    indica HIT, REVALIDATED o MISS.
     """
     url = request.query.get("url")
     if not url:
@@ -53,15 +86,73 @@ async def handle_scrape(request: web.Request) -> web.Response:
         logger.error("handle_scrape: http_session no disponible")
         return web.json_response({"error": "server not ready"}, status=503)
 
-    # Obtener el contenido de la página
-    content = await fetch_page(session, url)
-    if content is None:
-        logger.warning("handle_scrape: fallo al obtener el contenido de %s", url)
-        return web.json_response({"error": "failed to fetch url"}, status=502)
+    head_only = request.query.get("head_only", "").lower() in ("1", "true", "yes")
+
+    cache = request.app["cache"]
+    cache_key = (normalize_url(url), head_only)
+    entry = cache.get(cache_key) if cache is not None else None
+    if entry is not None and entry.is_fresh():
+        cache.count("hits")
+        logger.info("handle_scrape: %s servido desde el caché", url)
+        return _cached_response(entry, "HIT")
+    conditional = entry.conditional_headers() if entry is not None else {}
+
+    executor = request.app["parse_executor"]
+    parser_factory = None
+    if head_only or executor is None:
+        # Parser incremental (usar base_url para resolver relativos): recibe cada parte en bytes al llegar
+        def parser_factory(charset: Optional[str]) -> ExtractionEngine:
+            return ExtractionEngine(url, charset, head_only=head_only)
+
+    # Obtener el contenido de la página (bytes, sin decodificar en el event loop);
+    # a partir de max_parse_bytes se deja de descargar y el resultado es parcial
+    fetched = await fetch_stream(
+        session,
+        url,
+        parser_factory,
+        max_bytes=request.app["max_body_bytes"],
+        allowed_types=request.app["allowed_types"],
+        stop_at=request.app["max_parse_bytes"],
+        headers=conditional or None,
+    )
+    if fetched.get("status") == 304:
+        # Solo se envían encabezados condicionales con una entrada (aunque haya
+        # salido del caché durante el await, sigue referenciada acá).
+        # La página no cambió: mismo resultado, sin parsear ni llamar al servidor B
+        if cache.get(cache_key) is entry:
+            cache.refresh(entry)
+        cache.count("revalidations")
+        logger.info("handle_scrape: %s revalidado (304), se reutiliza el caché", url)
+        return _cached_response(entry, "REVALIDATED")
+    if "error" in fetched:
+        logger.warning("handle_scrape: fallo al obtener el contenido de %s: %s", url, fetched["error"])
+        return web.json_response(
+            {"error": FETCH_ERRORS.get(fetched["error"], "failed to fetch url"), "detail": fetched["detail"]},
+            status=502,
+        )
+
+    if cache is not None:
+        cache.count("revalidation_misses" if conditional else "misses")
 
-    # Parsear el HTML (usar base_url para resolver relativos)
     # NOTA: Esta es la clave "scraping_data" del JSON final
-    scraping_data = parse_html_full(content, url)
+    if parser_factory is not None:
+        scraping_data = fetched["parser"].close()
+        if head_only:
+            scraping_data["head_only"] = True
+    else:
+        # Parsear el HTML en el executor (ya viene cortado en max_parse_bytes)
+        try:
+            scraping_data = await parse_in_executor(executor, fetched["body"], url, fetched["charset"], max_bytes=0)
+        except BrokenProcessPool as e:
+            # Un proceso del pool murió (p. ej. sin memoria): reemplazar el pool para las próximas peticiones
+            logger.exception("handle_scrape: pool de parseo roto, se recrea: %s", e)
+            _replace_parse_executor(request.app, executor)
+            return web.json_response({"error": "parse_failed", "detail": str(e)}, status=500)
+
+    if fetched["truncated"]:
+        logger.warning("handle_scrape: %s supera %d bytes, resultado parcial", url, request.app["max_parse_bytes"])
+        scraping_data["truncated"] = True
+        scraping_data["original_size"] = fetched["content_length"]
 
     # Enviar resultado al servidor de procesamiento B y combinar respuestas
     processing_data = {}
@@ -81,7 +172,25 @@ async def handle_scrape(request: web.Request) -> web.Response:
         "scraping_data": scraping_data,
         "processing_data": processing_data,
     }
-    return web.json_response(resp)
+    body = serialize_data(resp)
+
+    # Solo se guardan resultados completos (con partial_success se reintenta el servidor B)
+    if cache is not None and resp["status"] == "success" and "no-store" not in (fetched["cache_control"] or ""):
+        cache.put(cache_key, body, fetched["etag"], fetched["last_modified"])
+    headers = {"X-Cache": "MISS"} if cache is not None else None
+    return web.Response(body=body, content_type="application/json", charset="utf-8", headers=headers)
+
+
+def _cached_response(entry: CacheEntry, status: str) -> web.Response:
+    return web.Response(body=entry.body, content_type="application/json", charset="utf-8",
+                        headers={"X-Cache": status})
+
+
+async def handle_cache_stats(request: web.Request) -> web.Response:
+    """GET /cache/stats -> contadores del caché de este worker (hits, misses, revalidations, ...)"""
+    cache = request.app["cache"]
+    stats = cache.stats() if cache is not None else {}
+    return web.json_response({"pid": os.getpid(), "enabled": cache is not None, **stats})
 
 
 async def call_processing_server(data_to_send: dict, host: str = "127.0.0.1", port: int = 9090) -> dict:
@@ -126,9 +235,26 @@ async def call_processing_server(data_to_send: dict, host: str = "127.0.0.1", po
             pass
 
 
+def _replace_parse_executor(app: web.Application, failed: Executor) -> None:
+    """
+    Reemplaza el pool que falló. Si otra petición ya lo reemplazó (varias
+    fallan a la vez con el mismo pool roto), no toca el nuevo.
+    """
+    if app.get("parse_executor") is not failed:
+        return
+    failed.shutdown(wait=False)
+    app["parse_executor"] = create_executor(app["parse_executor_kind"], app["parse_workers"], app["parse_servers"])
+
+
 async def on_startup(app: web.Application) -> None:
     logger.info("on_startup: creando aiohttp ClientSession")
     app["http_session"] = aiohttp.ClientSession()
+    if app["parse_executor_kind"] not in EXECUTOR_KINDS:
+        app["parse_executor"] = None  # "stream": se parsea en el event loop
+        return
+    logger.info("on_startup: creando executor de parseo (%s, workers=%d)",
+                app["parse_executor_kind"], app["parse_workers"] or default_workers(app["parse_servers"]))
+    app["parse_executor"] = create_executor(app["parse_executor_kind"], app["parse_workers"], app["parse_servers"])
 
 
 async def on_cleanup(app: web.Application) -> None:
@@ -137,49 +263,228 @@ async def on_cleanup(app: web.Application) -> None:
         logger.info("on_cleanup: cerrando aiohttp ClientSession")
         await session.close()
         app.pop("http_session", None)
+    executor = app.pop("parse_executor", None)
+    if executor is not None:
+        logger.info("on_cleanup: cerrando executor de parseo")
+        executor.shutdown(wait=True)
 
 
-def create_app() -> web.Application:
+def create_app(parse_executor: str = "process", parse_workers: Optional[int] = None, parse_servers: int = 1,
+               max_parse_bytes: int = DEFAULT_MAX_PARSE_BYTES, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+               allowed_types: Optional[tuple] = DEFAULT_ALLOWED_TYPES, cache_ttl: float = DEFAULT_TTL,
+               cache_max_entries: int = DEFAULT_MAX_ENTRIES, cache_max_bytes: int = DEFAULT_MAX_BYTES) -> web.Application:
+    """
+    parse_executor: "process" (default), "thread" o "stream"; parse_workers:
+    tamaño del pool (None = CPUs // parse_servers, con parse_servers la
+    cantidad de workers del servidor, cada uno con su pool);
+    max_parse_bytes: tamaño a partir del cual el resultado es degradado (solo se descarga y parsea ese prefijo; 0 = sin
+    límite); max_body_bytes: páginas que declaran un Content-Length mayor se
+    rechazan; allowed_types: Content-Type aceptados (None = cualquiera);
+    cache_ttl (0 = sin caché), cache_max_entries y cache_max_bytes: caché de
+    respuestas de /scrape.
+    """
     app = web.Application()
+    app["parse_executor_kind"] = parse_executor
+    app["parse_workers"] = parse_workers
+    app["parse_servers"] = parse_servers
+    app["max_parse_bytes"] = max_parse_bytes
+    app["max_body_bytes"] = max_body_bytes
+    app["allowed_types"] = allowed_types
+    app["cache"] = ResponseCache(cache_ttl, cache_max_entries, cache_max_bytes) if cache_ttl > 0 else None
     app.router.add_get("/health", handle_health)
     app.router.add_get("/scrape", handle_scrape)
+    app.router.add_get("/cache/stats", handle_cache_stats)
     app.on_startup.append(on_startup)
     app.on_cleanup.append(on_cleanup)
     return app
 
 
-async def _run_app(host: str = "::", port: int = 8080) -> None:
-    app = create_app()
+async def _run_app(host: str = "::", port: int = 8080, sock: Optional[socket.socket] = None,
+                   reuse_port: bool = False, app_options: Optional[dict] = None) -> None:
+    """
+    Sirve la app en host:port, o en `sock` si se recibe un socket ya
+    enlazado (heredado del supervisor). Con reuse_port, el socket propio se
+    abre con SO_REUSEPORT para compartir el puerto con los otros workers.
+    Termina ordenadamente con SIGTERM: deja de aceptar conexiones, espera
+    las peticiones en curso y cierra la ClientSession (on_cleanup).
+    app_options se pasan a create_app.
+    """
+    app = create_app(**(app_options or {}))
     runner = web.AppRunner(app)
     await runner.setup()
 
-    # Crear TCPSite usando los parámetros host/port recibidos
-    site = web.TCPSite(runner, host, port)
+    if sock is not None:
+        site = web.SockSite(runner, sock)
+        await site.start()
+        logger.info("Servidor A escuchando en %s:%d (socket heredado)", host, port)
+    else:
+        # Crear TCPSite usando los parámetros host/port recibidos
+        site = web.TCPSite(runner, host, port, reuse_port=reuse_port or None)
 
+        try:
+            await site.start()
+            logger.info("Servidor A escuchando en %s:%d", host, port)
+            print(f"🚀 Servidor A (Asyncio) iniciando en http://{host}:{port}")
+        except Exception as e:
+            logger.exception("No se pudo iniciar TCPSite en %s:%d -> %s", host, port, e)
+            # Si el host es '::' intentamos enlazar también en 0.0.0.0 por compatibilidad
+            if host == "::":
+                try:
+                    site4 = web.TCPSite(runner, "0.0.0.0", port, reuse_port=reuse_port or None)
+                    await site4.start()
+                    logger.info("Servidor A escuchando en 0.0.0.0:%d como fallback", port)
+                    print(f"🚀 Servidor A (Asyncio) iniciando en http://0.0.0.0:{port}")
+                except Exception as e2:
+                    logger.exception("Fallback IPv4 falló: %s", e2)
+                    raise
+
+    # Mantener el servidor en ejecución hasta interrupción (Ctrl+C o SIGTERM)
+    stop = asyncio.Event()
     try:
-        await site.start()
-        logger.info("Servidor A escuchando en %s:%d", host, port)
-        print(f"🚀 Servidor A (Asyncio) iniciando en http://{host}:{port}")
-    except Exception as e:
-        logger.exception("No se pudo iniciar TCPSite en %s:%d -> %s", host, port, e)
-        # Si el host es '::' intentamos enlazar también en 0.0.0.0 por compatibilidad
-        if host == "::":
-            try:
-                site4 = web.TCPSite(runner, "0.0.0.0", port)
-                await site4.start()
-                logger.info("Servidor A escuchando en 0.0.0.0:%d como fallback", port)
-                print(f"🚀 Servidor A (Asyncio) iniciando en http://0.0.0.0:{port}")
-            except Exception as e2:
-                logger.exception("Fallback IPv4 falló: %s", e2)
-                raise
-
-    # Mantener el servidor en ejecución hasta interrupción
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows: solo Ctrl+C
+
     try:
-        await asyncio.Event().wait()
+        await stop.wait()
+        logger.info("SIGTERM recibido, cerrando servidor A...")
     finally:
         await runner.cleanup()
 
 
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Crea el socket de escucha compartido por los workers. Con host '::'
+    acepta también IPv4 (dual stack) y, si IPv6 no está disponible, usa
+    0.0.0.0 como fallback.
+    """
+    try:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+    except OSError:
+        if host != "::":
+            raise
+        logger.warning("IPv6 no disponible, escuchando en 0.0.0.0:%d como fallback", port)
+        host, family = "0.0.0.0", socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if family == socket.AF_INET6 and host == "::":
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        sock.bind((host, port))
+        sock.listen(128)
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _worker_main(index: int, host: str, port: int, sock: Optional[socket.socket], reuse_port: bool,
+                 app_options: Optional[dict]) -> None:
+    """Punto de entrada de cada worker: un proceso con su propio event loop y ClientSession."""
+    # No heredar los handlers del supervisor: SIGTERM lo atiende el event loop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    logger.info("Worker %d iniciado (pid=%d)", index, os.getpid())
+    try:
+        asyncio.run(_run_app(host, port, sock=sock, reuse_port=reuse_port, app_options=app_options))
+    except KeyboardInterrupt:
+        pass
+    logger.info("Worker %d finalizado (pid=%d)", index, os.getpid())
+
+
+def run_workers(host: str = "::", port: int = 8080, workers: int = 2, reuse_port: bool = False,
+                shutdown_timeout: float = 30.0, app_options: Optional[dict] = None) -> None:
+    """
+    Supervisor del modo multiproceso: lanza `workers` procesos con la app
+    completa, que comparten el puerto de una de dos formas:
+    - socket heredado (por defecto): el supervisor enlaza un único socket
+      y los workers aceptan de él; un worker ocupado parseando no acepta,
+      así las conexiones nuevas van a los que están libres
+    - reuse_port: cada worker abre su propio socket con SO_REUSEPORT y el
+      kernel reparte las conexiones entre ellos
+
+    Los workers que terminan con error se reinician (con una espera que se
+    duplica si vuelven a caer enseguida, hasta 30 s). Con SIGINT/SIGTERM
+    se envía SIGTERM a cada worker, que termina las peticiones en curso;
+    los que no terminan en `shutdown_timeout` segundos se matan.
+    Cada worker crea su app con create_app(**app_options), con
+    parse_servers=workers: sin --parser-workers, los pools de parseo de
+    todos los workers suman las CPUs disponibles y no workers × CPUs.
+    """
+    if reuse_port and not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT no está disponible en esta plataforma")
+
+    sock = None if reuse_port else _bind_socket(host, port)
+    if sock is not None:
+        host, port = sock.getsockname()[:2]
+    modo = "SO_REUSEPORT" if reuse_port else "socket compartido"
+    print(f"🚀 Servidor A (Asyncio) iniciando en http://{host}:{port} con {workers} workers ({modo})")
+    logger.info("Supervisor (pid=%d): %d workers en %s:%d (%s)", os.getpid(), workers, host, port, modo)
+
+    app_options = {**(app_options or {}), "parse_servers": workers}
+    procs: Dict[int, multiprocessing.Process] = {}
+    started: Dict[int, float] = {}
+    delays: Dict[int, float] = {i: 0.0 for i in range(workers)}
+    next_start: Dict[int, float] = {}
+
+    def start(index: int) -> None:
+        proc = multiprocessing.Process(
+            target=_worker_main, args=(index, host, port, sock, reuse_port, app_options), name=f"ServerA-worker-{index}"
+        )
+        proc.start()
+        procs[index] = proc
+        started[index] = time.monotonic()
+
+    stopping = False
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    previous = {sig: signal.signal(sig, request_stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        for i in range(workers):
+            start(i)
+
+        while not stopping:
+            now = time.monotonic()
+            for i, proc in list(procs.items()):
+                if proc.is_alive() or stopping:
+                    continue
+                if i not in next_start:
+                    # Un worker que cae enseguida espera el doble antes de volver a arrancar
+                    vivo = now - started[i]
+                    delays[i] = 0.0 if vivo > 5.0 else min(30.0, max(0.5, 2 * delays[i]))
+                    next_start[i] = now + delays[i]
+                    logger.warning("Worker %d (pid=%s) terminó con código %s tras %.1fs; reinicio en %.1fs",
+                                   i, proc.pid, proc.exitcode, vivo, delays[i])
+                if now >= next_start[i]:
+                    del next_start[i]
+                    start(i)
+                    logger.info("Worker %d reiniciado (pid=%d)", i, procs[i].pid)
+            time.sleep(0.2)
+
+        logger.info("Supervisor: apagando %d workers...", len(procs))
+        for proc in procs.values():
+            if proc.is_alive():
+                proc.terminate()  # SIGTERM: cierre ordenado en el worker
+        deadline = time.monotonic() + shutdown_timeout
+        for proc in procs.values():
+            proc.join(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                logger.warning("Worker pid=%d no terminó a tiempo, forzando cierre", proc.pid)
+                proc.kill()
+                proc.join()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        if sock is not None:
+            sock.close()
+        logger.info("Servidor A detenido.")
+
+
 if __name__ == "__main__":
     # --- BLOQUE CORREGIDO (PROMPT 11) ---
     parser = argparse.ArgumentParser(
@@ -204,17 +509,106 @@ if __name__ == "__main__":
     parser.add_argument(
         "-w", "--workers", 
         type=int, 
-        default=4, 
-        help="Número de workers (default: 4)\n(Nota: este script usa un solo proceso asyncio,\neste argumento es para cumplir la consigna)"
+        default=1, 
+        help="Número de procesos worker (default: 1)\nCon más de 1, un supervisor lanza N procesos con la app\ncompleta que comparten el puerto y los reinicia si caen"
+    )
+
+    parser.add_argument(
+        "--reuse-port",
+        action="store_true",
+        help="Cada worker abre su propio socket con SO_REUSEPORT\n(default: un socket enlazado por el supervisor y heredado)"
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        "--parser-executor",
+        choices=PARSER_MODES,
+        default="process",
+        help="Dónde se parsea el HTML (default: process)\nprocess: pool de procesos por worker; thread: pool de hilos;\nstream: en el event loop, por partes a medida que llega"
+    )
+
+    parser.add_argument(
+        "--parser-workers",
+        type=int,
+        default=None,
+        help="Tamaño del pool de parseo de cada worker (default: CPUs / --workers, mínimo 1)"
+    )
+
+    parser.add_argument(
+        "--max-parse-bytes",
+        type=int,
+        default=DEFAULT_MAX_PARSE_BYTES,
+        help=f"Páginas más grandes se descargan y parsean solo hasta este tamaño y\nel resultado lleva \"truncated\": true (default: {DEFAULT_MAX_PARSE_BYTES}, 0 = sin límite)"
+    )
+
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=DEFAULT_MAX_BODY_BYTES,
+        help=f"Páginas que declaran (Content-Length) o envían más bytes se rechazan\n(default: {DEFAULT_MAX_BODY_BYTES}, 0 = sin límite)"
+    )
+
+    parser.add_argument(
+        "--allowed-types",
+        default=",".join(DEFAULT_ALLOWED_TYPES),
+        help=f"Content-Type aceptados, separados por comas (default: {','.join(DEFAULT_ALLOWED_TYPES)})\n'*' = cualquiera"
+    )
     
-    # args.workers no se usa aquí, ya que asyncio maneja la concurrencia
-    # en un solo proceso. Lo hemos añadido para cumplir la interfaz.
-    logger.info(f"Configuración: host={args.host}, port={args.port}, workers={args.workers} (ignorado)")
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help=f"Segundos que vale un resultado en el caché de /scrape; después se\nrevalida con la página (default: {DEFAULT_TTL:g}, 0 = sin caché)"
+    )
+
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f"Máximo de URLs en el caché de cada worker (default: {DEFAULT_MAX_ENTRIES})"
+    )
+
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help=f"Máximo de bytes de respuestas en el caché de cada worker (default: {DEFAULT_MAX_BYTES})"
+    )
+
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers debe ser >= 1")
+    if args.parser_workers is not None and args.parser_workers < 1:
+        parser.error("--parser-workers debe ser >= 1")
+    if args.max_parse_bytes < 0:
+        parser.error("--max-parse-bytes debe ser >= 0")
+    if args.max_body_bytes < 0:
+        parser.error("--max-body-bytes debe ser >= 0")
+    if args.cache_ttl < 0 or args.cache_max_entries < 1 or args.cache_max_bytes < 0:
+        parser.error("--cache-ttl y --cache-max-bytes deben ser >= 0 y --cache-max-entries >= 1")
+    allowed_types = None
+    if args.allowed_types.strip() != "*":
+        allowed_types = tuple(t.strip().lower() for t in args.allowed_types.split(",") if t.strip())
+    app_options = {
+        "parse_executor": args.parser_executor,
+        "parse_workers": args.parser_workers,
+        "max_parse_bytes": args.max_parse_bytes,
+        "max_body_bytes": args.max_body_bytes,
+        "allowed_types": allowed_types,
+        "cache_ttl": args.cache_ttl,
+        "cache_max_entries": args.cache_max_entries,
+        "cache_max_bytes": args.cache_max_bytes,
+    }
+
+    logger.info(f"Configuración: host={args.host}, port={args.port}, workers={args.workers}, reuse_port={args.reuse_port}, "
+                f"parser={args.parser_executor} (workers={args.parser_workers or default_workers(args.workers)}), max_parse_bytes={args.max_parse_bytes}, "
+                f"max_body_bytes={args.max_body_bytes}, allowed_types={allowed_types or '*'}, cache_ttl={args.cache_ttl:g}")
 
     try:
-        asyncio.run(_run_app(args.host, args.port))
+        if args.workers > 1:
+            run_workers(args.host, args.port, args.workers, reuse_port=args.reuse_port, app_options=app_options)
+        else:
+            asyncio.run(_run_app(args.host, args.port, reuse_port=args.reuse_port, app_options=app_options))
+    except KeyboardInterrupt:
+        logger.info("Servidor A detenido por el usuario")
     except Exception as e:
-        logger.exception("Error arrancando la app: %s", e)
\ No newline at end of file
+        logger.exception("Error arrancando la app: %s", e)
@@ -1,5 +1,8 @@
+import glob
+import os
+
 import pytest
-from scraper.html_parser import parse_html_full
+from scraper.html_parser import parse_html_full, parse_html_soup
 
 # Un HTML de prueba
 SAMPLE_HTML = """
@@ -42,4 +45,180 @@ def test_parse_html_full():
     assert data["structure"]["h1"] == 1
     assert data["structure"]["h2"] == 1
     assert data["structure"]["h3"] == 0
-        
\ No newline at end of file
+        
+
+@pytest.mark.asyncio
+async def test_parse_in_executor_truncates_large_documents():
+    from scraper.parse_executor import create_executor, parse_in_executor
+
+    executor = create_executor("thread", 1)
+    try:
+        content = SAMPLE_HTML.encode("utf-8")
+        data = await parse_in_executor(executor, content, BASE_URL, "utf-8", max_bytes=0)
+        assert data["title"] == "Test Page"
+        assert "truncated" not in data
+
+        # Cortado antes del <body>: el <head> sale completo, el resto vacío
+        cut = content.index(b"<body>")
+        data = await parse_in_executor(executor, content, BASE_URL, max_bytes=cut)
+        assert data["truncated"] is True
+        assert data["original_size"] == len(content)
+        assert data["title"] == "Test Page"
+        assert data["links"] == []
+    finally:
+        executor.shutdown()
+
+
+PAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "pages", "*.html")))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_single_pass_matches_beautifulsoup(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    assert parse_html_full(content, BASE_URL) == parse_html_soup(content, BASE_URL)
+
+
+def test_custom_extractor_in_same_pass():
+    from scraper.extractor import EXTRACTORS, Extractor, extract_page
+
+    class ScriptCounter(Extractor):
+        tags = ("script",)
+
+        def __init__(self, base_url=""):
+            super().__init__(base_url)
+            self.count = 0
+
+        def handle(self, element):
+            self.count += 1
+
+        def result(self):
+            return {"scripts_count": self.count}
+
+    html = SAMPLE_HTML.replace("</head>", "<script>var a = 1;</script></head>")
+    data = extract_page(html, BASE_URL, extractors=[*EXTRACTORS, ScriptCounter])
+    assert data["scripts_count"] == 1
+    assert data["title"] == "Test Page"
+    assert "scripts_count" not in parse_html_full(html, BASE_URL)
+
+    class Incomplete(Extractor):
+        tags = ("p",)
+
+        def handle(self, element):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete(BASE_URL)
+
+
+def test_incremental_feed_and_head_only():
+    from scraper.extractor import ExtractionEngine
+
+    content = SAMPLE_HTML.encode("utf-8")
+    engine = ExtractionEngine(BASE_URL)
+    for i in range(0, len(content), 7):
+        engine.feed(content[i:i + 7])
+    assert engine.close() == parse_html_full(content, BASE_URL)
+
+    # head_only termina al cerrarse el <head>: el resto ya no se parsea
+    engine = ExtractionEngine(BASE_URL, "utf-8", head_only=True)
+    engine.feed(content + b"<a href='/despues'>x</a>" * 1000)
+    assert engine.done
+    data = engine.close()
+    assert data["title"] == "Test Page"
+    assert data["meta_tags"]["og:title"] == "OG Test Title"
+    assert data["links"] == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_stream_limits():
+    from aiohttp import ClientSession, web
+    from aiohttp.test_utils import TestServer
+    from scraper.async_http import fetch_stream
+
+    async def page(request):
+        return web.Response(body=SAMPLE_HTML.encode("utf-8") * 10, content_type="text/html")
+
+    async def binary(request):
+        return web.Response(body=b"\x00" * 100, content_type="application/octet-stream")
+
+    async def not_modified(request):
+        return web.Response(status=304)
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    app.router.add_get("/binary", binary)
+    app.router.add_get("/304", not_modified)
+    async with TestServer(app) as server, ClientSession() as session:
+        size = len(SAMPLE_HTML.encode("utf-8")) * 10
+
+        fetched = await fetch_stream(session, str(server.make_url("/page")))
+        assert len(fetched["body"]) == size and not fetched["truncated"]
+
+        fetched = await fetch_stream(session, str(server.make_url("/page")), stop_at=100)
+        assert len(fetched["body"]) == 100 and fetched["truncated"]
+
+        fetched = await fetch_stream(session, str(server.make_url("/page")), max_bytes=size - 1)
+        assert fetched["error"] == "too_large"
+
+        fetched = await fetch_stream(session, str(server.make_url("/binary")))
+        assert fetched["error"] == "unsupported_content_type"
+
+        # 304 solo cuenta como "no cambió" si el GET fue condicional
+        fetched = await fetch_stream(session, str(server.make_url("/304")))
+        assert fetched["error"] == "fetch_failed"
+        fetched = await fetch_stream(session, str(server.make_url("/304")), headers={"If-None-Match": '"v1"'})
+        assert fetched == {"status": 304}
+
+
+def test_normalize_url():
+    from scraper.cache import normalize_url
+
+    assert normalize_url("HTTP://Example.COM:80?b=2&a=1#frag") == "http://example.com/?a=1&b=2"
+    assert normalize_url("https://example.com:8443/x") == "https://example.com:8443/x"
+    assert normalize_url("https://example.com/x") != normalize_url("https://example.com/X")
+
+
+def test_response_cache_lru_and_ttl():
+    from scraper.cache import ResponseCache
+
+    cache = ResponseCache(ttl=60, max_entries=2, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")                      # "a" pasa a ser la más reciente
+    cache.put("c", b"1234")             # supera max_entries: sale "b"
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("d", b"12345678")         # supera max_bytes: salen las más viejas
+    assert len(cache) == 1 and cache.bytes == 8
+    assert cache.put("e", b"x" * 11) is None    # no entra ni sola
+
+    entry = cache.get("d")
+    assert entry.is_fresh()
+    entry.expires = 0
+    assert not entry.is_fresh()
+    cache.refresh(entry)
+    assert entry.is_fresh()
+
+    entry = cache.put("f", b"1", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def test_parse_executor_sizing_and_replacement():
+    from server_scraping import _replace_parse_executor, create_app
+    from scraper.parse_executor import create_executor, default_workers
+
+    cpus = os.cpu_count() or 1
+    assert default_workers() == cpus
+    assert default_workers(cpus * 2) == 1
+
+    app = create_app(parse_executor="thread", parse_workers=1)
+    failed = app["parse_executor"] = create_executor("thread", 1)
+    _replace_parse_executor(app, failed)
+    replacement = app["parse_executor"]
+    assert replacement is not failed
+    _replace_parse_executor(app, failed)    # otra petición con el mismo pool roto
+    assert app["parse_executor"] is replacement
+    replacement.shutdown()